@@ -1,17 +1,32 @@
+import io
 import os
+import math
+import time
+import uuid
 import logging
-from flask import Flask, render_template, request, redirect, url_for, session, send_file, flash
-import pandas as pd
+from flask import Flask, render_template, request, redirect, url_for, session, send_file, flash, abort
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash
 from datetime import datetime
-from utils.generate_pdf import generate_pdf
+from utils.generate_pdf import generate_pdf, generate_pdf_bytes, build_slip_data, get_pdf_cache_stats
 from utils.helpers import (
-    format_rupiah, update_password, check_user_password, get_user_by_nup,
-    clean_column_names, get_komponen_by_status, add_user
+    format_rupiah, update_password, check_user_password, authenticate_user,
+    get_komponen_by_status
 )
-from models.db import init_db, get_db_connection
-from utils.generate_barcode import generate_payslip_barcode_uri
+from utils.period_index import get_index_stats
+from utils.payroll_db import get_employee_payroll, get_period_payroll
+from utils.salary_schema import period_report
+from utils.period_catalog import get_available_months, get_period_choices, find_period, ensure_catalog
+from utils.admin_tasks import get_pending_upload_path, get_pending_payroll_path
+from utils.chunked_upload import (
+    CHUNKED_UPLOAD_CHUNK_BYTES, CHECKSUM_HEADER, create_upload, load_upload, upload_status,
+    save_chunk, assemble_upload, remove_upload
+)
+from utils.jobs import JOB_QUEUE_ENABLED, MAX_LISTED_JOBS, enqueue_job, run_task, list_jobs
+from utils.server_session import create_session_interface
+from utils import metrics, profiling
+from models.db import init_db, get_db_cursor, get_pool_stats
+from utils.generate_barcode import generate_payslip_barcode_uri, get_barcode_stats
 
 # =============================================
 # SETUP LOGGING
@@ -48,17 +63,40 @@ else: # production
 # Konfigurasi dari Environment Variables
 app.config.update(
     # Menggunakan SECRET_KEY dari blok sebelumnya
-    UPLOAD_FOLDER=os.path.join(os.path.abspath(os.path.dirname(__file__)), 'data'),
+    UPLOAD_FOLDER=os.getenv('UPLOAD_FOLDER', os.path.join(os.path.abspath(os.path.dirname(__file__)), 'data')),
     ALLOWED_EXTENSIONS={'xlsx'},
-    MAX_CONTENT_LENGTH=16 * 1024 * 1024,  # 16MB
+    # Batas satu request (form upload atau satu chunk); file lebih besar lewat /admin/uploads
+    MAX_CONTENT_LENGTH=int(os.getenv('MAX_UPLOAD_MB', '16')) * 1024 * 1024,
+
+    # 'memory': PDF dirender dan dikirim dari memori, 'file': kirim dari static/slips
+    SLIP_PDF_MODE=os.getenv('SLIP_PDF_MODE', 'memory'),
+    # Simpan salinan PDF ke static/slips (dipakai ulang sebagai cache)
+    SLIP_PERSIST_PDF=os.getenv('SLIP_PERSIST_PDF', '1') == '1',
+    # Operasi admin yang berat dijalankan worker.py di latar belakang
+    JOB_QUEUE_ENABLED=JOB_QUEUE_ENABLED,
     
     SESSION_COOKIE_SECURE=False,
     SESSION_COOKIE_HTTPONLY=True,
     SESSION_COOKIE_SAMESITE='Lax'
 )
 
+# Buat folder upload jika belum ada
+os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+# Katalog periode dibangun sekali saat startup (bukan di request pertama) jika belum ada
+ensure_catalog(app.config['UPLOAD_FOLDER'])
+
+# Isi session disimpan di server (SESSION_BACKEND), cookie hanya berisi session id
+session_interface = create_session_interface(app.config['UPLOAD_FOLDER'])
+if session_interface is not None:
+    app.session_interface = session_interface
+
 app.jinja_env.filters['rupiah'] = format_rupiah
 
+# Histogram durasi per route dan per tahap (METRICS_ENABLED=1), lihat /admin/metrics
+metrics.init_app(app)
+# Profiling request on-demand, diatur admin lewat /admin/profiles
+profiling.init_app(app)
+
 # =============================================
 # INISIALISASI DATABASE
 # =============================================
@@ -70,14 +108,12 @@ def initialize_database():
         logger.info("Database berhasil diinisialisasi")
         
         # Buat admin default jika tidak ada
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO users (nup, password, role)
-                    VALUES ('admin', %s, 'admin')
-                    ON CONFLICT (nup) DO NOTHING
-                """, (generate_password_hash('admin123'),))
-                conn.commit()
+        with get_db_cursor() as cur:
+            cur.execute("""
+                INSERT INTO users (nup, password, role)
+                VALUES ('admin', %s, 'admin')
+                ON CONFLICT (nup) DO NOTHING
+            """, (generate_password_hash('admin123'),))
     except Exception as e:
         logger.error(f"Gagal inisialisasi database: {str(e)}")
         raise
@@ -88,70 +124,52 @@ def initialize_database():
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
+def queue_admin_task(kind, payload):
+    """
+    (job_id, None) jika operasi masuk antrian job, (None, hasil) jika dijalankan langsung.
+    """
+    if app.config['JOB_QUEUE_ENABLED']:
+        return enqueue_job(kind, payload, created_by=session.get('nup')), None
+    return None, run_task(kind, payload)
+
+def submit_admin_task(kind, payload):
+    """
+    Masukkan operasi admin ke antrian job jika aktif (mengembalikan None),
+    atau jalankan langsung di request ini dan kembalikan hasilnya.
+    """
+    job_id, result = queue_admin_task(kind, payload)
+    if job_id is not None:
+        flash_job_queued(job_id)
+    return result
+
+def flash_job_queued(job_id):
+    flash(f"Diproses di latar belakang (job #{job_id}). Pantau progres di menu Job.", "info")
+
+def log_login_timings(nup, timings, start, success=True):
+    total = (time.perf_counter() - start) * 1000
+    stages = ", ".join(f"{name} {ms:.1f}ms" for name, ms in timings.items())
+    for name, ms in timings.items():
+        metrics.observe_stage(f"login_{name}", ms / 1000)
+    if success:
+        logger.info(f"Login berhasil untuk NUP: {nup} ({stages}, total {total:.1f}ms)")
+    else:
+        logger.warning(f"Login gagal untuk NUP: {nup} ({stages}, total {total:.1f}ms)")
+
+def collect_cache_stats():
+    return {
+        "period_index": get_index_stats(),
+        "pdf_cache": get_pdf_cache_stats(),
+        "barcode": get_barcode_stats(),
+        "db_pool": get_pool_stats(),
+        "session": session_interface.get_stats() if session_interface is not None else {"backend": "cookie"},
+    }
+
 def get_previous_month():
     now = datetime.now()
     if now.month == 1:
         return "12", str(now.year - 1)
     return str(now.month - 1).zfill(2), str(now.year)
 
-def format_password_ttl(ttl_value):
-    try:
-        if pd.isna(ttl_value):
-            return "00000000"
-        
-        if isinstance(ttl_value, datetime):
-            return ttl_value.strftime("%d%m%Y")
-        
-        if isinstance(ttl_value, (int, float)):
-            parsed = pd.to_datetime(ttl_value, origin='1899-12-30', unit='D')
-            return parsed.strftime("%d%m%Y")
-        
-        parsed = pd.to_datetime(str(ttl_value), dayfirst=True, errors='coerce')
-        if not pd.isna(parsed):
-            return parsed.strftime("%d%m%Y")
-            
-        return str(ttl_value).zfill(8)
-    except Exception as e:
-        logger.error(f"Error formatting password TTL: {e}")
-        return "00000000"
-
-def load_all_salary_data():
-    all_data = []
-    upload_folder = app.config['UPLOAD_FOLDER']
-    
-    # Buat folder jika belum ada
-    os.makedirs(upload_folder, exist_ok=True)
-
-    for file in os.listdir(upload_folder):
-        if file.endswith('.xlsx') and not file.startswith('~$'):
-            try:
-                path = os.path.join(upload_folder, file)
-                df = pd.read_excel(path)
-                df = clean_column_names(df)
-                
-                # Ekstrak bulan dan tahun dari nama file (format: gaji_YYYY_MM.xlsx)
-                try:
-                    # Menambahkan 'gaji_' jika format nama file memiliki awalan ini
-                    parts = file.replace('.xlsx', '').split('_')
-                    if len(parts) == 3 and parts[0] == 'gaji':
-                        tahun, bulan = parts[1], parts[2]
-                    else:
-                        tahun, bulan = parts
-                    df['BULAN'] = int(bulan)
-                    df['TAHUN'] = int(tahun)
-                except ValueError:
-                    logger.warning(f"Format nama file salah: {file}")
-                    continue
-                
-                df['PASSWORD'] = df['TTL'].apply(format_password_ttl)
-                df['SOURCE_FILE'] = file
-                all_data.append(df)
-                
-            except Exception as e:
-                logger.error(f"Gagal memproses file {file}: {str(e)}")
-    
-    return pd.concat(all_data, ignore_index=True) if all_data else pd.DataFrame()
-
 # =============================================
 # ROUTES
 # =============================================
@@ -170,53 +188,40 @@ def login():
                 return redirect(url_for('login'))
 
             logger.info(f"Percobaan login NUP: {nup}")
-            user = get_user_by_nup(nup)
+            start = time.perf_counter()
+            user, timings = authenticate_user(nup, password)
 
-            if user and check_user_password(nup, password):
+            if user:
                 session['nup'] = nup
                 session['role'] = user['role']
-                logger.info(f"Login berhasil untuk NUP: {nup}")
                 flash('Login berhasil', 'success')
 
                 if user['role'] == 'admin':
+                    log_login_timings(nup, timings, start)
                     return redirect(url_for('admin_dashboard'))
 
-                # Untuk user biasa
-                files = [f for f in os.listdir(app.config['UPLOAD_FOLDER'])
-                         if f.endswith('.xlsx') and not f.startswith('~$')]
-
-                bulan_available = []
-                for file in files:
-                    try:
-                        df = pd.read_excel(os.path.join(app.config['UPLOAD_FOLDER'], file), nrows=1)
-                        if 'BULAN' in df.columns and 'TAHUN' in df.columns:
-                            bulan = str(df.iloc[0]['BULAN']).zfill(2)
-                            tahun = str(df.iloc[0]['TAHUN']).strip()
-                            bulan_available.append({
-                                'BULAN': bulan,
-                                'TAHUN': tahun,
-                                'source_file': file
-                            })
-                    except Exception as e:
-                        logger.error(f"Error membaca file {file}: {str(e)}")
-
+                # Untuk user biasa: daftar bulan dan periode default diambil dari
+                # katalog periode (tanpa membuka workbook atau cek file)
+                stage = time.perf_counter()
+                bulan_available = get_available_months(app.config['UPLOAD_FOLDER'])
                 session['available_months'] = bulan_available
 
                 # Set default bulan saat login
                 bulan, tahun = get_previous_month()
-                filename = f'gaji_{tahun}_{bulan}.xlsx'
-                file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+                entry = find_period(app.config['UPLOAD_FOLDER'], f"{tahun}-{bulan}")
 
-                if os.path.exists(file_path):
-                    session['selected_file'] = filename
+                if entry is not None:
+                    session['selected_file'] = entry['source_file']
                 elif bulan_available:
-                    session['selected_file'] = bulan_available[0]['source_file']
+                    session['selected_file'] = bulan_available[-1]['source_file']
                 else:
                     session['selected_file'] = None
+                timings['catalog'] = (time.perf_counter() - stage) * 1000
 
+                log_login_timings(nup, timings, start)
                 return redirect(url_for('slip'))
 
-            logger.warning(f"Login gagal untuk NUP: {nup}")
+            log_login_timings(nup, timings, start, success=False)
             flash('NUP atau password salah', 'danger')
 
         except Exception as e:
@@ -241,16 +246,12 @@ def slip():
 
     try:
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], session['selected_file'])
-        df_selected = pd.read_excel(file_path)
-        df_selected = clean_column_names(df_selected)
-        df_selected['PASSWORD'] = df_selected['TTL'].apply(format_password_ttl)
-
-        user_data = df_selected[df_selected['NUP'].astype(str) == session['nup']]
-        if user_data.empty:
+        with metrics.stage('payroll_lookup'):
+            user_dict = get_employee_payroll(file_path, session['nup'])
+        if user_dict is None:
             flash('Data gaji tidak ditemukan', 'danger')
             return redirect(url_for('select_month'))
 
-        user_dict = user_data.iloc[0].to_dict()
         komponen_thp, komponen_lain, komponen_potongan = get_komponen_by_status(user_dict)
 
         # Data tambahan
@@ -266,21 +267,22 @@ def slip():
             signer_title
         )
 
-        return render_template(
-            'slip.html',
-            **user_dict,
-            status=user_dict.get('STATUS_PEGAWAI', '').lower(),
-            komponen_thp=komponen_thp,
-            komponen_lain=komponen_lain,
-            komponen_potongan=komponen_potongan,
-            total_thp=user_dict.get("TOTAL_THP"),
-            total_lain=user_dict.get("PENGHASILAN_LAIN"),
-            available_months=session.get('available_months', []),
-            selected_month=session.get('selected_file', None),  # ✅ konsisten
-            barcode_uri=barcode_uri,
-            signer_name=signer_name,
-            signer_title=signer_title
-        )
+        with metrics.stage('render_slip_page'):
+            return render_template(
+                'slip.html',
+                **user_dict,
+                status=user_dict.get('STATUS_PEGAWAI', '').lower(),
+                komponen_thp=komponen_thp,
+                komponen_lain=komponen_lain,
+                komponen_potongan=komponen_potongan,
+                total_thp=user_dict.get("TOTAL_THP"),
+                total_lain=user_dict.get("PENGHASILAN_LAIN"),
+                available_months=session.get('available_months', []),
+                selected_month=session.get('selected_file', None),  # ✅ konsisten
+                barcode_uri=barcode_uri,
+                signer_name=signer_name,
+                signer_title=signer_title
+            )
 
     except Exception as e:
         logger.error(f"Error saat memproses slip: {str(e)}", exc_info=True)
@@ -295,23 +297,7 @@ def select_month():
         return redirect(url_for('login'))
 
     try:
-        files = [f for f in os.listdir(app.config['UPLOAD_FOLDER'])
-                 if f.endswith('.xlsx') and not f.startswith('~$')]
-
-        bulan_available = []
-        for file in files:
-            try:
-                df = pd.read_excel(os.path.join(app.config['UPLOAD_FOLDER'], file), nrows=1)
-                if 'BULAN' in df.columns and 'TAHUN' in df.columns:
-                    bulan = df.iloc[0]['BULAN']
-                    tahun = df.iloc[0]['TAHUN']
-                    bulan_available.append({
-                        'BULAN': bulan,
-                        'TAHUN': tahun,
-                        'source_file': file
-                    })
-            except Exception as e:
-                logger.error(f"Error membaca file {file}: {str(e)}")
+        bulan_available = get_available_months(app.config['UPLOAD_FOLDER'])
 
         if request.method == 'POST':
             selected_file = request.form.get('file')
@@ -337,46 +323,25 @@ def download():
 
     try:
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], session['selected_file'])
-        df_selected = pd.read_excel(file_path)
-        df_selected = clean_column_names(df_selected)
-        df_selected['PASSWORD'] = df_selected['TTL'].apply(format_password_ttl)
-
-        user_data = df_selected[df_selected['NUP'].astype(str) == session['nup']]
-        if user_data.empty:
+        with metrics.stage('payroll_lookup'):
+            user_dict = get_employee_payroll(file_path, session['nup'])
+        if user_dict is None:
             flash('Data gaji tidak ditemukan', 'danger')
             return redirect(url_for('select_month'))
 
-        user_dict = user_data.iloc[0].to_dict()
-        komponen_thp, komponen_lain, komponen_potongan = get_komponen_by_status(user_dict)
+        # Komponen gaji dan barcode disiapkan dengan logika yang sama seperti batch PDF
+        data = build_slip_data(user_dict)
 
-        # --- Penyesuaian untuk Barcode ---
-        # Dapatkan data yang diperlukan
-        employee_id = user_dict.get('NUP')
-        pay_period = f"{user_dict.get('BULAN')}-{user_dict.get('TAHUN')}"
-        signer_name = user_dict.get('PENANDATANGAN')
-        signer_title = user_dict.get('JABATAN_PENANDATANGAN')
-
-        # Panggil fungsi generate_payslip_barcode_uri dengan argumen lengkap
-        barcode_uri = generate_payslip_barcode_uri(
-            employee_id,
-            pay_period,
-            signer_name,
-            signer_title
-        )
-        # --------------------------------
-
-        # Kirimkan data lengkap, termasuk barcode_uri, ke fungsi generate_pdf
-        pdf_path = generate_pdf({
-        **user_dict,
-        "komponen_thp": komponen_thp,
-        "komponen_lain": komponen_lain,
-        "komponen_potongan": komponen_potongan,
-        "status": user_dict.get('STATUS_PEGAWAI', '').lower(),
-        "barcode_uri": barcode_uri,
-        "total_thp": user_dict.get("TOTAL_THP"),
-        "total_lain": user_dict.get("PENGHASILAN_LAIN")
-    })
+        if app.config['SLIP_PDF_MODE'] == 'memory':
+            filename, pdf_bytes = generate_pdf_bytes(data, persist=app.config['SLIP_PERSIST_PDF'])
+            return send_file(
+                io.BytesIO(pdf_bytes),
+                mimetype='application/pdf',
+                as_attachment=True,
+                download_name=filename
+            )
 
+        pdf_path = generate_pdf(data)
         return send_file(pdf_path, as_attachment=True)
     except Exception as e:
         logger.error(f"Error saat mengunduh slip: {str(e)}", exc_info=True)
@@ -431,7 +396,7 @@ def admin_dashboard():
         # Mengambil parameter "periode" dari form
         periode_str = request.args.get("periode")
         bulan_str, tahun_str = None, None
-        data_slip = pd.DataFrame()  # Inisialisasi DataFrame kosong
+        data_slip = []
 
         if periode_str:
             try:
@@ -441,74 +406,22 @@ def admin_dashboard():
                 tahun = int(tahun_str)
                 
                 logger.info(f"Memuat data untuk bulan {bulan} dan tahun {tahun}")
-                
-                all_data = load_all_salary_data()
-                if not all_data.empty:
-                    data_slip = all_data[(all_data['BULAN'] == bulan) & (all_data['TAHUN'] == tahun)]
+
+                # Hanya periode yang dipilih yang dibaca (indeks database atau store kolumnar)
+                entry = find_period(app.config['UPLOAD_FOLDER'], f"{tahun}-{bulan:02d}")
+                if entry is not None:
+                    # Ringkasan + jumlah komponen per grup dihitung per kolom, baris yang totalnya selisih ditandai
+                    data_slip = period_report(get_period_payroll(os.path.join(app.config['UPLOAD_FOLDER'], entry['source_file'])))
             except (ValueError, KeyError) as e:
                 logger.error(f"Error memfilter data slip gaji: {str(e)}")
                 flash('Format bulan atau tahun tidak valid.', 'danger')
 
-        # Dictionary untuk konversi nama bulan Indonesia ke angka
-        month_mapping = {
-            'januari': 1, 'jan': 1,
-            'februari': 2, 'feb': 2,
-            'maret': 3, 'mar': 3,
-            'april': 4, 'apr': 4,
-            'mei': 5,
-            'juni': 6, 'jun': 6,
-            'juli': 7, 'jul': 7,
-            'agustus': 8, 'agu': 8,
-            'september': 9, 'sep': 9,
-            'oktober': 10, 'okt': 10,
-            'november': 11, 'nov': 11,
-            'desember': 12, 'des': 12
-        }
-
-        # Mengambil bulan dan tahun yang unik dari semua file di UPLOAD_FOLDER
-        available_months_years = set()
-        
-        for file in os.listdir(app.config['UPLOAD_FOLDER']):
-            if file.endswith('.xlsx') and not file.startswith('~$'):
-                try:
-                    df_temp = pd.read_excel(os.path.join(app.config['UPLOAD_FOLDER'], file), nrows=1)
-                    df_temp.columns = [col.upper().replace(' ', '_') for col in df_temp.columns]
-                    
-                    if 'BULAN' in df_temp.columns and 'TAHUN' in df_temp.columns:
-                        bulan_value = df_temp.iloc[0]['BULAN']
-                        tahun_value = df_temp.iloc[0]['TAHUN']
-                        
-                        # Konversi bulan
-                        if isinstance(bulan_value, str):
-                            # Jika bulan berupa string (nama bulan)
-                            bulan_lower = bulan_value.lower().strip()
-                            if bulan_lower in month_mapping:
-                                bulan_file = month_mapping[bulan_lower]
-                            else:
-                                logger.warning(f"Nama bulan tidak dikenali: {bulan_value}")
-                                continue
-                        else:
-                            # Jika bulan sudah berupa angka
-                            try:
-                                bulan_file = int(bulan_value)
-                            except (ValueError, TypeError):
-                                logger.warning(f"Format bulan tidak valid: {bulan_value}")
-                                continue
-                        
-                        # Konversi tahun
-                        try:
-                            tahun_file = int(tahun_value)
-                        except (ValueError, TypeError):
-                            logger.warning(f"Format tahun tidak valid: {tahun_value}")
-                            continue
-                            
-                        available_months_years.add((tahun_file, bulan_file))
-                        
-                except Exception as e:
-                    logger.error(f"Error memproses file {file} untuk dropdown: {str(e)}")
-
-        # Mengurutkan bulan/tahun
-        sorted_months = sorted(list(available_months_years))
+        # Bulan/tahun yang tersedia diambil dari katalog periode
+        sorted_months = get_period_choices(app.config['UPLOAD_FOLDER'])
+
+        jobs = []
+        if active_tab == 'jobs' and app.config['JOB_QUEUE_ENABLED']:
+            jobs = list_jobs()
 
         # Mengirimkan data ke template
         return render_template(
@@ -517,7 +430,9 @@ def admin_dashboard():
             data_slip=data_slip,
             available_months=sorted_months,
             bulan=bulan_str,
-            tahun=tahun_str
+            tahun=tahun_str,
+            jobs=jobs,
+            job_queue_enabled=app.config['JOB_QUEUE_ENABLED']
         )
 
     except Exception as e:
@@ -526,6 +441,16 @@ def admin_dashboard():
         return redirect(url_for('login'))
 
 
+def flash_payroll_ingest_result(result):
+    flash("Data gaji berhasil diupload", "success")
+    if result.get('errors'):
+        # Nilai bukan angka di kolom nominal dan total yang tidak sama dengan komponennya
+        flash(
+            f"{len(result['errors'])} peringatan validasi data gaji, "
+            f"mis. {'; '.join(result['errors'][:3])}",
+            "warning"
+        )
+
 @app.route("/admin/upload_gaji", methods=["POST"])
 def upload_gaji():
     if session.get('role') != 'admin':
@@ -536,16 +461,109 @@ def upload_gaji():
         file = request.files.get("file")
         if file and allowed_file(file.filename):
             filename = secure_filename(file.filename)
-            file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-            flash("Data gaji berhasil diupload", "success")
+            # Disimpan di lokasi sementara; file periode lama baru diganti jika upload lolos validasi
+            pending_path = get_pending_payroll_path(app.config['UPLOAD_FOLDER'], filename)
+            file.save(pending_path)
+
+            # Konversi sekali ke format kolumnar supaya request berikutnya tidak parsing .xlsx
+            result = submit_admin_task('ingest_payroll', {
+                'folder': app.config['UPLOAD_FOLDER'],
+                'filename': filename,
+                'pending_path': pending_path,
+            })
+            if result is not None:
+                flash_payroll_ingest_result(result)
         else:
             flash("Format file tidak valid. Hanya file Excel (.xlsx) yang diperbolehkan", "danger")
+    except ValueError as e:
+        # Header tidak valid (mis. kolom NUP tidak ada)
+        flash(str(e), "danger")
     except Exception as e:
         logger.error(f"Error saat upload gaji: {str(e)}", exc_info=True)
         flash("Terjadi kesalahan saat mengupload file", "danger")
 
     return redirect(url_for("admin_dashboard", tab="gaji"))
 
+@app.route("/admin/generate_slips", methods=["POST"])
+def generate_slips():
+    if session.get('role') != 'admin':
+        flash('Akses ditolak. Hanya untuk admin', 'danger')
+        return redirect(url_for('login'))
+
+    periode = request.form.get("periode", "")
+    try:
+        entry = find_period(app.config['UPLOAD_FOLDER'], periode)
+        if entry is None:
+            flash(f"Periode {periode} tidak ditemukan", "danger")
+            return redirect(url_for("admin_dashboard", tab="slip"))
+
+        summary = submit_admin_task('generate_slips', {'folder': app.config['UPLOAD_FOLDER'], 'periode': periode})
+        if summary is not None:
+            flash(
+                f"{summary['generated']} slip dibuat, {summary['skipped']} dilewati "
+                f"({summary['slips_per_second']} slip/detik)",
+                "success"
+            )
+            if summary['failed']:
+                flash(f"{summary['failed']} slip gagal dibuat", "warning")
+    except Exception as e:
+        logger.error(f"Error saat generate slip periode {periode}: {str(e)}", exc_info=True)
+        flash("Terjadi kesalahan saat membuat slip PDF", "danger")
+
+    return redirect(url_for("admin_dashboard", tab="slip", periode=periode))
+
+@app.route("/admin/send_slips", methods=["POST"])
+def send_slips():
+    if session.get('role') != 'admin':
+        flash('Akses ditolak. Hanya untuk admin', 'danger')
+        return redirect(url_for('login'))
+
+    periode = request.form.get("periode", "")
+    try:
+        if find_period(app.config['UPLOAD_FOLDER'], periode) is None:
+            flash(f"Periode {periode} tidak ditemukan", "danger")
+            return redirect(url_for("admin_dashboard", tab="slip"))
+
+        summary = submit_admin_task('send_slips', {'folder': app.config['UPLOAD_FOLDER'], 'periode': periode})
+        if summary is not None:
+            flash(
+                f"{summary['sent']} email terkirim, {summary['already_sent']} sudah terkirim sebelumnya "
+                f"({summary['messages_per_second']} email/detik)",
+                "success"
+            )
+            if summary['failed'] or summary['no_email']:
+                flash(f"{summary['failed']} email gagal, {summary['no_email']} pegawai tanpa email", "warning")
+    except Exception as e:
+        logger.error(f"Error saat kirim slip periode {periode}: {str(e)}", exc_info=True)
+        flash("Terjadi kesalahan saat mengirim slip via email", "danger")
+
+    return redirect(url_for("admin_dashboard", tab="slip", periode=periode))
+
+def flash_user_import_result(result):
+    if result['mode'] == 'sync':
+        flash(
+            f"Sinkronisasi selesai: {result['inserted']} baru, {result['updated']} diperbarui, "
+            f"{result['adopted']} diadopsi, {result['skipped']} tidak berubah, {result['deactivated']} dinonaktifkan",
+            "success"
+        )
+        if result['failed'] > 0:
+            flash(f"{result['failed']} user gagal diproses", "warning")
+    else:
+        # Flash message dengan detail
+        if result['success'] > 0:
+            flash(f"{result['success']} user berhasil ditambahkan", "success")
+        if result['failed'] > 0:
+            flash(f"{result['failed']} user gagal ditambahkan", "warning")
+
+def user_import_options(data):
+    """
+    Opsi import user dari form upload atau body JSON upload per chunk.
+    """
+    return {
+        'mode': 'sync' if data.get('mode') == 'sync' else 'import',
+        'deactivate_missing': str(data.get('deactivate_missing') or '').lower() in ('1', 'true', 'on', 'yes'),
+    }
+
 @app.route("/admin/upload_user", methods=["POST"])
 def upload_user():
     if session.get('role') != 'admin':
@@ -558,150 +576,127 @@ def upload_user():
             flash("Format file tidak valid. Hanya file Excel (.xlsx) yang diperbolehkan", "danger")
             return redirect(url_for("admin_dashboard", tab="user"))
 
-        # Baca file Excel dengan berbagai kemungkinan tipe kolom
-        df = pd.read_excel(file, dtype={'NUP': str, 'nup': str})
-        
-        # Normalisasi nama kolom ke uppercase
-        df.columns = df.columns.str.upper()
-        
-        # Log struktur data untuk debugging
-        logger.info(f"Kolom dalam file (setelah normalisasi): {df.columns.tolist()}")
-        logger.info(f"Jumlah baris: {len(df)}")
-        logger.info(f"Sample data:\n{df.head()}")
-
-        # Hapus baris kosong
-        df = df.dropna(how='all')
-        logger.info(f"Jumlah baris setelah menghapus baris kosong: {len(df)}")
-
-        success, fail = 0, 0
-        error_details = []
-
-        # Pemetaan kolom yang mungkin
-        column_mapping = {
-            'NUP': ['NUP', 'ID', 'EMPLOYEE_ID'],
-            'TTL': ['TTL', 'PASSWORD', 'TANGGAL_LAHIR', 'BIRTH_DATE'],
-            'ROLE': ['ROLE', 'JABATAN', 'POSITION']
-        }
-
-        # Deteksi kolom yang ada
-        nup_col = None
-        ttl_col = None
-        role_col = None
-
-        for col in df.columns:
-            if col in column_mapping['NUP']:
-                nup_col = col
-            elif col in column_mapping['TTL']:
-                ttl_col = col
-            elif col in column_mapping['ROLE']:
-                role_col = col
-
-        logger.info(f"Kolom terdeteksi - NUP: {nup_col}, TTL: {ttl_col}, ROLE: {role_col}")
-
-        if not nup_col:
-            flash("Kolom NUP tidak ditemukan. Pastikan ada kolom 'NUP' atau 'nup'", "danger")
-            return redirect(url_for("admin_dashboard", tab="user"))
+        # File disimpan dulu supaya bisa diproses worker di latar belakang
+        file_path = get_pending_upload_path(
+            app.config['UPLOAD_FOLDER'], f"{uuid.uuid4().hex}_{secure_filename(file.filename)}"
+        )
+        file.save(file_path)
 
-        if not ttl_col:
-            flash("Kolom TTL/Password tidak ditemukan. Pastikan ada kolom 'TTL' atau 'password'", "danger")
-            return redirect(url_for("admin_dashboard", tab="user"))
+        result = submit_admin_task('import_users', {'file_path': file_path, **user_import_options(request.form)})
+        if result is not None:
+            flash_user_import_result(result)
 
-        for index, row in df.iterrows():
-            try:
-                # Ambil data dari kolom yang terdeteksi
-                nup_raw = row.get(nup_col)
-                ttl_raw = row.get(ttl_col)
-                role_raw = row.get(role_col, 'pegawai') if role_col else 'pegawai'
-
-                # Validasi NUP
-                if pd.isna(nup_raw) or str(nup_raw).strip() == '':
-                    error_details.append(f"Baris {index + 2}: NUP kosong")
-                    fail += 1
-                    continue
-
-                nup_clean = str(nup_raw).strip()
-
-                # Validasi dan konversi TTL
-                if pd.isna(ttl_raw):
-                    error_details.append(f"Baris {index + 2}: TTL kosong")
-                    fail += 1
-                    continue
-
-                # Konversi TTL ke datetime
-                password = None
-                try:
-                    if isinstance(ttl_raw, str):
-                        # Coba berbagai format tanggal
-                        for fmt in ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d']:
-                            try:
-                                ttl_datetime = datetime.strptime(ttl_raw.strip(), fmt)
-                                password = ttl_datetime.strftime('%d%m%Y')
-                                break
-                            except ValueError:
-                                continue
-                        
-                        if not password:
-                            # Jika semua format gagal, coba dengan pandas
-                            ttl_datetime = pd.to_datetime(ttl_raw, errors='coerce')
-                            if not pd.isna(ttl_datetime):
-                                password = ttl_datetime.strftime('%d%m%Y')
-                    else:
-                        # Jika sudah berupa datetime atau timestamp
-                        ttl_datetime = pd.to_datetime(ttl_raw, errors='coerce')
-                        if not pd.isna(ttl_datetime):
-                            password = ttl_datetime.strftime('%d%m%Y')
-                
-                except Exception as date_error:
-                    logger.warning(f"Error konversi tanggal pada baris {index + 2}: {str(date_error)}")
+    except ValueError as e:
+        # Kolom wajib tidak ditemukan
+        flash(str(e), "danger")
+    except Exception as e:
+        logger.error(f"Error saat upload user: {str(e)}", exc_info=True)
+        flash("Terjadi kesalahan saat memproses file", "danger")
 
-                if not password:
-                    error_details.append(f"Baris {index + 2}: Format TTL tidak valid ({ttl_raw})")
-                    fail += 1
-                    continue
+    return redirect(url_for("admin_dashboard", tab="user"))
 
-                role_clean = str(role_raw).strip().lower() if not pd.isna(role_raw) else 'pegawai'
 
-                logger.info(f"Menambahkan user: NUP={nup_clean}, Password={password}, Role={role_clean}")
+# ---------- Upload per chunk (file besar, bisa dilanjutkan) ----------
+@app.route("/admin/uploads", methods=["POST"])
+def create_chunked_upload():
+    if session.get('role') != 'admin':
+        flash('Akses ditolak. Hanya untuk admin', 'danger')
+        return redirect(url_for('login'))
 
-                # Panggil fungsi add_user
-                try:
-                    result = add_user(nup_clean, password, role=role_clean)
-                    
-                    if result is not False:  # add_user bisa return None atau True
-                        success += 1
-                        logger.info(f"User {nup_clean} berhasil ditambahkan")
-                    else:
-                        error_details.append(f"Baris {index + 2}: User {nup_clean} sudah ada atau gagal ditambahkan")
-                        fail += 1
-                        
-                except Exception as add_error:
-                    error_details.append(f"Baris {index + 2}: Error saat menambahkan {nup_clean} - {str(add_error)}")
-                    logger.error(f"Error add_user untuk {nup_clean}: {str(add_error)}")
-                    fail += 1
-
-            except Exception as e:
-                error_msg = f"Baris {index + 2}: {str(e)}"
-                error_details.append(error_msg)
-                logger.warning(f"Gagal memproses baris {index + 2}: {str(e)}")
-                fail += 1
+    # Body JSON: filename, size, kind ('gaji'/'user'), sha256 (opsional, seluruh file),
+    # mode/deactivate_missing untuk kind 'user'
+    data = request.get_json(silent=True) or {}
+    if not allowed_file(str(data.get('filename', ''))):
+        return {"error": "Format file tidak valid. Hanya file Excel (.xlsx) yang diperbolehkan"}, 400
+    try:
+        status = create_upload(
+            app.config['UPLOAD_FOLDER'], data['filename'], data.get('size'), data.get('kind'),
+            # Satu chunk harus muat dalam satu request
+            chunk_size=min(CHUNKED_UPLOAD_CHUNK_BYTES, app.config['MAX_CONTENT_LENGTH']),
+            sha256=data.get('sha256'),
+            options=user_import_options(data) if data.get('kind') == 'user' else {},
+            created_by=session.get('nup'),
+        )
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    return status, 201
 
-        # Flash message dengan detail
-        if success > 0:
-            flash(f"{success} user berhasil ditambahkan", "success")
-        if fail > 0:
-            flash(f"{fail} user gagal ditambahkan", "warning")
-            
-        # Log error details untuk debugging
-        if error_details:
-            logger.warning("Detail error upload user:")
-            for detail in error_details[:15]:  # Log maksimal 15 error pertama
-                logger.warning(detail)
+@app.route("/admin/uploads/<upload_id>", methods=["GET", "DELETE"])
+def chunked_upload(upload_id):
+    if session.get('role') != 'admin':
+        flash('Akses ditolak. Hanya untuk admin', 'danger')
+        return redirect(url_for('login'))
 
-    except Exception as e:
-        logger.error(f"Error saat upload user: {str(e)}", exc_info=True)
-        flash("Terjadi kesalahan saat memproses file", "danger")
+    folder = app.config['UPLOAD_FOLDER']
+    state = load_upload(folder, upload_id)
+    if state is None:
+        return {"error": "Upload tidak ditemukan atau sudah kedaluwarsa"}, 404
+    if request.method == 'DELETE':
+        remove_upload(folder, upload_id)
+        return {"upload_id": upload_id, "removed": True}
+    # Dipakai klien untuk melanjutkan: kirim ulang chunk di 'missing' saja
+    return upload_status(folder, state)
+
+@app.route("/admin/uploads/<upload_id>/chunks/<int:index>", methods=["PUT"])
+def upload_chunk(upload_id, index):
+    if session.get('role') != 'admin':
+        flash('Akses ditolak. Hanya untuk admin', 'danger')
+        return redirect(url_for('login'))
 
-    return redirect(url_for("admin_dashboard", tab="user"))
+    folder = app.config['UPLOAD_FOLDER']
+    state = load_upload(folder, upload_id)
+    if state is None:
+        return {"error": "Upload tidak ditemukan atau sudah kedaluwarsa"}, 404
+    try:
+        # Body mentah (application/octet-stream), dibaca per blok langsung ke disk
+        status = save_chunk(folder, state, index, request.stream, request.headers.get(CHECKSUM_HEADER))
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    return {
+        "upload_id": upload_id,
+        "index": index,
+        "received": len(status['received']),
+        "missing": len(status['missing']),
+    }
+
+@app.route("/admin/uploads/<upload_id>/commit", methods=["POST"])
+def commit_chunked_upload(upload_id):
+    if session.get('role') != 'admin':
+        flash('Akses ditolak. Hanya untuk admin', 'danger')
+        return redirect(url_for('login'))
+
+    folder = app.config['UPLOAD_FOLDER']
+    state = load_upload(folder, upload_id)
+    if state is None:
+        return {"error": "Upload tidak ditemukan atau sudah kedaluwarsa"}, 404
+
+    # File hasil gabungan diproses task yang sama dengan upload_gaji/upload_user
+    if state['kind'] == 'gaji':
+        file_path = get_pending_payroll_path(folder, state['filename'])
+        kind, payload = 'ingest_payroll', {'folder': folder, 'filename': state['filename'], 'pending_path': file_path}
+    else:
+        file_path = get_pending_upload_path(folder, f"{uuid.uuid4().hex}_{state['filename']}")
+        kind, payload = 'import_users', {'file_path': file_path, **state['options']}
+
+    try:
+        assembled = assemble_upload(folder, state, file_path)
+        job_id, result = queue_admin_task(kind, payload)
+    except ValueError as e:
+        # Chunk belum lengkap, checksum file tidak cocok, atau header file tidak valid
+        return {"error": str(e)}, 400
+    except Exception as e:
+        logger.error(f"Error saat memproses upload {upload_id}: {str(e)}", exc_info=True)
+        return {"error": "Terjadi kesalahan saat memproses file"}, 500
+
+    # Klien browser meminta pesan flash untuk ditampilkan setelah redirect ke dashboard
+    if (request.get_json(silent=True) or {}).get('flash'):
+        if job_id is not None:
+            flash_job_queued(job_id)
+        elif state['kind'] == 'gaji':
+            flash_payroll_ingest_result(result)
+        else:
+            flash_user_import_result(result)
+    return {"upload_id": upload_id, "file": assembled, "job_id": job_id, "result": result}
 
 
 # Fungsi helper untuk debug database
@@ -713,20 +708,9 @@ def debug_users():
     
     try:
         # Query semua user dari database untuk debugging
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT nup, role, created_at FROM users ORDER BY created_at DESC LIMIT 50")
-        users = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        
-        users_info = []
-        for user in users:
-            users_info.append({
-                'nup': user[0],
-                'role': user[1],
-                'created_at': user[2]
-            })
+        with get_db_cursor() as cur:
+            cur.execute("SELECT nup, role, created_at FROM users ORDER BY created_at DESC LIMIT 50")
+            users_info = [dict(user) for user in cur.fetchall()]
         
         logger.info(f"Total users dalam database: {len(users_info)}")
         return {"users": users_info, "total": len(users_info)}
@@ -735,6 +719,88 @@ def debug_users():
         logger.error(f"Error debug users: {str(e)}")
         return {"error": str(e)}
 
+@app.route("/admin/jobs")
+def admin_jobs():
+    if session.get('role') != 'admin':
+        flash('Akses ditolak. Hanya untuk admin', 'danger')
+        return redirect(url_for('login'))
+
+    if not app.config['JOB_QUEUE_ENABLED']:
+        return {"enabled": False, "jobs": []}
+    # limit bukan angka memakai default; dibatasi 1..MAX_LISTED_JOBS
+    limit = min(max(request.args.get('limit', 50, type=int), 1), MAX_LISTED_JOBS)
+    return {"enabled": True, "jobs": list_jobs(limit=limit)}
+
+@app.route("/admin/cache_stats")
+def cache_stats():
+    if session.get('role') != 'admin':
+        flash('Akses ditolak. Hanya untuk admin', 'danger')
+        return redirect(url_for('login'))
+
+    return collect_cache_stats()
+
+@app.route("/admin/metrics")
+def admin_metrics():
+    # Prometheus memakai token (METRICS_TOKEN), browser memakai sesi admin
+    if session.get('role') != 'admin' and not metrics.is_scrape_authorized(request.headers.get('Authorization')):
+        flash('Akses ditolak. Hanya untuk admin', 'danger')
+        return redirect(url_for('login'))
+
+    if not metrics.METRICS_ENABLED:
+        return "Metrics tidak aktif (METRICS_ENABLED=0)\n", 404, {'Content-Type': 'text/plain; charset=utf-8'}
+    return metrics.render_prometheus(collect_cache_stats()), 200, {
+        'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'
+    }
+
+@app.route("/admin/profiles", methods=["GET", "POST"])
+def admin_profiles():
+    if session.get('role') != 'admin':
+        flash('Akses ditolak. Hanya untuk admin', 'danger')
+        return redirect(url_for('login'))
+
+    folder = app.config['UPLOAD_FOLDER']
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or request.form
+        changes = {}
+        if 'enabled' in data:
+            changes['enabled'] = str(data['enabled']).lower() in ('1', 'true', 'on', 'yes')
+        for key in ('mode', 'sample_rate', 'routes'):
+            if key in data:
+                changes[key] = data[key]
+        try:
+            if 'duration_minutes' in data:
+                # Batas waktu supaya profiling tidak lupa dimatikan
+                try:
+                    minutes = float(data['duration_minutes'] or 0)
+                except (TypeError, ValueError):
+                    minutes = math.nan
+                if not math.isfinite(minutes):
+                    raise ValueError("duration_minutes harus berupa angka (menit)")
+                changes['expires_at'] = time.time() + minutes * 60 if minutes > 0 else None
+            profiling.save_settings(folder, changes, updated_by=session.get('nup'))
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+    return {
+        "settings": profiling.get_settings(folder),
+        "header": profiling.PROFILE_HEADER,
+        "profiles": profiling.list_profiles(folder),
+    }
+
+@app.route("/admin/profiles/<name>")
+def download_profile(name):
+    if session.get('role') != 'admin':
+        flash('Akses ditolak. Hanya untuk admin', 'danger')
+        return redirect(url_for('login'))
+
+    path = profiling.get_profile_path(app.config['UPLOAD_FOLDER'], name)
+    if path is None:
+        abort(404)
+    if request.args.get('format') == 'text' and name.endswith('.prof'):
+        summary = profiling.profile_summary(path, sort=request.args.get('sort', 'cumulative'))
+        return summary, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+    return send_file(path, as_attachment=True, download_name=name)
+
 # =============================================
 # RUN APLIKASI
 # =============================================
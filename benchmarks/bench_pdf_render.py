@@ -0,0 +1,75 @@
+"""
+Bandingkan latensi per slip antara render lama (satu proses wkhtmltopdf per slip,
+generate_pdf) dan render gabungan (banyak slip per proses, generate_pdfs).
+
+Jalankan dari root repo:
+    python benchmarks/bench_pdf_render.py --slips 50 --chunk 25
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from utils.generate_pdf import generate_pdf, generate_pdfs, build_slip_data
+
+# Tahun fiktif supaya hasil benchmark tidak menimpa slip asli
+BENCH_TAHUN = 1900
+
+
+def make_employee(i):
+    return {
+        'NUP': f"B{i:05d}",
+        'NAMA': f"PEGAWAI {i}",
+        'STATUS_PEGAWAI': 'pkwtt',
+        'BULAN': 1,
+        'TAHUN': BENCH_TAHUN,
+        'PASSWORD': '25051980',
+        'GAJI_DASAR_1': 5000000 + i,
+        'GAJI_DASAR_2': 1500000,
+        'TUNJ_GRADE': 750000,
+        'FOODING': 600000,
+        'TRANSPORT': 400000,
+        'JAMSOSTEK': 100000,
+        'BPJS_KESEHATAN': 50000,
+        'TOTAL_THP': 7250000 + i,
+        'PENGHASILAN_LAIN': 1000000,
+        'PENANDATANGAN': 'Penandatangan',
+        'JABATAN_PENANDATANGAN': 'Kepala Divisi',
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--slips', type=int, default=50)
+    parser.add_argument('--chunk', type=int, default=25)
+    args = parser.parse_args()
+
+    os.chdir(app.root_path)
+    data_list = [build_slip_data(make_employee(i)) for i in range(args.slips)]
+    output_dir = os.path.join('static', 'slips', f"{BENCH_TAHUN}-1")
+
+    results = {'slips': args.slips, 'chunk': args.chunk}
+    with app.test_request_context():
+        start = time.perf_counter()
+        for data in data_list:
+            generate_pdf(data)
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(0, len(data_list), args.chunk):
+            generate_pdfs(data_list[i:i + args.chunk])
+        combined = time.perf_counter() - start
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    results['single_ms_per_slip'] = round(single * 1000 / args.slips, 1)
+    results['combined_ms_per_slip'] = round(combined * 1000 / args.slips, 1)
+    results['speedup'] = round(single / combined, 2) if combined else None
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
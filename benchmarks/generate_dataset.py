@@ -0,0 +1,197 @@
+"""
+Buat data gaji sintetis (gaji_YYYY_MM.xlsx) dan roster user yang cocok untuk
+benchmark dan load test. Semua kolom yang dipakai get_komponen_by_status dan
+template slip terisi untuk status pkwtt, pkwt dan tambahan.
+
+Jalankan dari root repo:
+    python benchmarks/generate_dataset.py --employees 20000 --months 60 --output benchmarks/dataset
+"""
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+STATUSES = ['PKWTT', 'PKWT', 'TAMBAHAN']
+STATUS_WEIGHTS = [0.6, 0.3, 0.1]
+
+# Komponen per status (nama kolom setelah clean_column_names) dan kisaran nilainya
+KOMPONEN = {
+    'PKWTT': {
+        'GAJI_DASAR_1': (4_000_000, 15_000_000), 'GAJI_DASAR_2': (1_000_000, 5_000_000),
+        'TUNJ_GRADE': (500_000, 4_000_000), 'INSENTIF': (0, 3_000_000), 'RAPEL': (0, 1_000_000),
+        'TUNJ_STRUKTURAL': (0, 5_000_000), 'FOODING': (400_000, 900_000), 'TRANSPORT': (300_000, 800_000),
+        'TELPON': (0, 300_000), 'BENSIN': (0, 600_000), 'PERUMAHAN': (0, 2_000_000),
+        'ETOLL': (0, 400_000), 'KENDARAAN': (0, 3_000_000),
+        'IDP': (0, 200_000), 'PIP': (0, 200_000), 'DPLK': (100_000, 500_000), 'SIKOP': (50_000, 100_000),
+        'PINKOP': (0, 2_000_000), 'SP': (20_000, 50_000), 'JAMSOSTEK': (100_000, 400_000),
+        'JAMINAN_PENSIUN': (50_000, 200_000), 'BPJS_KESEHATAN': (50_000, 200_000), 'LAIN_LAIN': (0, 300_000),
+    },
+    'PKWT': {
+        'GAJI_KONTRAK': (4_000_000, 9_000_000), 'BANTUAN_DPLK': (100_000, 300_000),
+        'INSENTIF': (0, 1_500_000), 'FOODING': (400_000, 900_000), 'TRANSPORT': (300_000, 800_000),
+        'DPLK': (100_000, 300_000), 'SIKOP': (50_000, 100_000), 'PINKOP': (0, 1_000_000),
+        'SP': (20_000, 50_000), 'JAMSOSTEK': (80_000, 250_000), 'JAMINAN_PENSIUN': (40_000, 120_000),
+        'BPJS_KESEHATAN': (40_000, 120_000), 'LAIN_LAIN': (0, 200_000),
+    },
+    'TAMBAHAN': {
+        'GAJI_KONTRAK': (3_000_000, 6_000_000), 'PERUMAHAN': (0, 1_000_000), 'TRANSPORT': (200_000, 500_000),
+        'SIKOP': (50_000, 100_000), 'PINKOP': (0, 500_000), 'JAMSOSTEK': (60_000, 150_000),
+        'JAMINAN_PENSIUN': (30_000, 80_000), 'BPJS_KESEHATAN': (30_000, 80_000),
+    },
+}
+THP_COLUMNS = {'GAJI_DASAR_1', 'GAJI_DASAR_2', 'TUNJ_GRADE', 'GAJI_KONTRAK', 'BANTUAN_DPLK'}
+POTONGAN_COLUMNS = {
+    'IDP', 'PIP', 'DPLK', 'SIKOP', 'PINKOP', 'SP', 'JAMSOSTEK', 'JAMINAN_PENSIUN', 'BPJS_KESEHATAN', 'LAIN_LAIN'
+}
+ALL_KOMPONEN = sorted({col for cols in KOMPONEN.values() for col in cols})
+
+UNITS = ['Divisi Human Capital', 'Divisi Keuangan', 'Divisi Teknik', 'Cabang Jakarta', 'Cabang Surabaya', 'Cabang Batam']
+JABATAN = ['Staf', 'Surveyor', 'Supervisor', 'Asisten Manajer', 'Manajer', 'Kepala Cabang']
+BULAN_INDONESIA = ['Januari', 'Februari', 'Maret', 'April', 'Mei', 'Juni', 'Juli',
+                   'Agustus', 'September', 'Oktober', 'November', 'Desember']
+
+
+def make_employees(count, seed):
+    """
+    Data tetap per pegawai (sama di setiap bulan). TTL sengaja bercampur
+    datetime, teks dd/mm/yyyy dan serial Excel seperti file asli.
+    """
+    rng = np.random.default_rng(seed)
+    birth = pd.to_datetime('1965-01-01') + pd.to_timedelta(rng.integers(0, 35 * 365, count), unit='D')
+    ttl_kind = rng.choice(3, count, p=[0.6, 0.3, 0.1])
+    ttl = np.empty(count, dtype=object)
+    for i, (kind, date) in enumerate(zip(ttl_kind, birth)):
+        if kind == 0:
+            ttl[i] = date.to_pydatetime()
+        elif kind == 1:
+            ttl[i] = date.strftime('%d/%m/%Y')
+        else:
+            ttl[i] = float((date - pd.Timestamp('1899-12-30')).days)
+
+    nups = np.char.mod('%06d', 100000 + np.arange(count))
+    return pd.DataFrame({
+        'NUP': nups,
+        'NAMA': [f"PEGAWAI SINTETIS {i + 1}" for i in range(count)],
+        'STATUS_PEGAWAI': rng.choice(STATUSES, count, p=STATUS_WEIGHTS),
+        'TTL': ttl,
+        'BIRTH_DATE': birth,
+        'GRADE': rng.integers(1, 20, count),
+        'JABATAN': rng.choice(JABATAN, count),
+        'UNIT_KERJA': rng.choice(UNITS, count),
+        'EMAIL': [f"pegawai{i + 1}@example.com" for i in range(count)],
+    })
+
+def make_period(employees, tahun, bulan, seed):
+    """
+    Satu bulan data gaji: komponen diacak dalam kisaran per status, total
+    dihitung dari komponen sehingga konsisten dengan slip.
+    """
+    rng = np.random.default_rng(seed)
+    count = len(employees)
+    df = employees.drop(columns=['BIRTH_DATE']).copy()
+    status = df['STATUS_PEGAWAI'].to_numpy()
+
+    thp = np.zeros(count)
+    lain = np.zeros(count)
+    potongan = np.zeros(count)
+    for col in ALL_KOMPONEN:
+        values = np.zeros(count)
+        for st, komponen in KOMPONEN.items():
+            if col not in komponen:
+                continue
+            low, high = komponen[col]
+            mask = status == st
+            values[mask] = np.round(rng.uniform(low, high, mask.sum()), -3)
+        df[col] = values
+        if col in THP_COLUMNS:
+            thp += values
+        elif col in POTONGAN_COLUMNS:
+            potongan += values
+        else:
+            lain += values
+
+    df['TOTAL_THP'] = thp
+    df['THP'] = thp
+    df['PENGHASILAN_LAIN'] = lain
+    df['THP_GROSS_II'] = thp + lain
+    df['JML_POTONGAN'] = potongan
+    df['THP_NET'] = thp + lain - potongan
+    df['BULAN'] = bulan
+    df['TAHUN'] = tahun
+    df['TEMPAT'] = 'Jakarta'
+    df['TANGGAL'] = f"25 {BULAN_INDONESIA[bulan - 1]} {tahun}"
+    df['PENANDATANGAN'] = 'PENANDATANGAN SINTETIS'
+    df['JABATAN_PENANDATANGAN'] = 'Kepala Divisi Human Capital'
+
+    # Header seperti di workbook asli (spasi, huruf campur) supaya clean_column_names ikut teruji
+    df.columns = [col.replace('_', ' ').title() if col in ALL_KOMPONEN else col for col in df.columns]
+    return df
+
+def _write_period(args):
+    employees, tahun, bulan, seed, output = args
+    path = os.path.join(output, f"gaji_{tahun}_{bulan:02d}.xlsx")
+    make_period(employees, tahun, bulan, seed).to_excel(path, index=False)
+    return path
+
+def periods(start, months):
+    tahun, bulan = map(int, start.split('-'))
+    for _ in range(months):
+        yield tahun, bulan
+        bulan += 1
+        if bulan > 12:
+            tahun, bulan = tahun + 1, 1
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--employees', type=int, default=1000)
+    parser.add_argument('--months', type=int, default=12)
+    parser.add_argument('--start', default='2021-01', help='Periode pertama (YYYY-MM)')
+    parser.add_argument('--output', default=os.path.join('benchmarks', 'dataset'))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    start = time.perf_counter()
+    employees = make_employees(args.employees, args.seed)
+
+    roster = pd.DataFrame({
+        'NUP': employees['NUP'],
+        'TTL': employees['BIRTH_DATE'].dt.strftime('%Y-%m-%d'),
+        'ROLE': 'pegawai',
+    })
+    roster_path = os.path.join(args.output, 'users_roster.xlsx')
+    roster.to_excel(roster_path, index=False)
+
+    jobs = [
+        (employees, tahun, bulan, args.seed + i + 1, args.output)
+        for i, (tahun, bulan) in enumerate(periods(args.start, args.months))
+    ]
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        files = list(pool.map(_write_period, jobs))
+
+    meta = {
+        'employees': args.employees,
+        'months': args.months,
+        'start': args.start,
+        'seed': args.seed,
+        'files': [os.path.basename(f) for f in files],
+        'roster': os.path.basename(roster_path),
+        # Password login pegawai = TTL ddmmyyyy
+        'sample_login': {'nup': employees['NUP'].iat[0], 'password': employees['BIRTH_DATE'].iat[0].strftime('%d%m%Y')},
+    }
+    with open(os.path.join(args.output, 'dataset.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    print(json.dumps({
+        'output': args.output,
+        'employees': args.employees,
+        'months': args.months,
+        'elapsed': round(time.perf_counter() - start, 2),
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Stub HTTP lokal pengganti endpoint token OAuth dan sendMail Microsoft Graph,
+untuk menguji pengiriman massal tanpa akun Graph sungguhan.
+
+Jalankan dari root repo:
+    python benchmarks/graph_stub.py --port 8081 --throttle-every 25
+lalu kirim dengan:
+    EMAIL_PROVIDER=graph EMAIL_USER=hc@example.com \\
+    GRAPH_TOKEN_URL=http://127.0.0.1:8081/token \\
+    GRAPH_API_URL=http://127.0.0.1:8081/v1.0 \\
+    python send_slips.py --period 2025-01 --skip-pdf
+
+GET /stats mengembalikan jumlah token yang diminta, email diterima dan 429.
+"""
+import re
+import sys
+import json
+import time
+import base64
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SENDMAIL_PATH = re.compile(r'^/v1\.0/users/[^/]+/sendMail$')
+
+_lock = threading.Lock()
+stats = {'tokens': 0, 'sent': 0, 'throttled': 0, 'rejected': 0, 'connections': 0}
+
+
+class GraphStubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 supaya klien bisa memakai ulang koneksi (keep-alive)
+    protocol_version = 'HTTP/1.1'
+    token_ttl = 3600
+    throttle_every = 0
+    retry_after = 1
+    latency = 0.0
+
+    def setup(self):
+        super().setup()
+        with _lock:
+            stats['connections'] += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload=None, headers=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            with _lock:
+                self._reply(200, dict(stats))
+        else:
+            self._reply(404, {'error': 'not found'})
+
+    def do_POST(self):
+        body = self._read_body()
+
+        if self.path == '/token':
+            with _lock:
+                stats['tokens'] += 1
+                token = f"stub-token-{stats['tokens']}"
+            self._reply(200, {'access_token': token, 'token_type': 'Bearer', 'expires_in': self.token_ttl})
+            return
+
+        if not SENDMAIL_PATH.match(self.path):
+            self._reply(404, {'error': 'not found'})
+            return
+
+        if not self.headers.get('Authorization', '').startswith('Bearer stub-token-'):
+            self._reply(401, {'error': 'InvalidAuthenticationToken'})
+            return
+
+        with _lock:
+            request_no = stats['sent'] + stats['throttled'] + stats['rejected'] + 1
+            throttle = self.throttle_every and request_no % self.throttle_every == 0
+            if throttle:
+                stats['throttled'] += 1
+        if throttle:
+            self._reply(429, {'error': 'TooManyRequests'}, {'Retry-After': str(self.retry_after)})
+            return
+
+        # Validasi lampiran seperti Graph: contentBytes harus base64 yang valid
+        try:
+            message = json.loads(body)['message']
+            for attachment in message.get('attachments', []):
+                base64.b64decode(attachment['contentBytes'], validate=True)
+        except (ValueError, KeyError, TypeError):
+            with _lock:
+                stats['rejected'] += 1
+            self._reply(400, {'error': 'ErrorInvalidRequest'})
+            return
+
+        if self.latency:
+            time.sleep(self.latency)
+        with _lock:
+            stats['sent'] += 1
+        self._reply(202)
+
+
+def make_server(host='127.0.0.1', port=8081, throttle_every=0, retry_after=1, latency=0.0, token_ttl=3600):
+    handler = type('Handler', (GraphStubHandler,), {
+        'throttle_every': throttle_every,
+        'retry_after': retry_after,
+        'latency': latency,
+        'token_ttl': token_ttl,
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--throttle-every', type=int, default=0, help='Balas 429 setiap N request sendMail (0 = tidak pernah)')
+    parser.add_argument('--retry-after', type=int, default=1, help='Nilai header Retry-After (detik)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Jeda per sendMail (detik)')
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.throttle_every, args.retry_after, args.latency)
+    print(f"Stub Graph berjalan di http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
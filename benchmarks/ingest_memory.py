@@ -0,0 +1,113 @@
+"""
+Bandingkan puncak memori (RSS high-water mark) ingest workbook gaji: pd.read_excel
+seluruh sheet (cara lama) vs streaming per chunk (build_period_store), untuk
+beberapa ukuran file. Setiap pengukuran dijalankan di proses baru supaya puncaknya
+tidak tercampur.
+
+Jalankan dari root repo:
+    python benchmarks/ingest_memory.py --sizes 2000 10000 40000 --output memori.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+METHODS = ('read_excel', 'stream')
+
+
+def run_child(method, path, chunk_rows):
+    """
+    Satu pengukuran di proses ini (dipanggil lewat --child).
+    """
+    import pandas as pd
+    from utils.memory import MemoryHighWater
+    from utils import period_store
+    from utils.salary_schema import total_mismatches
+
+    # Impor dan inisialisasi library sebelum pengukuran dimulai
+    pd.DataFrame({'a': [1]}).to_parquet(os.devnull)
+
+    start = time.perf_counter()
+    with MemoryHighWater() as memory:
+        if method == 'read_excel':
+            df = period_store.read_period_workbook(path)
+            period_store._to_storable(df).to_parquet(os.path.splitext(path)[0] + '.old.parquet', index=False)
+            rows = len(df)
+            total_mismatches(df)
+        else:
+            rows = period_store.build_period_store(path, chunk_rows=chunk_rows)['rows']
+            for chunk in period_store.iter_period_chunks(path, chunk_rows):
+                total_mismatches(chunk)
+    return {
+        'method': method,
+        'rows': rows,
+        'elapsed': round(time.perf_counter() - start, 2),
+        **memory.as_dict(),
+    }
+
+def make_workbook(folder, employees, seed):
+    from generate_dataset import make_employees, make_period
+
+    # Nama file dipakai untuk BULAN/TAHUN, jadi tiap ukuran disimpan di subfolder sendiri
+    target = os.path.join(folder, str(employees))
+    os.makedirs(target, exist_ok=True)
+    path = os.path.join(target, 'gaji_2021_01.xlsx')
+    make_period(make_employees(employees, seed), 2021, 1, seed + 1).to_excel(path, index=False)
+    return path
+
+def measure(method, path, chunk_rows):
+    output = subprocess.check_output(
+        [sys.executable, os.path.abspath(__file__), '--child', method, path, '--chunk-rows', str(chunk_rows)],
+        text=True,
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2000, 10000, 40000],
+                        help='Jumlah baris (pegawai) per workbook yang diuji')
+    parser.add_argument('--chunk-rows', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Simpan hasil JSON ke file ini')
+    parser.add_argument('--child', nargs=2, metavar=('METHOD', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        method, path = args.child
+        print(json.dumps(run_child(method, path, args.chunk_rows)))
+        return
+
+    folder = tempfile.mkdtemp(prefix='ingest-memory-')
+    results = []
+    try:
+        for size in args.sizes:
+            path = make_workbook(folder, size, args.seed)
+            size_mb = round(os.path.getsize(path) / (1024 * 1024), 2)
+            for method in METHODS:
+                result = measure(method, path, args.chunk_rows)
+                result['file_mb'] = size_mb
+                results.append(result)
+                print(
+                    f"{size:>8} baris {size_mb:>7.2f} MB  {method:<10} "
+                    f"puncak {result['peak_mb']:>8} MB (+{result['peak_delta_mb']} MB)  {result['elapsed']} detik",
+                    file=sys.stderr,
+                )
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    output = json.dumps({'chunk_rows': args.chunk_rows, 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,488 @@
+"""
+Load test end-to-end: N pegawai simulasi menjalankan alur login -> slip ->
+select_month -> download secara bersamaan, sementara admin mengupload data gaji.
+Hasil per route: throughput, latensi p50/p95/p99 dan error rate (JSON).
+
+Tanpa --url, Postgres lokal sementara dijalankan (initdb/pg_ctl dari PATH atau
+pg_config; jika tidak ada, paket pgserver bila terpasang), lalu diisi dengan
+dataset dari benchmarks/generate_dataset.py.
+
+Jalankan dari root repo:
+    python benchmarks/generate_dataset.py --employees 2000 --months 6
+    python benchmarks/load_test.py --users 50 --duration 60
+    python benchmarks/load_test.py --users 200 --server gunicorn --gunicorn-workers 4 --gunicorn-threads 4
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --users 100   # server sudah berisi dataset
+"""
+import os
+import sys
+import glob
+import json
+import math
+import time
+import shutil
+import random
+import signal
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from collections import defaultdict
+
+import pandas as pd
+import requests
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+ADMIN_NUP = 'admin'
+ADMIN_PASSWORD = 'admin123'
+REQUEST_TIMEOUT = 120
+
+
+# ==========================
+# POSTGRES LOKAL
+# ==========================
+
+def find_postgres_bindir():
+    """
+    Folder berisi initdb dan pg_ctl, None jika server Postgres tidak terpasang
+    (pg_config dari libpq-dev saja tidak cukup).
+    """
+    candidates = []
+    pg_ctl = shutil.which('pg_ctl')
+    if pg_ctl:
+        candidates.append(os.path.dirname(pg_ctl))
+    try:
+        candidates.append(subprocess.check_output(['pg_config', '--bindir'], text=True).strip())
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    candidates += sorted(glob.glob('/usr/lib/postgresql/*/bin'), reverse=True)
+    for bindir in candidates:
+        if os.path.exists(os.path.join(bindir, 'initdb')) and os.path.exists(os.path.join(bindir, 'pg_ctl')):
+            return bindir
+    return None
+
+class EmbeddedPostgres:
+    """
+    Cluster Postgres sementara di base_dir, hanya lewat unix socket (tanpa port
+    TCP) dan tanpa fsync. Dihapus saat stop().
+    """
+
+    def __init__(self, base_dir, max_connections=300):
+        self.base_dir = base_dir
+        self.data_dir = os.path.join(base_dir, 'pgdata')
+        self.max_connections = max_connections
+        self.bindir = None
+        self._pgserver = None
+
+    def start(self):
+        self.bindir = find_postgres_bindir()
+        if self.bindir is None:
+            return self._start_pgserver()
+
+        initdb = os.path.join(self.bindir, 'initdb')
+        pg_ctl = os.path.join(self.bindir, 'pg_ctl')
+        subprocess.run(
+            [initdb, '-D', self.data_dir, '-U', 'postgres', '-A', 'trust', '--no-sync'],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        options = (
+            f"-k {self.base_dir} -c listen_addresses='' -c fsync=off "
+            f"-c synchronous_commit=off -c max_connections={self.max_connections}"
+        )
+        subprocess.run(
+            [pg_ctl, '-D', self.data_dir, '-o', options, '-w', '-l', os.path.join(self.base_dir, 'postgres.log'), 'start'],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        return f"postgresql://postgres@/postgres?host={self.base_dir}"
+
+    def _start_pgserver(self):
+        try:
+            import pgserver
+        except ImportError:
+            raise SystemExit(
+                "Postgres tidak ditemukan: pasang paket postgresql (initdb/pg_ctl), "
+                "pip install pgserver, atau pakai --database-url"
+            )
+        # pgserver memakai konfigurasi bawaannya (max_connections 100)
+        self._pgserver = pgserver.get_server(self.data_dir, cleanup_mode='stop')
+        return self._pgserver.get_uri()
+
+    def stop(self):
+        if self._pgserver is not None:
+            self._pgserver.cleanup()
+        elif self.bindir is not None:
+            subprocess.run(
+                [os.path.join(self.bindir, 'pg_ctl'), '-D', self.data_dir, '-m', 'fast', '-w', 'stop'],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+
+
+# ==========================
+# SEED DATA
+# ==========================
+
+def load_credentials(dataset, count):
+    """
+    (NUP, password) untuk pegawai simulasi, diambil dari roster dataset
+    (TTL di roster berformat YYYY-MM-DD, password = ddmmyyyy).
+    Modul aplikasi belum boleh diimport di sini: DATABASE_URL belum di-set.
+    """
+    with open(os.path.join(dataset, 'dataset.json')) as f:
+        meta = json.load(f)
+    roster = pd.read_excel(os.path.join(dataset, meta['roster']), dtype={'NUP': str, 'TTL': str}).head(count)
+    credentials = [
+        (nup, datetime.strptime(ttl[:10], '%Y-%m-%d').strftime('%d%m%Y'))
+        for nup, ttl in zip(roster['NUP'], roster['TTL'])
+    ]
+    return meta, roster, credentials
+
+def seed_database(app_module, dataset, meta, roster, folder):
+    """
+    Buat tabel dan admin default, muat semua periode dataset (lewat task admin
+    yang sama dengan upload) dan import user simulasi.
+    """
+    from utils.jobs import run_task
+    from utils.user_import import import_users
+
+    app_module.initialize_database()
+    for name in meta['files']:
+        shutil.copy(os.path.join(dataset, name), os.path.join(folder, name))
+        run_task('ingest_payroll', {'folder': folder, 'filename': name})
+    success, failed, errors = import_users(roster, 'NUP', 'TTL', 'ROLE')
+    if failed:
+        raise SystemExit(f"Gagal import {failed} user simulasi: {errors[:5]}")
+    return success
+
+
+# ==========================
+# SERVER
+# ==========================
+
+def prepare_workdir(workdir):
+    """
+    Aplikasi membaca aset dan menulis PDF relatif ke folder kerja (static/...):
+    server dijalankan dari workdir berisi symlink aset repo dan static/slips
+    sendiri, supaya slip sintetis tidak tercampur dengan slip asli.
+    """
+    static_dir = os.path.join(workdir, 'static')
+    os.makedirs(os.path.join(static_dir, 'slips'))
+    for name in os.listdir(os.path.join(ROOT_DIR, 'static')):
+        if name != 'slips':
+            os.symlink(os.path.join(ROOT_DIR, 'static', name), os.path.join(static_dir, name))
+    os.chdir(workdir)
+
+def start_inprocess_server(app):
+    from werkzeug.serving import make_server
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return f"http://127.0.0.1:{server.server_port}", server.shutdown
+
+def start_gunicorn(workers, threads, port):
+    process = subprocess.Popen(
+        [
+            sys.executable, '-m', 'gunicorn', '--bind', f"127.0.0.1:{port}",
+            '--workers', str(workers), '--threads', str(threads),
+            '--timeout', str(REQUEST_TIMEOUT), '--log-level', 'warning',
+            '--pythonpath', ROOT_DIR, 'app:app',
+        ],
+        env=os.environ.copy()
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("gunicorn berhenti saat startup")
+        try:
+            requests.get(base_url + '/', timeout=5)
+            break
+        except requests.RequestException:
+            time.sleep(0.2)
+    else:
+        process.kill()
+        raise SystemExit("gunicorn tidak merespons dalam 60 detik")
+
+    def stop():
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return base_url, stop
+
+
+# ==========================
+# KLIEN
+# ==========================
+
+class Recorder:
+    """
+    Kumpulkan latensi dan error per route dari semua thread klien.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+
+    def add(self, route, elapsed, error=None):
+        with self._lock:
+            self.latencies[route].append(elapsed)
+            if error:
+                self.errors[route][error] += 1
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    # Nearest-rank
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def timed_request(client, recorder, route, method, url, expect_status, expect_location=None,
+                  expect_type=None, **kwargs):
+    """
+    Satu request tanpa mengikuti redirect; dianggap error jika status, lokasi
+    redirect atau content-type tidak sesuai (aplikasi mengarahkan ke halaman
+    lain saat terjadi kesalahan).
+    """
+    start = time.perf_counter()
+    error = None
+    try:
+        response = client.request(method, url, allow_redirects=False, timeout=REQUEST_TIMEOUT, **kwargs)
+        if response.status_code != expect_status:
+            error = f"status {response.status_code}"
+            location = response.headers.get('Location', '')
+            if location:
+                error += f" -> {location.split('?')[0].replace(client.base_url, '') or '/'}"
+        elif expect_location and not response.headers.get('Location', '').split('?')[0].endswith(expect_location):
+            error = f"redirect ke {response.headers.get('Location')}"
+        elif expect_type and not response.headers.get('Content-Type', '').startswith(expect_type):
+            error = f"content-type {response.headers.get('Content-Type')}"
+    except requests.RequestException as e:
+        error = type(e).__name__
+    recorder.add(route, time.perf_counter() - start, error)
+    return error is None
+
+def make_client(base_url):
+    client = requests.Session()
+    client.base_url = base_url
+    return client
+
+def employee_loop(base_url, nup, password, files, recorder, stop_at, download, think_time):
+    client = make_client(base_url)
+    while time.monotonic() < stop_at:
+        if not timed_request(client, recorder, 'POST /', 'POST', base_url + '/', 302, '/slip',
+                             data={'nup': nup, 'password': password}):
+            time.sleep(1)
+            continue
+        timed_request(client, recorder, 'GET /slip', 'GET', base_url + '/slip', 200)
+        time.sleep(think_time)
+
+        timed_request(client, recorder, 'GET /select_month', 'GET', base_url + '/select_month', 200)
+        timed_request(client, recorder, 'POST /select_month', 'POST', base_url + '/select_month', 302, '/slip',
+                      data={'file': random.choice(files)})
+        timed_request(client, recorder, 'GET /slip', 'GET', base_url + '/slip', 200)
+        time.sleep(think_time)
+
+        if download:
+            timed_request(client, recorder, 'GET /download', 'GET', base_url + '/download', 200,
+                          expect_type='application/pdf')
+        timed_request(client, recorder, 'GET /logout', 'GET', base_url + '/logout', 302, '/')
+        time.sleep(think_time)
+
+def admin_loop(base_url, dataset, files, recorder, stop_at, interval):
+    """
+    Admin mengupload ulang file gaji secara bergiliran dan membuka rekap periode.
+    Error aplikasi saat upload hanya tercatat di log server (respons selalu redirect).
+    """
+    client = make_client(base_url)
+    if not timed_request(client, recorder, 'POST / (admin)', 'POST', base_url + '/', 302, '/admin',
+                         data={'nup': ADMIN_NUP, 'password': ADMIN_PASSWORD}):
+        return
+    index = 0
+    while time.monotonic() < stop_at:
+        name = files[index % len(files)]
+        index += 1
+        with open(os.path.join(dataset, name), 'rb') as f:
+            timed_request(client, recorder, 'POST /admin/upload_gaji', 'POST', base_url + '/admin/upload_gaji',
+                          302, '/admin', files={'file': (name, f)})
+        tahun, bulan = name[len('gaji_'):-len('.xlsx')].split('_')
+        timed_request(client, recorder, 'GET /admin', 'GET', base_url + '/admin', 200,
+                      params={'tab': 'slip', 'periode': f"{tahun}-{bulan}"})
+        time.sleep(interval)
+
+def fetch_server_stats(base_url):
+    client = make_client(base_url)
+    try:
+        client.post(base_url + '/', data={'nup': ADMIN_NUP, 'password': ADMIN_PASSWORD},
+                    allow_redirects=False, timeout=REQUEST_TIMEOUT)
+        response = client.get(base_url + '/admin/cache_stats', allow_redirects=False, timeout=REQUEST_TIMEOUT)
+        return response.json() if response.status_code == 200 else None
+    except (requests.RequestException, ValueError):
+        return None
+
+
+# ==========================
+# LAPORAN
+# ==========================
+
+def summarize(recorder, elapsed):
+    routes = {}
+    total_requests = total_errors = 0
+    for route, latencies in sorted(recorder.latencies.items()):
+        values = sorted(latencies)
+        errors = sum(recorder.errors[route].values())
+        total_requests += len(values)
+        total_errors += errors
+        routes[route] = {
+            'requests': len(values),
+            'errors': errors,
+            'error_rate': round(errors / len(values), 4),
+            'throughput_rps': round(len(values) / elapsed, 2),
+            'mean_ms': round(sum(values) * 1000 / len(values), 1),
+            'p50_ms': round(percentile(values, 50) * 1000, 1),
+            'p95_ms': round(percentile(values, 95) * 1000, 1),
+            'p99_ms': round(percentile(values, 99) * 1000, 1),
+            'max_ms': round(values[-1] * 1000, 1),
+            'error_kinds': dict(recorder.errors[route]),
+        }
+    return {
+        'requests': total_requests,
+        'errors': total_errors,
+        'error_rate': round(total_errors / total_requests, 4) if total_requests else 0.0,
+        'throughput_rps': round(total_requests / elapsed, 2),
+        'routes': routes,
+    }
+
+def print_table(summary):
+    print(f"{'route':28} {'req':>7} {'err%':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}", file=sys.stderr)
+    for route, r in summary['routes'].items():
+        print(
+            f"{route:28} {r['requests']:>7} {r['error_rate'] * 100:>5.1f}% {r['throughput_rps']:>8.1f} "
+            f"{r['p50_ms']:>6.0f}ms {r['p95_ms']:>6.0f}ms {r['p99_ms']:>6.0f}ms",
+            file=sys.stderr
+        )
+    print(f"total {summary['requests']} request, {summary['throughput_rps']} rps, "
+          f"error rate {summary['error_rate'] * 100:.2f}%", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--dataset', default=os.path.join('benchmarks', 'dataset'))
+    parser.add_argument('--users', type=int, default=20, help='Jumlah pegawai simulasi bersamaan')
+    parser.add_argument('--duration', type=float, default=30, help='Lama pengujian (detik)')
+    parser.add_argument('--ramp-up', type=float, default=5, help='Pegawai mulai bertahap dalam N detik')
+    parser.add_argument('--think-time', type=float, default=0.5, help='Jeda antar halaman per pegawai (detik)')
+    parser.add_argument('--admin-interval', type=float, default=10,
+                        help='Jeda antar upload admin (detik); 0 = tanpa admin')
+    parser.add_argument('--no-download', action='store_true', help='Lewati /download (mis. tanpa wkhtmltopdf)')
+    parser.add_argument('--server', choices=['inprocess', 'gunicorn'], default='inprocess')
+    parser.add_argument('--gunicorn-workers', type=int, default=2)
+    parser.add_argument('--gunicorn-threads', type=int, default=1)
+    parser.add_argument('--port', type=int, default=8765, help='Port gunicorn')
+    parser.add_argument('--url', help='Uji server yang sudah berjalan (tanpa Postgres lokal dan seed)')
+    parser.add_argument('--database-url', help='Pakai database ini alih-alih Postgres lokal sementara')
+    parser.add_argument('--output', help='Simpan hasil JSON ke file ini')
+    parser.add_argument('--verbose', action='store_true', help='Tampilkan log aplikasi')
+    args = parser.parse_args()
+
+    dataset = os.path.abspath(args.dataset)
+    meta, roster, credentials = load_credentials(dataset, args.users)
+    if len(credentials) < args.users:
+        raise SystemExit(f"Dataset hanya berisi {len(credentials)} pegawai")
+
+    workdir = tempfile.mkdtemp(prefix='slip-loadtest-')
+    cleanups = [lambda: shutil.rmtree(workdir, ignore_errors=True)]
+    try:
+        if args.url:
+            base_url = args.url.rstrip('/')
+        else:
+            database_url = args.database_url
+            if not database_url:
+                postgres = EmbeddedPostgres(os.path.join(workdir, 'pg'))
+                os.makedirs(postgres.base_dir)
+                database_url = postgres.start()
+                cleanups.append(postgres.stop)
+
+            prepare_workdir(workdir)
+            # Harus di-set sebelum app diimport (dibaca saat import modul)
+            folder = os.path.join(workdir, 'data')
+            os.environ.update({
+                'DATABASE_URL': database_url,
+                'UPLOAD_FOLDER': folder,
+                'PAYROLL_BACKEND': os.getenv('PAYROLL_BACKEND', 'postgres'),
+                'SESSION_BACKEND': os.getenv('SESSION_BACKEND', 'postgres'),
+                'JOB_QUEUE_ENABLED': '0',
+            })
+            import app as app_module
+            if not args.verbose:
+                logging.getLogger().setLevel(logging.WARNING)
+                logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+            start = time.perf_counter()
+            seeded = seed_database(app_module, dataset, meta, roster, folder)
+            print(f"Seed: {len(meta['files'])} periode, {seeded} user "
+                  f"({time.perf_counter() - start:.1f} detik)", file=sys.stderr)
+
+            if args.server == 'gunicorn':
+                base_url, stop_server = start_gunicorn(args.gunicorn_workers, args.gunicorn_threads, args.port)
+            else:
+                base_url, stop_server = start_inprocess_server(app_module.app)
+            cleanups.append(stop_server)
+
+        print(f"Menjalankan {args.users} pegawai selama {args.duration:.0f} detik terhadap {base_url}", file=sys.stderr)
+        recorder = Recorder()
+        started = time.monotonic()
+        stop_at = started + args.ramp_up + args.duration
+        threads = []
+        for i, (nup, password) in enumerate(credentials):
+            delay = args.ramp_up * i / max(len(credentials), 1)
+            thread = threading.Timer(delay, employee_loop, args=(
+                base_url, nup, password, meta['files'], recorder, stop_at, not args.no_download, args.think_time
+            ))
+            thread.daemon = True
+            threads.append(thread)
+        if args.admin_interval > 0:
+            threads.append(threading.Thread(
+                target=admin_loop, args=(base_url, dataset, meta['files'], recorder, stop_at, args.admin_interval),
+                daemon=True
+            ))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        summary = summarize(recorder, elapsed)
+        print_table(summary)
+        report = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'users': args.users,
+                'duration': round(elapsed, 1),
+                'ramp_up': args.ramp_up,
+                'think_time': args.think_time,
+                'download': not args.no_download,
+                'server': 'external' if args.url else args.server,
+                'gunicorn_workers': args.gunicorn_workers if args.server == 'gunicorn' else None,
+                'gunicorn_threads': args.gunicorn_threads if args.server == 'gunicorn' else None,
+                'dataset': {'employees': meta['employees'], 'months': meta['months']},
+            },
+            'summary': summary,
+            'server_stats': fetch_server_stats(base_url),
+        }
+        output = json.dumps(report, indent=2, default=str)
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(output)
+        print(output)
+    finally:
+        for cleanup in reversed(cleanups):
+            cleanup()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""
+Micro-benchmark untuk jalur panas pemrosesan data gaji, hasil dalam JSON supaya
+bisa dibandingkan antar commit.
+
+Jalankan dari root repo (dataset dari benchmarks/generate_dataset.py):
+    python benchmarks/run_benchmarks.py --dataset benchmarks/dataset --output hasil.json
+    python benchmarks/run_benchmarks.py --dataset benchmarks/dataset --compare hasil.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.helpers import (
+    clean_column_names, format_password_ttl, format_password_column, get_komponen_by_status, format_rupiah
+)
+from utils.period_store import load_period, remove_period_store, read_period_workbook
+from utils.salary_schema import period_totals, total_mismatches
+from utils.generate_barcode import generate_payslip_barcode_uri, clear_barcode_cache
+
+# Tahun fiktif supaya PDF benchmark tidak menimpa slip asli
+BENCH_TAHUN = 1900
+
+
+def measure(fn, repeat, ops):
+    """
+    Jalankan fn() sebanyak repeat kali; ops = jumlah operasi per pemanggilan.
+    Waktu per operasi diambil dari putaran tercepat (paling sedikit noise).
+    """
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    best = min(runs)
+    return {
+        'ops': ops,
+        'repeat': repeat,
+        'best_ms': round(best * 1000, 3),
+        'mean_ms': round(statistics.mean(runs) * 1000, 3),
+        'stdev_ms': round(statistics.stdev(runs) * 1000, 3) if repeat > 1 else 0.0,
+        'per_op_us': round(best * 1e6 / ops, 3) if ops else None,
+        'ops_per_second': round(ops / best, 1) if best > 0 else None,
+    }
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ==========================
+# BENCHMARK
+# ==========================
+
+def bench_load_periods(files, repeat):
+    """
+    Muat semua periode: cold = parsing .xlsx + membangun store kolumnar,
+    warm = membaca store yang sudah ada. Pengganti load_all_salary_data lama.
+    """
+    def cold():
+        for path in files:
+            remove_period_store(path)
+            load_period(path)
+
+    def warm():
+        for path in files:
+            load_period(path)
+
+    return {
+        'load_periods_cold': measure(cold, repeat, len(files)),
+        'load_periods_warm': measure(warm, repeat, len(files)),
+    }
+
+def bench_row_functions(df, repeat, limit):
+    records = df.head(limit).to_dict('records')
+    ttl_values = df['TTL'].head(limit).tolist() if 'TTL' in df.columns else []
+    ttl_column = pd.Series(ttl_values, dtype=object)
+    amounts = df['THP_NET'].head(limit).tolist() if 'THP_NET' in df.columns else []
+    barcode_args = [
+        (r.get('NUP'), f"{r.get('BULAN')}-{r.get('TAHUN')}", r.get('PENANDATANGAN'), r.get('JABATAN_PENANDATANGAN'))
+        for r in records
+    ]
+
+    def barcode_cold():
+        clear_barcode_cache()
+        for args in barcode_args:
+            generate_payslip_barcode_uri(*args)
+
+    def barcode_warm():
+        for args in barcode_args:
+            generate_payslip_barcode_uri(*args)
+
+    results = {
+        'format_password_ttl': measure(lambda: [format_password_ttl(v) for v in ttl_values], repeat, len(ttl_values)),
+        'format_password_column': measure(lambda: format_password_column(ttl_column), repeat, len(ttl_values)),
+        'get_komponen_by_status': measure(lambda: [get_komponen_by_status(r) for r in records], repeat, len(records)),
+        'format_rupiah': measure(lambda: [format_rupiah(v) for v in amounts], repeat, len(amounts)),
+    }
+    # QR mahal: cukup sebagian kecil baris untuk cold
+    barcode_args = barcode_args[:min(len(barcode_args), 50)]
+    results['generate_payslip_barcode_uri_cold'] = measure(barcode_cold, repeat, len(barcode_args))
+    results['generate_payslip_barcode_uri_warm'] = measure(barcode_warm, repeat, len(barcode_args))
+    return results
+
+def bench_period_totals(df, repeat):
+    """
+    Jumlah komponen dan validasi total untuk satu periode penuh (operasi kolom).
+    """
+    return {
+        'period_totals': measure(lambda: period_totals(df), repeat, len(df)),
+        'total_mismatches': measure(lambda: total_mismatches(df), repeat, len(df)),
+    }
+
+def bench_clean_column_names(raw_df, repeat):
+    return {
+        'clean_column_names': measure(lambda: clean_column_names(raw_df.copy(deep=False)), repeat, 1),
+    }
+
+def bench_generate_pdf(records, count):
+    if not shutil.which('wkhtmltopdf'):
+        return {'generate_pdf': {'skipped': 'wkhtmltopdf tidak ditemukan'}}
+
+    from app import app
+    from utils.generate_pdf import generate_pdf, build_slip_data
+
+    os.chdir(app.root_path)
+    records = [dict(r, TAHUN=BENCH_TAHUN) for r in records[:count]]
+    output_dir = os.path.join('static', 'slips')
+    with app.test_request_context():
+        data_list = [build_slip_data(r) for r in records]
+
+        def render():
+            for data in data_list:
+                generate_pdf(data, use_cache=False)
+
+        result = measure(render, 1, len(data_list))
+    for name in os.listdir(output_dir):
+        if name.startswith(f"{BENCH_TAHUN}-"):
+            shutil.rmtree(os.path.join(output_dir, name), ignore_errors=True)
+    return {'generate_pdf': result}
+
+
+def compare(current, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"{'benchmark':40} {'baseline':>12} {'sekarang':>12} {'rasio':>8}")
+    for name, result in current['results'].items():
+        old = baseline.get('results', {}).get(name, {})
+        if 'per_op_us' not in result or 'per_op_us' not in old:
+            continue
+        ratio = result['per_op_us'] / old['per_op_us'] if old['per_op_us'] else float('nan')
+        flag = '  <-- lebih lambat' if ratio > 1.1 else ''
+        print(f"{name:40} {old['per_op_us']:>10.2f}us {result['per_op_us']:>10.2f}us {ratio:>7.2f}x{flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--dataset', default=os.path.join('benchmarks', 'dataset'))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--rows', type=int, default=5000, help='Jumlah baris untuk benchmark fungsi per baris')
+    parser.add_argument('--pdf', type=int, default=10, help='Jumlah slip untuk benchmark generate_pdf (0 = lewati)')
+    parser.add_argument('--output', help='Simpan hasil JSON ke file ini')
+    parser.add_argument('--compare', help='Bandingkan dengan hasil JSON sebelumnya')
+    args = parser.parse_args()
+
+    dataset = os.path.abspath(args.dataset)
+    with open(os.path.join(dataset, 'dataset.json')) as f:
+        meta = json.load(f)
+    files = [os.path.join(dataset, name) for name in meta['files']]
+
+    results = {}
+    results.update(bench_load_periods(files, args.repeat))
+
+    raw_df = pd.read_excel(files[0])
+    results.update(bench_clean_column_names(raw_df, args.repeat))
+
+    df = read_period_workbook(files[0])
+    results.update(bench_row_functions(df, args.repeat, args.rows))
+    results.update(bench_period_totals(df, args.repeat))
+
+    if args.pdf:
+        results.update(bench_generate_pdf(df.to_dict('records'), args.pdf))
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'cpu_count': os.cpu_count(),
+            'dataset': {'employees': meta['employees'], 'months': meta['months']},
+        },
+        'results': results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
+
+    if args.compare:
+        compare(report, args.compare)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+import os
+import sys
+import argparse
+from utils.period_catalog import find_period
+from utils.batch_pdf import generate_period_slips
+
+UPLOAD_FOLDER = 'data'
+
+def print_progress(done, total):
+    # Tampilkan progres di baris yang sama
+    percent = done * 100 // total if total else 100
+    sys.stdout.write(f"\r⏳ {done}/{total} slip ({percent}%)")
+    sys.stdout.flush()
+    if done == total:
+        sys.stdout.write("\n")
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate PDF slip gaji untuk satu periode')
+    parser.add_argument('--period', required=True, help='Periode dalam format YYYY-MM')
+    parser.add_argument('--workers', type=int, default=None, help='Jumlah proses render')
+    parser.add_argument('--force', action='store_true', help='Render ulang slip yang sudah ada')
+    parser.add_argument('--folder', default=UPLOAD_FOLDER, help='Folder data gaji')
+    args = parser.parse_args()
+
+    entry = find_period(args.folder, args.period)
+    if entry is None:
+        print(f"❌ Periode {args.period} tidak ditemukan di katalog.")
+        sys.exit(1)
+
+    summary = generate_period_slips(
+        os.path.join(args.folder, entry['source_file']),
+        workers=args.workers,
+        force=args.force,
+        progress=print_progress
+    )
+
+    print(f"\n✅ {summary['generated']} slip dibuat, {summary['skipped']} dilewati (tidak berubah).")
+    if summary['failed']:
+        print(f"❌ {summary['failed']} slip gagal:")
+        for error in summary['errors']:
+            print(f"   - {error}")
+    print(f"⏱️  {summary['elapsed']} detik, {summary['slips_per_second']} slip/detik")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+import os
+import sys
+from utils.period_catalog import load_catalog, find_period, ensure_catalog
+from utils.payroll_db import ingest_period
+
+UPLOAD_FOLDER = 'data'
+
+def main():
+    # Muat semua periode di katalog ke tabel payroll_rows (untuk PAYROLL_BACKEND=postgres)
+    folder = sys.argv[1] if len(sys.argv) > 1 else UPLOAD_FOLDER
+    ensure_catalog(folder)
+    periods = sorted({entry['period'] for entry in load_catalog(folder)})
+
+    total = 0
+    for period in periods:
+        entry = find_period(folder, period)
+        rows = ingest_period(os.path.join(folder, entry['source_file']), period=(entry['tahun'], entry['bulan']))
+        total += rows
+        print(f"  {period}  {entry['source_file']}  ({rows} baris)")
+    print(f"\n✅ {len(periods)} periode ({total} baris) dimuat ke database.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,16 @@
+import sys
+from utils.period_catalog import rebuild_catalog
+
+UPLOAD_FOLDER = 'data'
+
+def main():
+    # Folder bisa diberikan sebagai argumen, default ke folder upload aplikasi
+    folder = sys.argv[1] if len(sys.argv) > 1 else UPLOAD_FOLDER
+    entries = rebuild_catalog(folder)
+
+    for entry in entries:
+        print(f"  {entry['period']}  {entry['source_file']}  ({entry['rows']} baris)")
+    print(f"\n✅ Katalog berisi {len(entries)} periode.")
+
+if __name__ == '__main__':
+    main()
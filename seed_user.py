@@ -1,43 +1,44 @@
+import argparse
 import pandas as pd
-from utils.helpers import add_user
+from utils.user_import import import_users, sync_users
 
 EXCEL_FILE = 'data/user_seed.xlsx'
 
-def seed_users_from_excel():
+def seed_users_from_excel(sync=False, deactivate_missing=False):
     # Paksa baca kolom NUP sebagai string supaya tidak jadi float (64306.0)
     df = pd.read_excel(EXCEL_FILE, dtype={'NUP': str})
-
-    success_count = 0
-    fail_count = 0
-
-    for _, row in df.iterrows():
-        nup_raw = row['NUP']
-        ttl_raw = pd.to_datetime(row['TTL'], errors='coerce')
-
-        # Cek jika NUP kosong
-        if pd.isna(nup_raw):
-            print("⚠️  Baris dengan NUP kosong dilewati.")
-            fail_count += 1
-            continue
-
-        # Cek jika TTL tidak valid
-        if pd.isna(ttl_raw):
-            print(f"⚠️  Baris dengan NUP {nup_raw} memiliki TTL kosong atau tidak valid, dilewati.")
-            fail_count += 1
-            continue
-
-        # Normalisasi NUP agar tidak ada spasi
-        nup = nup_raw.strip()
-
-        # Format password dari TTL → ddmmyyyy
-        ttl = ttl_raw.strftime('%d%m%Y')
-
-        # Tambahkan user ke database
-        add_user(nup, ttl, role='pegawai')
-        success_count += 1
+    df.columns = df.columns.str.upper()
+    df = df.dropna(how='all')
+
+    if sync:
+        # Hanya NUP baru dan yang TTL/role-nya berubah yang di-hash ulang
+        try:
+            result = sync_users(df, 'NUP', 'TTL', None, deactivate_missing=deactivate_missing)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+        for detail in result['error_details']:
+            print(f"⚠️  {detail}, dilewati.")
+
+        print(f"\n✅ {result['inserted']} user baru, {result['updated']} user diperbarui.")
+        print(f"🔗 {result['adopted']} user lama diadopsi (sidik jari dicatat, password tetap).")
+        print(f"⏭️  {result['skipped']} user tidak berubah, {result['deactivated']} user dinonaktifkan.")
+        print(f"❌ {result['failed']} user dilewati karena data tidak valid.")
+        return
+
+    success_count, fail_count, error_details = import_users(df, 'NUP', 'TTL', None)
+    for detail in error_details:
+        print(f"⚠️  {detail}, dilewati.")
 
     print(f"\n✅ {success_count} user berhasil dimasukkan ke database.")
     print(f"❌ {fail_count} user dilewati karena data tidak valid.")
 
 if __name__ == '__main__':
-    seed_users_from_excel()
+    parser = argparse.ArgumentParser(description='Seed user dari file Excel')
+    parser.add_argument('--sync', action='store_true',
+                        help='Sinkronisasi delta: lewati user yang tidak berubah')
+    parser.add_argument('--deactivate-missing', action='store_true',
+                        help='Nonaktifkan NUP yang tidak ada di file (hanya dengan --sync)')
+    args = parser.parse_args()
+
+    seed_users_from_excel(sync=args.sync, deactivate_missing=args.deactivate_missing)
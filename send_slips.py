@@ -0,0 +1,56 @@
+import os
+import sys
+import argparse
+from utils.period_catalog import find_period
+from utils.batch_pdf import generate_period_slips
+from utils.bulk_email import dispatch_period_emails
+
+UPLOAD_FOLDER = 'data'
+
+def print_progress(label):
+    def _progress(done, total):
+        percent = done * 100 // total if total else 100
+        sys.stdout.write(f"\r⏳ {label}: {done}/{total} ({percent}%)")
+        sys.stdout.flush()
+        if done == total:
+            sys.stdout.write("\n")
+    return _progress
+
+def main():
+    parser = argparse.ArgumentParser(description='Kirim slip gaji via email untuk satu periode')
+    parser.add_argument('--period', required=True, help='Periode dalam format YYYY-MM')
+    parser.add_argument('--concurrency', type=int, default=None, help='Jumlah koneksi SMTP paralel')
+    parser.add_argument('--retries', type=int, default=None, help='Jumlah percobaan ulang untuk error sementara')
+    parser.add_argument('--skip-pdf', action='store_true', help='Jangan generate PDF terlebih dahulu')
+    parser.add_argument('--folder', default=UPLOAD_FOLDER, help='Folder data gaji')
+    args = parser.parse_args()
+
+    entry = find_period(args.folder, args.period)
+    if entry is None:
+        print(f"❌ Periode {args.period} tidak ditemukan di katalog.")
+        sys.exit(1)
+    file_path = os.path.join(args.folder, entry['source_file'])
+
+    if not args.skip_pdf:
+        # Slip yang sudah ada dan tidak berubah dilewati oleh batch PDF
+        pdf_summary = generate_period_slips(file_path, progress=print_progress('PDF'))
+        print(f"📄 {pdf_summary['generated']} slip dibuat, {pdf_summary['skipped']} sudah ada.")
+
+    summary = dispatch_period_emails(
+        file_path, args.period, args.folder,
+        concurrency=args.concurrency,
+        max_retries=args.retries,
+        progress=print_progress('Email')
+    )
+
+    print(f"\n✅ {summary['sent']} email terkirim, {summary['already_sent']} sudah terkirim sebelumnya.")
+    if summary['no_email']:
+        print(f"⚠️  {summary['no_email']} pegawai tanpa alamat email.")
+    if summary['failed']:
+        print(f"❌ {summary['failed']} email gagal (akan dicoba lagi saat dijalankan ulang):")
+        for error in summary['errors']:
+            print(f"   - {error}")
+    print(f"⏱️  {summary['elapsed']} detik, {summary['messages_per_second']} email/detik")
+
+if __name__ == '__main__':
+    main()
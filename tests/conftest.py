@@ -0,0 +1,26 @@
+import os
+import sys
+import tempfile
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+# Harus di-set sebelum app/models.db diimpor: folder data sementara, dan
+# database uji (TEST_DATABASE_URL) untuk test yang butuh Postgres
+os.environ.setdefault('UPLOAD_FOLDER', tempfile.mkdtemp(prefix='slip-gaji-test-'))
+os.environ.setdefault('SESSION_BACKEND', 'file')
+if os.getenv('TEST_DATABASE_URL'):
+    os.environ['DATABASE_URL'] = os.environ['TEST_DATABASE_URL']
+
+
+@pytest.fixture
+def database():
+    """
+    Test yang butuh Postgres hanya berjalan jika TEST_DATABASE_URL diatur
+    (database khusus test: isinya boleh dihapus).
+    """
+    if not os.getenv('TEST_DATABASE_URL'):
+        pytest.skip('TEST_DATABASE_URL tidak diatur')
+    from models.db import init_db
+    init_db()
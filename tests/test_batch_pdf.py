@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+from utils import batch_pdf
+
+
+@pytest.fixture
+def period_file(tmp_path, monkeypatch):
+    # static/slips ditulis relatif terhadap direktori kerja
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / 'gaji_2024_01.xlsx'
+    pd.DataFrame({
+        'NUP': [1001, 1002, 1003],
+        'NAMA': ['Andi', 'Budi', 'Citra'],
+        'STATUS_PEGAWAI': ['PKWT', 'PKWT', 'PKWT'],
+        'BULAN': ['Januari'] * 3,
+        'TAHUN': [2024] * 3,
+        'GAJI_KONTRAK': [5_000_000, 6_000_000, 7_000_000],
+    }).to_excel(path, index=False)
+    return str(path)
+
+@pytest.fixture
+def fake_render(monkeypatch):
+    # Tanpa wkhtmltopdf: render gabungan diganti, cek cache (is_slip_current) tetap asli
+    rendered = []
+    def _generate_pdfs(data_list):
+        rendered.extend(data['NUP'] for data in data_list)
+        return [f"slip_{data['NUP']}.pdf" for data in data_list]
+    monkeypatch.setattr(batch_pdf, 'generate_pdfs', _generate_pdfs)
+    return rendered
+
+def test_single_worker_runs_outside_app_context(period_file, fake_render):
+    # Jalur CLI (generate_slips.py --workers 1): tidak ada request/app context
+    summary = batch_pdf.generate_period_slips(period_file, workers=1)
+
+    assert summary['failed'] == 0, summary['errors']
+    assert summary['generated'] == 3
+    assert sorted(fake_render) == [1001, 1002, 1003]
+
+def test_cache_check_error_fails_only_that_slip(period_file, fake_render, monkeypatch):
+    original = batch_pdf.is_slip_current
+    def _is_slip_current(data):
+        if data['NUP'] == 1002:
+            raise OSError('sidecar tidak terbaca')
+        return original(data)
+    monkeypatch.setattr(batch_pdf, 'is_slip_current', _is_slip_current)
+
+    summary = batch_pdf.generate_period_slips(period_file, workers=1)
+
+    assert summary['generated'] == 2
+    assert summary['failed'] == 1
+    assert summary['errors'] == ['NUP 1002: sidecar tidak terbaca']
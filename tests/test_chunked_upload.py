@@ -0,0 +1,112 @@
+import io
+import hashlib
+import threading
+import pytest
+from utils import chunked_upload
+
+CONTENT = bytes(range(256)) * 40  # 10240 byte
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+@pytest.fixture
+def upload(tmp_path):
+    state = chunked_upload.create_upload(
+        str(tmp_path), 'gaji_2024_01.xlsx', len(CONTENT), 'gaji',
+        chunk_size=4096, sha256=_sha256(CONTENT)
+    )
+    return chunked_upload.load_upload(str(tmp_path), state['upload_id'])
+
+def _chunk(state, index):
+    start = index * state['chunk_size']
+    return CONTENT[start:start + state['chunk_size']]
+
+def _send(folder, state, index, data=None, checksum=None):
+    data = _chunk(state, index) if data is None else data
+    return chunked_upload.save_chunk(folder, state, index, io.BytesIO(data), checksum or _sha256(data))
+
+def _send_all(folder, state):
+    for index in range(state['total_chunks']):
+        _send(folder, state, index)
+
+
+def test_rejects_chunk_with_wrong_checksum(tmp_path, upload):
+    with pytest.raises(ValueError, match='Checksum chunk 0'):
+        _send(str(tmp_path), upload, 0, checksum=_sha256(b'lain'))
+    assert chunked_upload.upload_status(str(tmp_path), upload)['received'] == []
+
+@pytest.mark.parametrize('data', [CONTENT[:4000], CONTENT[:4097]])
+def test_rejects_chunk_with_wrong_length(tmp_path, upload, data):
+    with pytest.raises(ValueError, match='Chunk 0'):
+        _send(str(tmp_path), upload, 0, data=data)
+    assert chunked_upload.upload_status(str(tmp_path), upload)['received'] == []
+
+def test_resume_sends_only_missing_chunks(tmp_path, upload):
+    folder = str(tmp_path)
+    assert upload['total_chunks'] == 3
+    _send(folder, upload, 0)
+    _send(folder, upload, 2)
+    # Chunk yang sama boleh dikirim ulang
+    _send(folder, upload, 2)
+
+    # Setelah koneksi putus klien membaca status dan mengirim yang kurang saja
+    status = chunked_upload.upload_status(folder, chunked_upload.load_upload(folder, upload['upload_id']))
+    assert status['received'] == [0, 2]
+    assert status['missing'] == [1]
+    with pytest.raises(ValueError, match='1 chunk belum diterima'):
+        chunked_upload.assemble_upload(folder, upload, str(tmp_path / 'hasil.xlsx'))
+
+    for index in status['missing']:
+        _send(folder, upload, index)
+    result = chunked_upload.assemble_upload(folder, upload, str(tmp_path / 'hasil.xlsx'))
+
+    assert result == {'size': len(CONTENT), 'sha256': _sha256(CONTENT)}
+    assert (tmp_path / 'hasil.xlsx').read_bytes() == CONTENT
+    assert chunked_upload.load_upload(folder, upload['upload_id']) is None
+
+def test_second_assemble_is_rejected(tmp_path, upload):
+    folder = str(tmp_path)
+    _send_all(folder, upload)
+    chunked_upload.assemble_upload(folder, upload, str(tmp_path / 'hasil.xlsx'))
+
+    with pytest.raises(ValueError, match='sudah selesai'):
+        chunked_upload.assemble_upload(folder, upload, str(tmp_path / 'hasil.xlsx'))
+    assert (tmp_path / 'hasil.xlsx').read_bytes() == CONTENT
+
+def test_concurrent_assemble_commits_once(tmp_path, upload):
+    folder = str(tmp_path)
+    _send_all(folder, upload)
+    outcomes = []
+    barrier = threading.Barrier(2)
+
+    def _commit():
+        barrier.wait()
+        try:
+            outcomes.append(chunked_upload.assemble_upload(folder, upload, str(tmp_path / 'hasil.xlsx')))
+        except ValueError as e:
+            outcomes.append(e)
+
+    threads = [threading.Thread(target=_commit) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(isinstance(outcome, dict) for outcome in outcomes) == 1
+    assert sum(isinstance(outcome, ValueError) for outcome in outcomes) == 1
+    assert (tmp_path / 'hasil.xlsx').read_bytes() == CONTENT
+
+def test_file_checksum_mismatch_keeps_chunks(tmp_path):
+    folder = str(tmp_path)
+    state = chunked_upload.create_upload(folder, 'users.xlsx', len(CONTENT), 'user',
+                                         chunk_size=4096, sha256=_sha256(b'lain'))
+    state = chunked_upload.load_upload(folder, state['upload_id'])
+    _send_all(folder, state)
+
+    with pytest.raises(ValueError, match='Checksum file'):
+        chunked_upload.assemble_upload(folder, state, str(tmp_path / 'users.xlsx'))
+    assert not (tmp_path / 'users.xlsx').exists()
+    # Lock dilepas: commit bisa dicoba lagi
+    assert chunked_upload.upload_status(folder, state)['missing'] == []
+    assert not (tmp_path / '.uploads' / state['upload_id'] / chunked_upload.COMMIT_LOCK_FILENAME).exists()
@@ -0,0 +1,55 @@
+import pytest
+from models.db import get_db_cursor
+from utils import jobs
+
+
+@pytest.fixture
+def requeued_job(database):
+    """
+    Job yang diambil worker-a, dianggap ditinggal (heartbeat kedaluwarsa),
+    dikembalikan ke antrian lalu diambil worker-b.
+    """
+    jobs.ensure_jobs_table()
+    with get_db_cursor() as cur:
+        cur.execute("DELETE FROM jobs")
+    job_id = jobs.enqueue_job('generate_slips', {'periode': '2024-01'})
+
+    assert jobs.claim_job('worker-a')['id'] == job_id
+    with get_db_cursor() as cur:
+        cur.execute(
+            "UPDATE jobs SET heartbeat_at = heartbeat_at - make_interval(secs => %s) WHERE id = %s",
+            (jobs.JOB_STALE_SECONDS + 60, job_id)
+        )
+    assert jobs.requeue_stale_jobs() == [job_id]
+
+    claimed = jobs.claim_job('worker-b')
+    assert claimed['id'] == job_id and claimed['worker'] == 'worker-b'
+    return job_id
+
+def _job(job_id):
+    with get_db_cursor() as cur:
+        cur.execute("SELECT status, result, error, progress_done, worker FROM jobs WHERE id = %s", (job_id,))
+        return cur.fetchone()
+
+def test_previous_worker_cannot_finish_or_fail(requeued_job):
+    assert jobs.finish_job(requeued_job, 'worker-a', {'generated': 1}) is False
+    assert jobs.fail_job(requeued_job, 'worker-a', 'terlambat') is False
+
+    row = _job(requeued_job)
+    assert row['status'] == 'running' and row['worker'] == 'worker-b'
+    assert row['result'] is None and row['error'] is None
+
+def test_previous_worker_cannot_update_progress(requeued_job):
+    jobs.update_progress(requeued_job, 'worker-a', 7, 10)
+    assert _job(requeued_job)['progress_done'] == 0
+
+    jobs.update_progress(requeued_job, 'worker-b', 3, 10)
+    assert _job(requeued_job)['progress_done'] == 3
+
+def test_owner_finishes_once(requeued_job):
+    assert jobs.finish_job(requeued_job, 'worker-b', {'generated': 2}) is True
+    # Job sudah tidak 'running': penyelesaian kedua diabaikan
+    assert jobs.fail_job(requeued_job, 'worker-b', 'ganda') is False
+
+    row = _job(requeued_job)
+    assert row['status'] == 'done' and row['result'] == {'generated': 2}
@@ -0,0 +1,52 @@
+import multiprocessing
+import pandas as pd
+import pytest
+from utils import period_catalog
+
+
+def _fake_entry(xlsx_path, df=None):
+    name = xlsx_path.rsplit('/', 1)[-1]
+    return {'period': '2024-01', 'tahun': 2024, 'bulan': 1, 'source_file': name, 'rows': 1}
+
+def _register_many(folder, worker, count):
+    period_catalog.build_entry = _fake_entry
+    for i in range(count):
+        period_catalog.register_period(folder, f"{folder}/gaji_w{worker}_{i}.xlsx")
+
+def _write_period(folder, year, month):
+    pd.DataFrame({'NUP': [1], 'BULAN': [month], 'TAHUN': [year]}).to_excel(
+        folder / f"gaji_{year}_{month:02d}.xlsx", index=False
+    )
+
+@pytest.mark.skipif(period_catalog.fcntl is None, reason='flock tidak tersedia')
+def test_concurrent_register_keeps_every_entry(tmp_path):
+    # Beberapa proses (worker gunicorn) mendaftarkan periode bersamaan
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=_register_many, args=(str(tmp_path), w, 25)) for w in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    entries = period_catalog._read_catalog_file(str(tmp_path))
+    assert len(entries) == 100
+    assert len({e['source_file'] for e in entries}) == 100
+
+def test_load_catalog_does_not_rebuild_missing_catalog(tmp_path, monkeypatch):
+    _write_period(tmp_path, 2024, 1)
+    monkeypatch.setattr(period_catalog, 'rebuild_catalog', lambda folder: pytest.fail('rebuild di dalam request'))
+
+    assert period_catalog.load_catalog(str(tmp_path)) == []
+    assert not (tmp_path / period_catalog.CATALOG_FILENAME).exists()
+
+def test_ensure_catalog_builds_missing_catalog_once(tmp_path, monkeypatch):
+    _write_period(tmp_path, 2024, 1)
+    _write_period(tmp_path, 2024, 2)
+
+    period_catalog.ensure_catalog(str(tmp_path))
+    assert [e['period'] for e in period_catalog.load_catalog(str(tmp_path))] == ['2024-01', '2024-02']
+
+    # Katalog sudah ada: tidak dipindai ulang
+    monkeypatch.setattr(period_catalog, '_scan_entries', lambda folder: pytest.fail('katalog dibangun ulang'))
+    period_catalog.ensure_catalog(str(tmp_path))
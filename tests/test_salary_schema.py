@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+from utils.salary_schema import describe_mismatches, total_mismatches
+
+
+def test_blank_rows_are_not_reported_as_unknown_status():
+    df = pd.DataFrame({
+        'NUP': [1001, np.nan, 1002, '  '],
+        'STATUS_PEGAWAI': ['MAGANG', np.nan, 'PKWT', np.nan],
+    })
+
+    mismatches = total_mismatches(df)
+
+    assert mismatches['NUP'].tolist() == [1001]
+    assert describe_mismatches(mismatches) == [
+        "NUP 1001: status pegawai 'MAGANG' tidak dikenal, komponen tidak ditampilkan"
+    ]
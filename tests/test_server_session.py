@@ -0,0 +1,86 @@
+import os
+import pytest
+from flask import Flask, session
+from utils.server_session import ANON_COOKIE_PREFIX, create_session_interface
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.secret_key = 'test-secret'
+    app.session_interface = create_session_interface(str(tmp_path), backend='file')
+
+    @app.route('/login/<nup>')
+    def login(nup):
+        session['nup'] = nup
+        return 'ok'
+
+    @app.route('/logout')
+    def logout():
+        session.clear()
+        session['message'] = 'sampai jumpa'
+        return 'ok'
+
+    @app.route('/note/<message>')
+    def note(message):
+        session['message'] = message
+        return 'ok'
+
+    @app.route('/whoami')
+    def whoami():
+        return {'nup': session.get('nup'), 'message': session.get('message')}
+
+    return app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def stored(tmp_path):
+    # Session id yang tersimpan di store file
+    return lambda: sorted(name[:-len('.json')] for name in os.listdir(tmp_path / '.sessions'))
+
+def _cookie(client):
+    cookie = client.get_cookie('session')
+    return cookie.value if cookie else None
+
+def test_anonymous_session_stays_in_cookie(client, stored):
+    client.get('/note/login-gagal')
+
+    assert _cookie(client).startswith(ANON_COOKIE_PREFIX)
+    assert stored() == []
+    assert client.get('/whoami').get_json() == {'nup': None, 'message': 'login-gagal'}
+
+def test_tampered_anonymous_cookie_gives_new_session(client):
+    client.get('/note/halo')
+    client.set_cookie('session', _cookie(client)[:-2] + 'xx')
+
+    assert client.get('/whoami').get_json() == {'nup': None, 'message': None}
+
+def test_login_stores_session_and_logout_removes_it(client, stored):
+    client.get('/note/sebelum-login')
+    client.get('/login/1001')
+    [sid] = stored()
+    assert client.get('/whoami').get_json()['nup'] == '1001'
+
+    logged_in_cookie = _cookie(client)
+    assert logged_in_cookie.startswith(sid)
+    client.get('/logout')
+    assert stored() == []
+    assert _cookie(client).startswith(ANON_COOKIE_PREFIX)
+    assert client.get('/whoami').get_json() == {'nup': None, 'message': 'sampai jumpa'}
+
+    # Cookie lama tidak bisa dipakai ulang setelah logout
+    client.set_cookie('session', logged_in_cookie)
+    assert client.get('/whoami').get_json()['nup'] is None
+
+def test_switching_user_rotates_session_id(client, stored):
+    client.get('/login/1001')
+    [first_sid] = stored()
+
+    client.get('/login/1002')
+    [second_sid] = stored()
+
+    assert second_sid != first_sid
+    assert client.get('/whoami').get_json()['nup'] == '1002'
@@ -0,0 +1,84 @@
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+import pytest
+from utils.helpers import format_password_column, parse_ttl_column
+from utils.user_import import ttl_passwords
+
+TTL_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d']
+
+
+# Parser per baris sebelum parse_ttl_column, sebagai acuan
+def old_format_password_ttl(ttl_value):
+    try:
+        if pd.isna(ttl_value):
+            return "00000000"
+        if isinstance(ttl_value, datetime):
+            return ttl_value.strftime("%d%m%Y")
+        if isinstance(ttl_value, (int, float)):
+            return pd.to_datetime(ttl_value, origin='1899-12-30', unit='D').strftime("%d%m%Y")
+        parsed = pd.to_datetime(str(ttl_value), dayfirst=True, errors='coerce')
+        if not pd.isna(parsed):
+            return parsed.strftime("%d%m%Y")
+        return str(ttl_value).zfill(8)
+    except Exception:
+        return "00000000"
+
+def old_ttl_to_password(ttl_raw):
+    if isinstance(ttl_raw, str):
+        for fmt in TTL_FORMATS:
+            try:
+                return datetime.strptime(ttl_raw.strip(), fmt).strftime('%d%m%Y')
+            except ValueError:
+                continue
+    ttl_datetime = pd.to_datetime(ttl_raw, errors='coerce')
+    if not pd.isna(ttl_datetime):
+        return ttl_datetime.strftime('%d%m%Y')
+    return None
+
+
+COMMON_VALUES = [
+    datetime(1980, 2, 3), pd.Timestamp('1975-12-31'), None, np.nan, '',
+    '03/02/1980', '3/2/1980', '03-02-1980', 'Feb 3 1980', 'abc', '12345',
+]
+# Nomor seri tanggal Excel dan sel boolean
+SERIAL_VALUES = [29256, 29256.0, 29256.5, -5, 10 ** 9, True, False]
+
+
+def test_payroll_passwords_match_old_parser():
+    values = COMMON_VALUES + SERIAL_VALUES
+    expected = [old_format_password_ttl(v) for v in values]
+
+    assert format_password_column(pd.Series(values, dtype=object)).tolist() == expected
+
+@pytest.mark.parametrize('value, password', [
+    # Perbedaan yang disengaja: teks ISO dan date dibaca tahun-bulan-tanggal
+    ('1980-02-03', '03021980'),
+    ('1980/02/03', '03021980'),
+    (date(1980, 2, 3), '03021980'),
+])
+def test_payroll_iso_dates_follow_login_password(value, password):
+    assert format_password_column(pd.Series([value], dtype=object)).iat[0] == password
+
+def test_roster_passwords_match_old_parser():
+    values = COMMON_VALUES + ['1980-02-03', '1980/02/03', date(1980, 2, 3), True, False]
+    expected = [old_ttl_to_password(v) for v in values]
+
+    assert ttl_passwords(pd.Series(values, dtype=object)).tolist() == expected
+
+def test_roster_numbers_are_excel_serials():
+    # Perbedaan yang disengaja: dulu semua angka menjadi 01011970
+    passwords = ttl_passwords(pd.Series([29256, 29256.0, 10 ** 9], dtype=object)).tolist()
+    assert passwords == ['05021980', '05021980', None]
+
+def test_parse_ttl_column_invalid_mask():
+    dates, invalid = parse_ttl_column(pd.Series(['03/02/1980', None, 'abc', 29256, True], dtype=object))
+
+    assert invalid.tolist() == [False, True, True, False, False]
+    assert dates.iat[0] == pd.Timestamp('1980-02-03')
+    assert dates.iat[3] == pd.Timestamp('1980-02-05')
+
+def test_datetime64_column():
+    values = pd.Series(pd.to_datetime(['1980-02-03', None]))
+    assert format_password_column(values).tolist() == ['03021980', '00000000']
+    assert ttl_passwords(values).tolist() == ['03021980', None]
@@ -0,0 +1,154 @@
+# admin_tasks.py
+"""
+Operasi admin yang berat (ingest data gaji, import user, generate slip, kirim
+email). Dipanggil langsung dari request atau dijalankan job worker (utils/jobs.py)
+dengan signature yang sama: task(payload, progress) -> dict hasil.
+"""
+import os
+import uuid
+import shutil
+import logging
+from utils.period_store import build_period_store, iter_period_chunks, move_period_workbook
+from utils.period_index import invalidate_period_index
+from utils.period_catalog import register_period, find_period
+from utils.batch_pdf import generate_period_slips
+from utils.user_import import process_user_upload
+from utils.bulk_email import dispatch_period_emails
+from utils.payroll_db import use_database, ingest_period
+from utils.salary_schema import total_mismatches, describe_mismatches
+from utils.memory import MemoryHighWater
+
+logger = logging.getLogger(__name__)
+
+# File upload yang menunggu diproses job worker (relatif terhadap UPLOAD_FOLDER)
+PENDING_UPLOAD_DIRNAME = os.path.join('.jobs', 'uploads')
+
+
+def get_pending_upload_path(folder, filename):
+    path = os.path.join(folder, PENDING_UPLOAD_DIRNAME, filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+def get_pending_payroll_path(folder, filename):
+    """
+    Lokasi sementara workbook gaji yang baru diupload. Nama file dipertahankan
+    (satu folder per upload) karena periode cadangan dan SOURCE_FILE diambil
+    dari nama file.
+    """
+    path = os.path.join(folder, PENDING_UPLOAD_DIRNAME, uuid.uuid4().hex, filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+def _period_file(folder, periode):
+    entry = find_period(folder, periode)
+    if entry is None:
+        raise ValueError(f"Periode {periode} tidak ditemukan")
+    return os.path.join(folder, entry['source_file'])
+
+def ingest_payroll(payload, progress=None):
+    """
+    Konversi file gaji yang sudah disimpan ke format kolumnar dan daftarkan di katalog.
+    Workbook dibaca streaming dan langkah berikutnya memakai store per chunk,
+    sehingga puncak memori tidak bergantung ukuran file (dilaporkan di 'memory').
+    payload['pending_path']: file upload di lokasi sementara; baru menggantikan
+    <folder>/<filename> setelah header dan isinya lolos validasi, sehingga upload
+    yang ditolak tidak merusak periode yang sudah ada.
+    """
+    folder = payload['folder']
+    file_path = os.path.join(folder, payload['filename'])
+    pending_path = payload.get('pending_path')
+    if pending_path and not os.path.exists(pending_path) and os.path.exists(file_path):
+        # Job diulang setelah file sudah dipindahkan
+        pending_path = None
+
+    with MemoryHighWater() as memory:
+        if pending_path:
+            try:
+                summary = build_period_store(pending_path, progress=progress)
+                move_period_workbook(pending_path, file_path)
+            finally:
+                shutil.rmtree(os.path.dirname(pending_path), ignore_errors=True)
+        else:
+            summary = build_period_store(file_path, progress=progress)
+        invalidate_period_index(file_path)
+        entry = register_period(folder, file_path)
+        if use_database():
+            if entry is None:
+                logger.warning(f"Periode {payload['filename']} tidak diketahui, tidak dimuat ke database")
+            else:
+                # Satu transaksi per periode: data lama diganti seluruhnya atau tetap utuh.
+                # Kunci periode sama dengan katalog (BULAN/TAHUN di sheet), bukan nama file
+                ingest_period(file_path, period=(entry['tahun'], entry['bulan']))
+
+        # Total di file yang tidak sama dengan jumlah komponennya ditandai, data tetap disimpan
+        mismatched_rows, mismatch_messages = 0, []
+        for chunk in iter_period_chunks(file_path):
+            mismatches = total_mismatches(chunk)
+            if len(mismatches):
+                mismatched_rows += int(mismatches.index.nunique())
+                mismatch_messages.extend(describe_mismatches(mismatches))
+
+    result = {
+        'filename': payload['filename'],
+        'rows': summary['rows'],
+        'chunks': summary['chunks'],
+        'memory': memory.as_dict(),
+    }
+    errors = summary['errors'] + mismatch_messages
+    if summary['invalid_values']:
+        result['invalid_values'] = summary['invalid_values']
+    if mismatched_rows:
+        result['mismatched_rows'] = mismatched_rows
+        logger.warning(
+            f"{mismatched_rows} baris di {payload['filename']} memiliki total yang "
+            f"tidak sesuai komponen, contoh: {mismatch_messages[0]}"
+        )
+    if errors:
+        result['errors'] = errors
+    logger.info(
+        f"Ingest {payload['filename']} selesai: {summary['rows']} baris dalam {summary['chunks']} chunk, "
+        f"puncak memori {result['memory']['peak_mb']} MB ({result['memory']['scope']})"
+    )
+    return result
+
+def import_user_file(payload, progress=None):
+    """
+    Import/sinkronisasi roster user dari file upload; file dihapus setelah diproses.
+    """
+    file_path = payload['file_path']
+    try:
+        result = process_user_upload(
+            file_path,
+            mode=payload.get('mode', 'import'),
+            deactivate_missing=payload.get('deactivate_missing', False)
+        )
+    finally:
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+    return result
+
+def generate_slips(payload, progress=None):
+    file_path = _period_file(payload['folder'], payload['periode'])
+    summary = generate_period_slips(file_path, workers=payload.get('workers'), progress=progress)
+    summary['periode'] = payload['periode']
+    return summary
+
+def send_slips(payload, progress=None):
+    folder, periode = payload['folder'], payload['periode']
+    file_path = _period_file(folder, periode)
+    # Slip yang sudah ada dan tidak berubah dilewati oleh batch PDF
+    pdf_summary = generate_period_slips(file_path)
+    summary = dispatch_period_emails(file_path, periode, folder, progress=progress)
+    summary['periode'] = periode
+    summary['pdf_generated'] = pdf_summary['generated']
+    summary['pdf_failed'] = pdf_summary['failed']
+    return summary
+
+TASKS = {
+    'ingest_payroll': ingest_payroll,
+    'import_users': import_user_file,
+    'generate_slips': generate_slips,
+    'send_slips': send_slips,
+}
@@ -0,0 +1,164 @@
+# batch_pdf.py
+import os
+import time
+import logging
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from flask import has_request_context
+from utils.payroll_db import get_period_payroll
+from utils.generate_pdf import generate_pdf, generate_pdfs, build_slip_data, is_slip_current
+
+logger = logging.getLogger(__name__)
+
+# Jumlah proses render default; wkhtmltopdf sendiri sudah satu proses per slip
+DEFAULT_WORKERS = int(os.getenv('SLIP_BATCH_WORKERS', '0')) or os.cpu_count() or 1
+# 'combined': banyak slip per proses wkhtmltopdf, 'single': satu proses per slip
+DEFAULT_RENDER_MODE = os.getenv('SLIP_RENDER_MODE', 'combined')
+# Jumlah slip per pemanggilan wkhtmltopdf pada mode combined
+DEFAULT_CHUNK_SIZE = int(os.getenv('SLIP_RENDER_CHUNK', '25'))
+
+_worker_context = None
+
+
+def _init_worker():
+    """
+    Setiap proses worker butuh app context (template slip.html memakai url_for).
+    """
+    global _worker_context
+    from app import app
+    _worker_context = app.test_request_context()
+    _worker_context.push()
+
+@contextmanager
+def _render_context():
+    """
+    Render di proses ini: di dalam request context sudah tersedia, dari CLI
+    (generate_slips.py, send_slips.py) dan job worker dibuat seperti _init_worker.
+    """
+    if has_request_context():
+        yield
+        return
+    from app import app
+    with app.test_request_context():
+        yield
+
+def render_slip(user_dict, force=False):
+    """
+    Render satu slip. Mengembalikan (status, nup, keterangan) dengan status
+    'generated', 'skipped' atau 'failed'.
+    """
+    nup = user_dict.get('NUP')
+    try:
+        data = build_slip_data(user_dict)
+        if not force and is_slip_current(data):
+            return 'skipped', nup, None
+        return 'generated', nup, generate_pdf(data, use_cache=False)
+    except Exception as e:
+        return 'failed', nup, str(e)
+
+def render_slip_chunk(user_dicts, force=False, combined=True):
+    """
+    Render sekelompok slip dengan satu proses wkhtmltopdf (lihat generate_pdfs).
+    Jika render gabungan gagal, setiap slip dicoba satu per satu supaya
+    kegagalan satu pegawai tidak menggagalkan seluruh kelompok.
+    Dengan combined=False setiap slip dirender sendiri seperti /download.
+    """
+    if not combined:
+        return [render_slip(user_dict, force) for user_dict in user_dicts]
+
+    results, pending = [], []
+    for user_dict in user_dicts:
+        nup = user_dict.get('NUP')
+        try:
+            data = build_slip_data(user_dict)
+            current = not force and is_slip_current(data)
+        except Exception as e:
+            results.append(('failed', nup, str(e)))
+            continue
+        if current:
+            results.append(('skipped', nup, None))
+        else:
+            pending.append((user_dict, data))
+
+    if not pending:
+        return results
+
+    try:
+        paths = generate_pdfs([data for _, data in pending])
+        results.extend(('generated', user_dict.get('NUP'), path) for (user_dict, _), path in zip(pending, paths))
+    except Exception as e:
+        logger.warning(f"Render gabungan gagal ({str(e)}), mencoba per slip")
+        results.extend(render_slip(user_dict, force=True) for user_dict, _ in pending)
+    return results
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _employee_records(file_path):
+    df = get_period_payroll(file_path)
+    if 'NUP' not in df.columns:
+        raise ValueError(f"Kolom NUP tidak ditemukan di {file_path}")
+    df = df[df['NUP'].notna()]
+    return df.to_dict('records')
+
+def generate_period_slips(file_path, workers=None, force=False, progress=None,
+                          mode=None, chunk_size=None):
+    """
+    Buat PDF slip untuk semua pegawai di satu file periode memakai process pool
+    terbatas. Slip yang datanya tidak berubah sejak batch sebelumnya dilewati,
+    kecuali force=True. progress(done, total) dipanggil setiap slip selesai.
+    Pada mode 'combined' setiap tugas berisi chunk_size slip yang dirender
+    dengan satu proses wkhtmltopdf.
+    """
+    workers = workers or DEFAULT_WORKERS
+    mode = mode or DEFAULT_RENDER_MODE
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    combined = mode != 'single'
+    records = _employee_records(file_path)
+    total = len(records)
+    summary = {'total': total, 'generated': 0, 'skipped': 0, 'failed': 0, 'errors': []}
+
+    logger.info(
+        f"Batch PDF dimulai: {total} slip dari {os.path.basename(file_path)} "
+        f"dengan {workers} worker (mode {mode}, {chunk_size} slip per render)"
+    )
+    start = time.perf_counter()
+    done = 0
+
+    def _collect(results):
+        nonlocal done
+        for status, nup, detail in results:
+            done += 1
+            summary[status] += 1
+            if status == 'failed':
+                summary['errors'].append(f"NUP {nup}: {detail}")
+                logger.warning(f"Gagal membuat slip NUP {nup}: {detail}")
+            if progress:
+                progress(done, total)
+
+    if workers <= 1:
+        # Render langsung di proses ini
+        with _render_context():
+            for chunk in _chunks(records, chunk_size):
+                _collect(render_slip_chunk(chunk, force, combined))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [
+                pool.submit(render_slip_chunk, chunk, force, combined)
+                for chunk in _chunks(records, chunk_size)
+            ]
+            for future in as_completed(futures):
+                _collect(future.result())
+
+    elapsed = time.perf_counter() - start
+    summary['elapsed'] = round(elapsed, 2)
+    # Throughput dihitung dari slip yang benar-benar dirender
+    summary['slips_per_second'] = round(summary['generated'] / elapsed, 2) if elapsed > 0 else 0.0
+
+    logger.info(
+        f"Batch PDF selesai: {summary['generated']} dibuat, {summary['skipped']} dilewati, "
+        f"{summary['failed']} gagal dalam {summary['elapsed']} detik "
+        f"({summary['slips_per_second']} slip/detik)"
+    )
+    return summary
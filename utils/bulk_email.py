@@ -0,0 +1,298 @@
+# bulk_email.py
+"""
+Pengiriman slip gaji massal untuk satu periode.
+
+Untuk uji lokal tanpa server email sungguhan:
+    python -m aiosmtpd -n -l 127.0.0.1:8025
+    SMTP_HOST=127.0.0.1 SMTP_PORT=8025 SMTP_STARTTLS=0 python send_slips.py --period 2025-01
+"""
+import os
+import json
+import time
+import queue
+import random
+import smtplib
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+from utils.payroll_db import get_period_payroll
+from utils.generate_pdf import get_slip_output_path
+from utils.graph_email import get_graph_client
+from utils.send_email import (
+    EMAIL_ADDRESS, EMAIL_PASSWORD, EMAIL_PROVIDER,
+    build_email_subject, build_email_body, build_email_message, get_smtp_settings
+)
+
+logger = logging.getLogger(__name__)
+
+# Jumlah koneksi/pengiriman paralel
+DEFAULT_CONCURRENCY = int(os.getenv('EMAIL_CONCURRENCY', '4'))
+# Jumlah email per sesi SMTP sebelum koneksi dibuka ulang (batas umum server)
+MAX_MESSAGES_PER_SESSION = int(os.getenv('EMAIL_MAX_PER_SESSION', '100'))
+DEFAULT_MAX_RETRIES = int(os.getenv('EMAIL_MAX_RETRIES', '3'))
+RETRY_BASE_DELAY = float(os.getenv('EMAIL_RETRY_DELAY', '1.0'))  # detik
+SMTP_TIMEOUT = 30
+
+# Folder status pengiriman per periode (relatif terhadap UPLOAD_FOLDER)
+STATUS_DIRNAME = '.email'
+
+
+class TransientEmailError(Exception):
+    """Kegagalan sementara yang layak dicoba ulang."""
+
+
+def is_transient_error(error):
+    """
+    Koneksi terputus, timeout, dan kode SMTP 4xx dianggap sementara;
+    5xx dan alamat ditolak dianggap permanen.
+    """
+    if isinstance(error, TransientEmailError):
+        return True
+    if hasattr(error, 'transient'):
+        # GraphSendError: 429/5xx sementara, 4xx lain permanen
+        return error.transient
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return False
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError))
+
+
+# ==========================
+# POOL KONEKSI SMTP
+# ==========================
+
+class SMTPConnectionPool:
+    """
+    Pool koneksi SMTP yang sudah STARTTLS + login, dipakai ulang untuk banyak
+    email. Koneksi dibuka ulang setelah MAX_MESSAGES_PER_SESSION email atau
+    jika terjadi error.
+    """
+
+    def __init__(self, size, max_messages=MAX_MESSAGES_PER_SESSION):
+        self.host, self.port, self.starttls = get_smtp_settings()
+        self.max_messages = max_messages
+        self.connections_opened = 0
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+        if self.starttls:
+            smtp.starttls()
+        if EMAIL_PASSWORD:
+            smtp.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
+        with self._lock:
+            self.connections_opened += 1
+        return [smtp, 0]
+
+    def send(self, msg):
+        self._slots.acquire()
+        conn = None
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+
+            conn[0].send_message(msg)
+            conn[1] += 1
+
+            if conn[1] >= self.max_messages:
+                self._close(conn)
+            else:
+                self._idle.put(conn)
+        except Exception:
+            if conn is not None:
+                self._close(conn)
+            raise
+        finally:
+            self._slots.release()
+
+    def _close(self, conn):
+        try:
+            conn[0].quit()
+        except Exception:
+            pass
+
+    def close(self):
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+# ==========================
+# STATUS PENGIRIMAN
+# ==========================
+
+class DeliveryStatusLog:
+    """
+    Status per penerima disimpan append-only (JSON lines); status terakhir per
+    NUP yang berlaku. Menjalankan ulang pengiriman melewati yang sudah 'sent'.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.statuses = {}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Baris terakhir bisa terpotong jika proses mati saat menulis
+                        continue
+                    self.statuses[record['nup']] = record
+
+    def is_sent(self, nup):
+        return self.statuses.get(nup, {}).get('status') == 'sent'
+
+    def record(self, nup, email, status, attempts, error=None):
+        entry = {
+            'nup': nup, 'email': email, 'status': status, 'attempts': attempts,
+            'error': error, 'at': datetime.now().isoformat(timespec='seconds'),
+        }
+        with self._lock:
+            self.statuses[nup] = entry
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def get_status_log_path(folder, period):
+    return os.path.join(folder, STATUS_DIRNAME, f"{period}.jsonl")
+
+
+# ==========================
+# PENGIRIMAN MASSAL
+# ==========================
+
+def _send_with_retry(send, msg, max_retries):
+    """
+    Kirim satu email, ulangi kegagalan sementara dengan exponential backoff + jitter.
+    Mengembalikan jumlah percobaan; raise error terakhir jika tetap gagal.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            send(msg)
+            return attempt
+        except Exception as e:
+            if attempt > max_retries or not is_transient_error(e):
+                e.attempts = attempt
+                raise
+            delay = RETRY_BASE_DELAY * (2 ** (attempt - 1)) * (1 + random.random() * 0.5)
+            logger.warning(f"Gagal kirim (percobaan {attempt}), diulang dalam {delay:.1f} detik: {str(e)}")
+            time.sleep(delay)
+
+def _recipients(file_path):
+    df = get_period_payroll(file_path)
+    if 'EMAIL' not in df.columns:
+        raise ValueError("Kolom EMAIL tidak ditemukan di data gaji")
+    df = df[df['NUP'].notna()]
+    return df.to_dict('records')
+
+def dispatch_period_emails(file_path, period, folder, concurrency=None, max_retries=None,
+                           progress=None, send=None):
+    """
+    Kirim slip PDF (yang sudah dibuat oleh batch PDF) ke semua pegawai di satu
+    periode. Koneksi SMTP dipakai ulang lewat pool, jumlah pengiriman paralel
+    dibatasi concurrency, dan status per penerima disimpan sehingga pengiriman
+    ulang hanya mengirim yang belum berhasil.
+    Dengan EMAIL_PROVIDER=graph, email dikirim lewat GraphClient (token dan
+    koneksi dipakai ulang, laju dibatasi GRAPH_RATE_LIMIT).
+    """
+    concurrency = concurrency or DEFAULT_CONCURRENCY
+    max_retries = DEFAULT_MAX_RETRIES if max_retries is None else max_retries
+    status_log = DeliveryStatusLog(get_status_log_path(folder, period))
+
+    summary = {'total': 0, 'sent': 0, 'already_sent': 0, 'failed': 0, 'no_email': 0, 'errors': []}
+    jobs = []
+    for record in _recipients(file_path):
+        summary['total'] += 1
+        nup = str(record['NUP'])
+        email = record.get('EMAIL')
+        if email is None or pd.isna(email) or not str(email).strip():
+            summary['no_email'] += 1
+            continue
+        if status_log.is_sent(nup):
+            summary['already_sent'] += 1
+            continue
+        jobs.append((nup, str(email).strip(), record))
+
+    pool = None
+    graph = None
+    if send is None:
+        if EMAIL_PROVIDER == 'graph':
+            graph = get_graph_client()
+            send = graph.send_email_message
+        else:
+            pool = SMTPConnectionPool(concurrency)
+            send = pool.send
+
+    def _deliver(nup, email, record):
+        pdf_path = get_slip_output_path(record)
+        if not os.path.exists(pdf_path):
+            status_log.record(nup, email, 'failed', 0, 'PDF slip belum dibuat')
+            return nup, False, 'PDF slip belum dibuat'
+
+        bulan, tahun = record.get('BULAN'), record.get('TAHUN')
+        msg = build_email_message(
+            email,
+            build_email_subject(bulan, tahun),
+            build_email_body(record.get('NAMA'), bulan, tahun),
+            pdf_path
+        )
+        try:
+            attempts = _send_with_retry(send, msg, max_retries)
+            status_log.record(nup, email, 'sent', attempts)
+            return nup, True, None
+        except Exception as e:
+            status_log.record(nup, email, 'failed', getattr(e, 'attempts', 1), str(e))
+            return nup, False, str(e)
+
+    logger.info(f"Pengiriman email periode {period}: {len(jobs)} email, {concurrency} koneksi paralel")
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(_deliver, *job) for job in jobs]
+            for done, future in enumerate(as_completed(futures), start=1):
+                nup, ok, error = future.result()
+                if ok:
+                    summary['sent'] += 1
+                else:
+                    summary['failed'] += 1
+                    summary['errors'].append(f"NUP {nup}: {error}")
+                if progress:
+                    progress(done, len(jobs))
+    finally:
+        if pool is not None:
+            pool.close()
+
+    elapsed = time.perf_counter() - start
+    summary['elapsed'] = round(elapsed, 2)
+    summary['messages_per_second'] = round(summary['sent'] / elapsed, 2) if elapsed > 0 else 0.0
+    if pool is not None:
+        summary['connections_opened'] = pool.connections_opened
+    if graph is not None:
+        summary['tokens_fetched'] = graph.stats['tokens_fetched']
+        summary['throttled'] = graph.stats['throttled']
+
+    logger.info(
+        f"Pengiriman email selesai: {summary['sent']} terkirim, {summary['failed']} gagal, "
+        f"{summary['already_sent']} sudah terkirim sebelumnya, {summary['no_email']} tanpa email "
+        f"({summary['messages_per_second']} email/detik)"
+    )
+    return summary
@@ -0,0 +1,274 @@
+# chunked_upload.py
+"""
+Upload file besar per potongan (chunk) yang bisa dilanjutkan setelah koneksi
+putus, tanpa pernah menampung seluruh file di memori worker.
+
+Alur (route /admin/uploads di app.py):
+1. create_upload: klien mengirim nama, ukuran dan jenis file (gaji/user),
+   server membalas upload_id, chunk_size dan total_chunks.
+2. save_chunk: setiap chunk dikirim bersama SHA-256-nya, ditulis streaming ke
+   disk dan hanya disimpan jika checksum dan panjangnya cocok. Chunk yang sama
+   boleh dikirim ulang.
+3. upload_status: chunk yang sudah diterima dan yang masih kurang, untuk
+   melanjutkan upload setelah putus.
+4. assemble_upload: chunk digabung berurutan ke file tujuan (streaming, atomik),
+   SHA-256 seluruh file dicek jika dikirim saat create. Setelah itu file
+   diserahkan ke task admin yang sama dengan upload biasa.
+
+Status disimpan di <UPLOAD_FOLDER>/.uploads/<upload_id>/ sehingga terbaca semua
+worker; upload yang tidak disentuh lebih dari CHUNKED_UPLOAD_TTL_HOURS dihapus.
+"""
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+from datetime import datetime
+from werkzeug.utils import secure_filename
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_SESSION_DIRNAME = '.uploads'
+MANIFEST_FILENAME = 'upload.json'
+COMMIT_LOCK_FILENAME = 'commit.lock'
+# Ukuran chunk yang diminta ke klien, dibatasi lagi oleh MAX_CONTENT_LENGTH di app.py
+CHUNKED_UPLOAD_CHUNK_BYTES = int(os.getenv('CHUNKED_UPLOAD_CHUNK_BYTES', str(4 * 1024 * 1024)))
+# Ukuran file maksimum lewat upload per chunk
+CHUNKED_UPLOAD_MAX_BYTES = int(os.getenv('CHUNKED_UPLOAD_MAX_BYTES', str(512 * 1024 * 1024)))
+CHUNKED_UPLOAD_TTL_HOURS = float(os.getenv('CHUNKED_UPLOAD_TTL_HOURS', '24'))
+UPLOAD_KINDS = ('gaji', 'user')
+CHECKSUM_HEADER = 'X-Chunk-Sha256'
+
+_COPY_BLOCK = 64 * 1024
+_UPLOAD_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+_SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def get_upload_dir(folder, upload_id):
+    return os.path.join(folder, UPLOAD_SESSION_DIRNAME, upload_id)
+
+def _manifest_path(folder, upload_id):
+    return os.path.join(get_upload_dir(folder, upload_id), MANIFEST_FILENAME)
+
+def _chunk_path(folder, upload_id, index):
+    return os.path.join(get_upload_dir(folder, upload_id), f"{index:06d}.chunk")
+
+def _normalize_checksum(value, label):
+    checksum = str(value or '').strip().lower()
+    if not _SHA256_RE.match(checksum):
+        raise ValueError(f"{label} harus berupa SHA-256 heksadesimal (64 karakter)")
+    return checksum
+
+def _write_manifest(folder, state):
+    path = _manifest_path(folder, state['upload_id'])
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+# ==========================
+# SESI UPLOAD
+# ==========================
+
+def create_upload(folder, filename, size, kind, chunk_size=None, sha256=None, options=None, created_by=None):
+    """
+    Mulai upload baru dan kembalikan statusnya (lihat upload_status).
+    """
+    cleanup_expired_uploads(folder)
+
+    if kind not in UPLOAD_KINDS:
+        raise ValueError(f"Jenis upload harus salah satu dari: {', '.join(UPLOAD_KINDS)}")
+    filename = secure_filename(filename or '')
+    if not filename:
+        raise ValueError("Nama file tidak valid")
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise ValueError("Ukuran file tidak valid")
+    if size <= 0:
+        raise ValueError("File kosong")
+    if size > CHUNKED_UPLOAD_MAX_BYTES:
+        raise ValueError(f"Ukuran file melebihi batas {CHUNKED_UPLOAD_MAX_BYTES // (1024 * 1024)} MB")
+
+    chunk_size = max(int(chunk_size or CHUNKED_UPLOAD_CHUNK_BYTES), 1)
+    state = {
+        'upload_id': uuid.uuid4().hex,
+        'filename': filename,
+        'kind': kind,
+        'size': size,
+        'chunk_size': chunk_size,
+        'total_chunks': -(-size // chunk_size),
+        'sha256': _normalize_checksum(sha256, "Checksum file") if sha256 else None,
+        'options': options or {},
+        'created_by': created_by,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    os.makedirs(get_upload_dir(folder, state['upload_id']))
+    _write_manifest(folder, state)
+    logger.info(
+        f"Upload per chunk dimulai oleh {created_by}: {filename} ({kind}, {size} byte, "
+        f"{state['total_chunks']} chunk) -> {state['upload_id']}"
+    )
+    return upload_status(folder, state)
+
+def load_upload(folder, upload_id):
+    """
+    Status tersimpan satu upload, None jika tidak ada atau sudah kedaluwarsa.
+    """
+    if not _UPLOAD_ID_RE.match(upload_id or ''):
+        return None
+    try:
+        with open(_manifest_path(folder, upload_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _received_chunks(folder, state):
+    received = []
+    for name in os.listdir(get_upload_dir(folder, state['upload_id'])):
+        if name.endswith('.chunk'):
+            received.append(int(name[:-len('.chunk')]))
+    return sorted(received)
+
+def upload_status(folder, state):
+    received = _received_chunks(folder, state)
+    done = set(received)
+    return {
+        'upload_id': state['upload_id'],
+        'filename': state['filename'],
+        'kind': state['kind'],
+        'size': state['size'],
+        'chunk_size': state['chunk_size'],
+        'total_chunks': state['total_chunks'],
+        'received': received,
+        'missing': [index for index in range(state['total_chunks']) if index not in done],
+        'checksum_header': CHECKSUM_HEADER,
+    }
+
+def _expected_length(state, index):
+    if index == state['total_chunks'] - 1:
+        return state['size'] - index * state['chunk_size']
+    return state['chunk_size']
+
+def save_chunk(folder, state, index, stream, checksum):
+    """
+    Tulis satu chunk dari stream (request.stream) ke disk per blok sambil
+    menghitung SHA-256. Chunk hanya disimpan jika panjang dan checksum cocok;
+    jika tidak, ValueError dan klien bisa mengirim ulang chunk itu.
+    """
+    if not 0 <= index < state['total_chunks']:
+        raise ValueError(f"Nomor chunk harus 0 sampai {state['total_chunks'] - 1}")
+    checksum = _normalize_checksum(checksum, f"Header {CHECKSUM_HEADER}")
+    expected = _expected_length(state, index)
+
+    path = _chunk_path(folder, state['upload_id'], index)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    digest = hashlib.sha256()
+    length = 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            while True:
+                block = stream.read(_COPY_BLOCK)
+                if not block:
+                    break
+                length += len(block)
+                if length > expected:
+                    raise ValueError(f"Chunk {index} lebih besar dari {expected} byte")
+                digest.update(block)
+                f.write(block)
+        if length != expected:
+            raise ValueError(f"Chunk {index} berisi {length} byte, seharusnya {expected}")
+        if digest.hexdigest() != checksum:
+            raise ValueError(f"Checksum chunk {index} tidak cocok, kirim ulang chunk ini")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    # Waktu aktivitas terakhir untuk batas kedaluwarsa
+    os.utime(_manifest_path(folder, state['upload_id']))
+    return upload_status(folder, state)
+
+def assemble_upload(folder, state, target_path):
+    """
+    Gabungkan semua chunk ke target_path (streaming, diganti atomik) lalu hapus
+    sesi upload. Mengembalikan {'size', 'sha256'} file hasil.
+    """
+    upload_id = state['upload_id']
+    # Sesi upload sudah dihapus oleh commit lain yang selesai lebih dulu
+    done_message = "Upload ini sudah selesai digabungkan atau tidak ditemukan"
+    try:
+        missing = upload_status(folder, state)['missing']
+    except FileNotFoundError:
+        raise ValueError(done_message)
+    if missing:
+        raise ValueError(f"{len(missing)} chunk belum diterima (mis. chunk {missing[0]})")
+
+    # Satu commit per upload, commit kedua yang bersamaan ditolak
+    lock_path = os.path.join(get_upload_dir(folder, upload_id), COMMIT_LOCK_FILENAME)
+    try:
+        os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        raise ValueError("Upload ini sedang digabungkan")
+    except FileNotFoundError:
+        raise ValueError(done_message)
+
+    part_path = f"{target_path}.{upload_id}.part"
+    digest = hashlib.sha256()
+    try:
+        with open(part_path, 'wb') as out:
+            for index in range(state['total_chunks']):
+                with open(_chunk_path(folder, upload_id, index), 'rb') as chunk:
+                    while True:
+                        block = chunk.read(_COPY_BLOCK)
+                        if not block:
+                            break
+                        digest.update(block)
+                        out.write(block)
+        if state['sha256'] and digest.hexdigest() != state['sha256']:
+            raise ValueError("Checksum file hasil gabungan tidak sama dengan checksum yang dikirim")
+        os.replace(part_path, target_path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        os.remove(lock_path)
+        raise
+
+    remove_upload(folder, upload_id)
+    logger.info(f"Upload {upload_id} selesai digabung: {target_path} ({state['size']} byte)")
+    return {'size': state['size'], 'sha256': digest.hexdigest()}
+
+def remove_upload(folder, upload_id):
+    if _UPLOAD_ID_RE.match(upload_id or ''):
+        shutil.rmtree(get_upload_dir(folder, upload_id), ignore_errors=True)
+
+def cleanup_expired_uploads(folder, max_age_hours=None):
+    """
+    Hapus upload yang tidak aktif lebih dari max_age_hours (default CHUNKED_UPLOAD_TTL_HOURS).
+    """
+    max_age = (CHUNKED_UPLOAD_TTL_HOURS if max_age_hours is None else max_age_hours) * 3600
+    root = os.path.join(folder, UPLOAD_SESSION_DIRNAME)
+    if not os.path.isdir(root):
+        return 0
+
+    removed = 0
+    now = time.time()
+    for upload_id in os.listdir(root):
+        path = get_upload_dir(folder, upload_id)
+        try:
+            last_active = os.path.getmtime(os.path.join(path, MANIFEST_FILENAME))
+        except OSError:
+            try:
+                last_active = os.path.getmtime(path)
+            except OSError:  # sudah dihapus proses lain
+                continue
+        if now - last_active > max_age:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    if removed:
+        logger.info(f"{removed} upload per chunk yang kedaluwarsa dihapus")
+    return removed
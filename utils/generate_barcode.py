@@ -1,42 +1,141 @@
 import io
+import os
+import time
 import base64
+import threading
+from collections import OrderedDict
 import qrcode
+from utils.metrics import stage
 
+# Format default: 'png' (seperti sebelumnya), 'png-compact' atau 'svg'
+QR_FORMAT = os.getenv('QR_FORMAT', 'png')
+# Ukuran modul QR per format; QR ditampilkan setinggi 80px sehingga
+# box_size=10 jauh lebih besar dari yang dibutuhkan
+BOX_SIZES = {'png': 10, 'png-compact': 4}
 
-def generate_payslip_barcode_uri(employee_id, pay_period, signer_name, signer_title):
-    """
-    Generates a Base64 encoded QR Code string for a payslip.
+# Cache LRU + TTL: payload (NUP, periode, penandatangan) sama di setiap tampilan slip
+QR_CACHE_SIZE = int(os.getenv('QR_CACHE_SIZE', '4096'))
+QR_CACHE_TTL = int(os.getenv('QR_CACHE_TTL', '3600'))  # detik
 
-    Returns:
-        str: A Data URI string (base64 encoded).
+_lock = threading.Lock()
+_cache = OrderedDict()  # (payload, format) -> (waktu dibuat, data URI)
+_stats = {'calls': 0, 'hits': 0, 'misses': 0, 'evictions': 0, 'build_seconds': 0.0, 'total_seconds': 0.0}
+
+
+def _matrix_to_svg(matrix):
     """
-    # Gabungkan semua data ke dalam satu string tunggal
-    barcode_data = f"Slip Gaji : {employee_id}|{pay_period}|\nSigned by : {signer_name}|{signer_title}"
+    SVG ringkas: modul hitam yang berurutan dalam satu baris digabung menjadi
+    satu persegi panjang, semuanya dalam satu <path>. Jauh lebih kecil daripada
+    SVG bawaan qrcode yang menulis satu kotak per modul.
+    """
+    size = len(matrix)
+    segments = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if row[x]:
+                start = x
+                while x < size and row[x]:
+                    x += 1
+                width = x - start
+                segments.append(f"M{start} {y}h{width}v1h-{width}z")
+            else:
+                x += 1
+    svg = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/>'
+        f'<path d="{"".join(segments)}"/></svg>'
+    )
+    return svg.encode('utf-8')
 
+def _build_data_uri(barcode_data, fmt):
     # Buat objek QR Code
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_H,
-        box_size=10,
+        box_size=BOX_SIZES.get(fmt, 10),
         border=4,
     )
     qr.add_data(barcode_data)
     qr.make(fit=True)
 
+    if fmt == 'svg':
+        # SVG vektor: tetap tajam di PDF pada ukuran berapa pun
+        base64_encoded = base64.b64encode(_matrix_to_svg(qr.get_matrix())).decode('utf-8')
+        return f"data:image/svg+xml;base64,{base64_encoded}"
+
     # Buat gambar dari QR Code
     img = qr.make_image(fill_color="black", back_color="white")
 
     # Simpan gambar ke buffer memori
     buffer = io.BytesIO()
-    img.save(buffer, format='PNG')
+    if fmt == 'png-compact':
+        img.save(buffer, format='PNG', optimize=True)
+    else:
+        img.save(buffer, format='PNG')
+
+    # Encode byte ke Base64 dan buat string Data URI
+    base64_encoded = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    return f"data:image/png;base64,{base64_encoded}"
+
+
+def generate_payslip_barcode_uri(employee_id, pay_period, signer_name, signer_title, fmt=None):
+    """
+    Generates a Base64 encoded QR Code string for a payslip.
+
+    Results are memoized per payload in a bounded LRU cache with a TTL.
+
+    Returns:
+        str: A Data URI string (base64 encoded).
+    """
+    start = time.perf_counter()
+    fmt = fmt or QR_FORMAT
 
-    # Dapatkan byte dari buffer
-    image_bytes = buffer.getvalue()
+    # Gabungkan semua data ke dalam satu string tunggal
+    barcode_data = f"Slip Gaji : {employee_id}|{pay_period}|\nSigned by : {signer_name}|{signer_title}"
+    key = (barcode_data, fmt)
 
-    # Encode byte ke Base64
-    base64_encoded = base64.b64encode(image_bytes).decode('utf-8')
+    with _lock:
+        _stats['calls'] += 1
+        cached = _cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < QR_CACHE_TTL:
+            _cache.move_to_end(key)
+            _stats['hits'] += 1
+            _stats['total_seconds'] += time.perf_counter() - start
+            return cached[1]
+
+    build_start = time.perf_counter()
+    with stage('qr_generate'):
+        data_uri = _build_data_uri(barcode_data, fmt)
+    build_elapsed = time.perf_counter() - build_start
+
+    with _lock:
+        _cache[key] = (time.monotonic(), data_uri)
+        _cache.move_to_end(key)
+        while len(_cache) > QR_CACHE_SIZE:
+            _cache.popitem(last=False)
+            _stats['evictions'] += 1
+        _stats['misses'] += 1
+        _stats['build_seconds'] += build_elapsed
+        _stats['total_seconds'] += time.perf_counter() - start
+
+    return data_uri
+
+
+def get_barcode_stats():
+    """
+    Statistik cache dan waktu per panggilan (ms) untuk memantau efek cache.
+    """
+    with _lock:
+        stats = dict(_stats)
+        stats['cached'] = len(_cache)
+    stats['hit_ratio'] = round(stats['hits'] / stats['calls'], 4) if stats['calls'] else 0.0
+    stats['avg_call_ms'] = round(stats['total_seconds'] * 1000 / stats['calls'], 3) if stats['calls'] else 0.0
+    stats['avg_build_ms'] = round(stats['build_seconds'] * 1000 / stats['misses'], 3) if stats['misses'] else 0.0
+    stats['format'] = QR_FORMAT
+    return stats
 
-    # Buat string Data URI
-    data_uri = f"data:image/png;base64,{base64_encoded}"
 
-    return data_uri
\ No newline at end of file
+def clear_barcode_cache():
+    with _lock:
+        _cache.clear()
@@ -1,11 +1,177 @@
+import io
 import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
 import pdfkit
 import shutil
 import pikepdf
+from contextlib import contextmanager
 from flask import current_app as app
+from utils.helpers import get_komponen_by_status
+from utils.generate_barcode import generate_payslip_barcode_uri
+from utils.metrics import stage, timed
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
-def generate_pdf(data):
+logger = logging.getLogger(__name__)
+
+PDF_OPTIONS = {
+    "enable-local-file-access": "",
+    "no-stop-slow-scripts": "",
+    "disable-smart-shrinking": "",
+    "load-error-handling": "ignore"
+}
+
+def build_slip_data(user_dict):
+    """
+    Lengkapi data satu pegawai dengan komponen gaji dan barcode untuk generate_pdf.
+    """
+    komponen_thp, komponen_lain, komponen_potongan = get_komponen_by_status(user_dict)
+
+    # Dapatkan data yang diperlukan untuk barcode
+    employee_id = user_dict.get('NUP')
+    pay_period = f"{user_dict.get('BULAN')}-{user_dict.get('TAHUN')}"
+    signer_name = user_dict.get('PENANDATANGAN')
+    signer_title = user_dict.get('JABATAN_PENANDATANGAN')
+
+    barcode_uri = generate_payslip_barcode_uri(
+        employee_id,
+        pay_period,
+        signer_name,
+        signer_title
+    )
+
+    return {
+        **user_dict,
+        "komponen_thp": komponen_thp,
+        "komponen_lain": komponen_lain,
+        "komponen_potongan": komponen_potongan,
+        "status": str(user_dict.get('STATUS_PEGAWAI', '')).lower(),
+        "barcode_uri": barcode_uri,
+        "total_thp": user_dict.get("TOTAL_THP"),
+        "total_lain": user_dict.get("PENGHASILAN_LAIN")
+    }
+
+def get_slip_output_path(data):
+    bulan = str(data.get('BULAN', 'Unknown')).strip()
+    tahun = str(data.get('TAHUN', '0000')).strip()
+    folder_path = os.path.join("static", "slips", f"{tahun}-{bulan}")
+    filename = f"slip_{data['NUP']}_{data['NAMA']}_{bulan}_{tahun}.pdf"
+    return os.path.join(folder_path, filename)
+
+# File yang ikut menentukan isi PDF selain data pegawai
+ASSET_PATHS = [
+    "static/logobki.png",
+    "static/tandatangan.png",
+    "static/css/styles.css",
+    "static/css/sidebar.css",
+]
+
+_cache_lock = threading.Lock()
+_cache_stats = {'hits': 0, 'misses': 0}
+_asset_fingerprint = {'key': None, 'value': None}
+
+
+def _get_asset_fingerprint():
+    """
+    Hash template slip.html dan aset statis. Dihitung ulang hanya jika mtime/ukuran
+    salah satu file berubah, jadi mengubah template otomatis membatalkan cache.
+    """
+    paths = [app.jinja_env.get_template('slip.html').filename] + [os.path.abspath(p) for p in ASSET_PATHS]
+    key = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            key.append((path, st.st_mtime_ns, st.st_size))
+        except OSError:
+            key.append((path, None, None))
+    key = tuple(key)
+
+    with _cache_lock:
+        if _asset_fingerprint['key'] == key:
+            return _asset_fingerprint['value']
+
+    sha = hashlib.sha256()
+    for path, mtime, _ in key:
+        sha.update(path.encode('utf-8'))
+        if mtime is not None:
+            with open(path, 'rb') as f:
+                sha.update(f.read())
+
+    with _cache_lock:
+        _asset_fingerprint['key'] = key
+        _asset_fingerprint['value'] = sha.hexdigest()
+    return _asset_fingerprint['value']
+
+def slip_data_hash(data):
+    """
+    Hash isi slip: data pegawai, versi template dan aset statis. PDF yang sudah
+    ada hanya dipakai ulang jika hash ini sama.
+    """
+    payload = json.dumps(data, sort_keys=True, default=str)
+    sha = hashlib.sha256(_get_asset_fingerprint().encode('utf-8'))
+    sha.update(payload.encode('utf-8'))
+    return sha.hexdigest()
+
+@contextmanager
+def _slip_lock(output_path, exclusive):
+    """
+    Kunci per slip (flock pada <pdf>.lock, berlaku antar worker): PDF dan
+    .sha256-nya ditulis di bawah kunci eksklusif dan dibaca di bawah kunci
+    bersama, sehingga keduanya selalu terbaca sebagai satu pasangan.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(output_path + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _read_slip_hash(output_path):
+    # Dipanggil di bawah _slip_lock; None jika PDF kosong
+    with open(output_path + '.sha256', 'r') as f:
+        stored_hash = f.read().strip()
+    if os.path.getsize(output_path) == 0:
+        return None
+    return stored_hash
+
+def is_slip_current(data, output_path=None):
+    """
+    True jika PDF untuk data ini sudah pernah dibuat dan isinya tidak berubah.
+    """
+    output_path = output_path or get_slip_output_path(data)
+    expected = slip_data_hash(data)
+    try:
+        with _slip_lock(output_path, exclusive=False):
+            return _read_slip_hash(output_path) == expected
+    except OSError:
+        return False
+
+def get_pdf_cache_stats():
+    with _cache_lock:
+        hits, misses = _cache_stats['hits'], _cache_stats['misses']
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else 0.0,
+    }
+
+def get_pdfkit_config():
+    wkhtmltopdf_path = shutil.which("wkhtmltopdf") or r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe"
+    return pdfkit.configuration(wkhtmltopdf=wkhtmltopdf_path)
+
+@timed('render_slip_html')
+def render_slip_html(data):
     env = app.jinja_env
     template = env.get_template('slip.html')
 
@@ -17,7 +183,7 @@ def generate_pdf(data):
     signature_uri = f"file:///{signature_path}"
     css_uri = f"file:///{css_path}"
 
-    html_out = template.render(
+    return template.render(
         **data,
         logo_path=logo_uri,
         signature_path=signature_uri,
@@ -25,33 +191,163 @@ def generate_pdf(data):
         is_pdf=True
     )
 
-    bulan = str(data.get('BULAN', 'Unknown')).strip()
-    tahun = str(data.get('TAHUN', '0000')).strip()
-    folder_path = os.path.join("static", "slips", f"{tahun}-{bulan}")
-    os.makedirs(folder_path, exist_ok=True)
+def _remove_slip_hash(output_path):
+    # Hash lama dihapus sebelum render supaya PDF setengah jadi tidak dianggap valid
+    try:
+        os.remove(output_path + '.sha256')
+    except OSError:
+        pass
 
-    filename = f"slip_{data['NUP']}_{data['NAMA']}_{bulan}_{tahun}.pdf"
-    output_path = os.path.join(folder_path, filename)
+def _atomic_write(path, content):
+    """
+    Tulis ke file sementara unik lalu rename, sehingga dua request yang menulis
+    slip yang sama tidak saling menimpa di tengah jalan.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
-    wkhtmltopdf_path = shutil.which("wkhtmltopdf") or r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe"
-    config = pdfkit.configuration(wkhtmltopdf=wkhtmltopdf_path)
-    options = {
-        "enable-local-file-access": "",
-        "no-stop-slow-scripts": "",
-        "disable-smart-shrinking": "",
-        "load-error-handling": "ignore"
-    }
+def _save_pdf(output_path, pdf_bytes, data):
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    data_hash = slip_data_hash(data)
+    with _slip_lock(output_path, exclusive=True):
+        _remove_slip_hash(output_path)
+        _atomic_write(output_path, pdf_bytes)
+        # Hash data dicatat supaya batch berikutnya bisa melewati slip yang tidak berubah
+        _atomic_write(output_path + '.sha256', data_hash.encode('utf-8'))
 
-    pdfkit.from_string(html_out, output_path, configuration=config, options=options)
+def _read_cached_pdf(data, output_path):
+    """
+    Ambil PDF yang sudah ada jika isinya masih sesuai dengan data, None jika tidak.
+    Hash dan PDF dibaca di bawah kunci yang sama.
+    """
+    expected = slip_data_hash(data)
+    pdf_bytes = None
+    try:
+        with _slip_lock(output_path, exclusive=False):
+            if _read_slip_hash(output_path) == expected:
+                with open(output_path, 'rb') as f:
+                    pdf_bytes = f.read()
+    except OSError:
+        pass
+    with _cache_lock:
+        _cache_stats['hits' if pdf_bytes is not None else 'misses'] += 1
+    return pdf_bytes
+
+@timed('pdf_encrypt')
+def encrypt_pdf_bytes(pdf_bytes, password):
+    """
+    Enkripsi PDF langsung di memori (AES-128, password user dan owner sama).
+    """
+    output = io.BytesIO()
+    with pikepdf.open(io.BytesIO(pdf_bytes)) as pdf:
+        pdf.save(output, encryption=_encryption(password))
+    return output.getvalue()
+
+def render_pdf_bytes(data):
+    """
+    Render slip ke bytes: wkhtmltopdf menulis ke stdout, enkripsi di memori,
+    tanpa file perantara.
+    """
+    html_out = render_slip_html(data)
+    with stage('wkhtmltopdf'):
+        pdf_bytes = pdfkit.from_string(html_out, False, configuration=get_pdfkit_config(), options=PDF_OPTIONS)
 
     # Gunakan langsung password yang sudah diformat di app.py
     ttl_password = str(data.get("PASSWORD", "")).strip()
 
     if ttl_password:
-        protect_pdf(output_path, output_path, ttl_password)
+        pdf_bytes = encrypt_pdf_bytes(pdf_bytes, ttl_password)
+    return pdf_bytes
+
+def generate_pdf_bytes(data, persist=True, use_cache=True):
+    """
+    Hasilkan PDF slip sebagai (nama_file, bytes) untuk dikirim langsung dari memori.
+    Menyimpan ke static/slips hanya efek samping opsional (persist).
+    """
+    output_path = get_slip_output_path(data)
+    filename = os.path.basename(output_path)
 
+    if use_cache:
+        pdf_bytes = _read_cached_pdf(data, output_path)
+        if pdf_bytes is not None:
+            return filename, pdf_bytes
+
+    pdf_bytes = render_pdf_bytes(data)
+    if persist:
+        _save_pdf(output_path, pdf_bytes, data)
+    return filename, pdf_bytes
+
+def generate_pdf(data, use_cache=True):
+    output_path = get_slip_output_path(data)
+
+    # PDF dengan isi yang sama sudah ada: lewati wkhtmltopdf dan pikepdf
+    if use_cache:
+        if is_slip_current(data, output_path):
+            with _cache_lock:
+                _cache_stats['hits'] += 1
+            return output_path
+        with _cache_lock:
+            _cache_stats['misses'] += 1
+
+    _save_pdf(output_path, render_pdf_bytes(data), data)
     return output_path
 
-def protect_pdf(input_path, output_path, password):
-    pdf = pikepdf.open(input_path, allow_overwriting_input=True)
-    pdf.save(output_path, encryption=pikepdf.Encryption(owner=password, user=password, R=4))
+def generate_pdfs(data_list):
+    """
+    Render banyak slip dengan satu proses wkhtmltopdf: setiap slip menjadi satu
+    input HTML (selalu mulai di halaman baru), hasil gabungan dipecah per pegawai
+    dengan pikepdf lalu dienkripsi sama seperti generate_pdf.
+    Jika jumlah halaman tidak sama dengan jumlah slip (ada slip lebih dari satu
+    halaman), batch ini dirender ulang satu per satu.
+    """
+    if not data_list:
+        return []
+
+    with tempfile.TemporaryDirectory(prefix='slips_') as tmp_dir:
+        html_paths = []
+        for i, data in enumerate(data_list):
+            html_path = os.path.join(tmp_dir, f"slip_{i:05d}.html")
+            with open(html_path, 'w', encoding='utf-8') as f:
+                f.write(render_slip_html(data))
+            html_paths.append(html_path)
+
+        combined_path = os.path.join(tmp_dir, 'combined.pdf')
+        with stage('wkhtmltopdf_batch'):
+            pdfkit.from_file(html_paths, combined_path, configuration=get_pdfkit_config(), options=PDF_OPTIONS)
+
+        with pikepdf.open(combined_path) as combined:
+            if len(combined.pages) != len(data_list):
+                logger.warning(
+                    f"Render gabungan menghasilkan {len(combined.pages)} halaman untuk "
+                    f"{len(data_list)} slip, kembali ke render per slip"
+                )
+                return [generate_pdf(data, use_cache=False) for data in data_list]
+
+            output_paths = []
+            for page, data in zip(combined.pages, data_list):
+                output_path = get_slip_output_path(data)
+
+                single = pikepdf.new()
+                single.pages.append(page)
+                single.docinfo = single.copy_foreign(combined.docinfo)
+
+                buffer = io.BytesIO()
+                ttl_password = str(data.get("PASSWORD", "")).strip()
+                with stage('pdf_encrypt'):
+                    if ttl_password:
+                        single.save(buffer, encryption=_encryption(ttl_password))
+                    else:
+                        single.save(buffer)
+
+                _save_pdf(output_path, buffer.getvalue(), data)
+                output_paths.append(output_path)
+            return output_paths
+
+def _encryption(password):
+    return pikepdf.Encryption(owner=password, user=password, R=4)
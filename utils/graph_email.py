@@ -1,65 +1,241 @@
 # graph_email.py
 import os
+import time
+import base64
+import logging
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 CLIENT_ID = os.getenv('GRAPH_CLIENT_ID')
 TENANT_ID = os.getenv('GRAPH_TENANT_ID')
 CLIENT_SECRET = os.getenv('GRAPH_CLIENT_SECRET')
 EMAIL_ADDRESS = os.getenv('EMAIL_USER')  # Email pengirim
 
+# Endpoint bisa diarahkan ke stub lokal (benchmarks/graph_stub.py) saat pengujian
+GRAPH_TOKEN_URL = os.getenv('GRAPH_TOKEN_URL', f"https://login.microsoftonline.com/{TENANT_ID}/oauth2/v2.0/token")
+GRAPH_API_URL = os.getenv('GRAPH_API_URL', 'https://graph.microsoft.com/v1.0').rstrip('/')
+GRAPH_SCOPE = 'https://graph.microsoft.com/.default'
+
+# Batas pengiriman: jumlah request sendMail per detik dan koneksi keep-alive
+GRAPH_RATE_LIMIT = float(os.getenv('GRAPH_RATE_LIMIT', '4'))
+GRAPH_POOL_SIZE = int(os.getenv('GRAPH_POOL_SIZE', '8'))
+GRAPH_MAX_THROTTLE_RETRIES = int(os.getenv('GRAPH_MAX_THROTTLE_RETRIES', '5'))
+# Token diperbarui sedikit sebelum benar-benar kedaluwarsa
+TOKEN_REFRESH_MARGIN = 300  # detik
+REQUEST_TIMEOUT = 30
+
+
+class GraphSendError(Exception):
+    """Kegagalan sendMail; transient=True jika layak dicoba ulang (5xx, 429)."""
+
+    def __init__(self, message, status_code=None, transient=False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.transient = transient
+
+
+class RateLimiter:
+    """
+    Batasi jumlah request per detik di semua thread: setiap request mendapat
+    slot waktu berikutnya, request yang terlalu cepat menunggu slotnya.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, seconds):
+        # Dipanggil saat server membalas 429: semua thread ikut menunggu
+        with self._lock:
+            self._next = max(self._next, time.monotonic() + seconds)
+
+
+class GraphClient:
+    """
+    Klien Microsoft Graph untuk sendMail: token disimpan sampai mendekati
+    kedaluwarsa, koneksi HTTP dipakai ulang lewat satu Session, dan laju
+    pengiriman dibatasi RateLimiter. Aman dipakai dari banyak thread.
+    """
+
+    def __init__(self, token_url=None, api_url=None, sender=None,
+                 rate_limit=None, pool_size=None, max_throttle_retries=None):
+        self.token_url = token_url or GRAPH_TOKEN_URL
+        self.api_url = (api_url or GRAPH_API_URL).rstrip('/')
+        self.sender = sender or EMAIL_ADDRESS
+        self.max_throttle_retries = GRAPH_MAX_THROTTLE_RETRIES if max_throttle_retries is None else max_throttle_retries
+        self.limiter = RateLimiter(GRAPH_RATE_LIMIT if rate_limit is None else rate_limit)
+
+        pool_size = pool_size or GRAPH_POOL_SIZE
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._token = None
+        self._token_expires = 0.0
+        self._token_lock = threading.Lock()
+        self.stats = {'tokens_fetched': 0, 'sent': 0, 'throttled': 0}
+
+    # ==========================
+    # TOKEN
+    # ==========================
+
+    def get_token(self, force=False):
+        with self._token_lock:
+            if not force and self._token and time.monotonic() < self._token_expires:
+                return self._token
+
+            data = {
+                'grant_type': 'client_credentials',
+                'client_id': CLIENT_ID,
+                'client_secret': CLIENT_SECRET,
+                'scope': GRAPH_SCOPE
+            }
+            response = self.session.post(self.token_url, data=data, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            payload = response.json()
+
+            expires_in = int(payload.get('expires_in', 3600))
+            self._token = payload['access_token']
+            self._token_expires = time.monotonic() + max(expires_in - TOKEN_REFRESH_MARGIN, expires_in / 2)
+            self.stats['tokens_fetched'] += 1
+            return self._token
+
+    # ==========================
+    # SENDMAIL
+    # ==========================
+
+    @staticmethod
+    def build_message(to_email, subject, body, attachments):
+        """
+        attachments: list (nama_file, bytes). contentBytes harus base64,
+        bukan bytes mentah yang di-decode.
+        """
+        return {
+            "message": {
+                "subject": subject,
+                "body": {
+                    "contentType": "Text",
+                    "content": body
+                },
+                "toRecipients": [
+                    {"emailAddress": {"address": to_email}}
+                ],
+                "attachments": [
+                    {
+                        "@odata.type": "#microsoft.graph.fileAttachment",
+                        "name": name,
+                        "contentType": "application/pdf",
+                        "contentBytes": base64.b64encode(content).decode('ascii')
+                    }
+                    for name, content in attachments
+                ]
+            },
+            "saveToSentItems": "true"
+        }
+
+    def send_mail(self, to_email, subject, body, attachments):
+        url = f"{self.api_url}/users/{self.sender}/sendMail"
+        message = self.build_message(to_email, subject, body, attachments)
+
+        throttle_retries = 0
+        token_refreshed = False
+        while True:
+            self.limiter.wait()
+            headers = {'Authorization': f'Bearer {self.get_token()}'}
+            try:
+                response = self.session.post(url, headers=headers, json=message, timeout=REQUEST_TIMEOUT)
+            except requests.RequestException as e:
+                raise GraphSendError(f"Koneksi ke Graph gagal: {e}", transient=True) from e
+
+            if response.status_code == 202:
+                with self._token_lock:
+                    self.stats['sent'] += 1
+                return
+
+            if response.status_code == 401 and not token_refreshed:
+                # Token dicabut/kedaluwarsa lebih awal: ambil baru sekali
+                token_refreshed = True
+                self.get_token(force=True)
+                continue
+
+            if response.status_code in (429, 503) and throttle_retries < self.max_throttle_retries:
+                throttle_retries += 1
+                delay = _retry_after_seconds(response, default=2 ** throttle_retries)
+                with self._token_lock:
+                    self.stats['throttled'] += 1
+                logger.warning(f"Graph membatasi pengiriman ({response.status_code}), menunggu {delay:.1f} detik")
+                self.limiter.pause(delay)
+                continue
+
+            raise GraphSendError(
+                f"Gagal kirim Graph API ke {to_email}: {response.status_code} - {response.text[:200]}",
+                status_code=response.status_code,
+                transient=response.status_code == 429 or response.status_code >= 500
+            )
+
+    def send_email_message(self, msg):
+        """
+        Kirim EmailMessage (yang dibuat send_email.build_email_message) lewat Graph,
+        supaya pengiriman massal bisa memakai jalur yang sama dengan SMTP.
+        """
+        body_part = msg.get_body(preferencelist=('plain',))
+        attachments = [
+            (part.get_filename(), part.get_content())
+            for part in msg.iter_attachments()
+        ]
+        self.send_mail(msg['To'], msg['Subject'], body_part.get_content() if body_part else '', attachments)
+
+    def close(self):
+        self.session.close()
+
+
+def _retry_after_seconds(response, default):
+    try:
+        return max(float(response.headers.get('Retry-After')), 0.0)
+    except (TypeError, ValueError):
+        return float(default)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_graph_client():
+    """
+    Satu GraphClient per proses sehingga token dan koneksi dipakai bersama.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GraphClient()
+        return _client
+
 def get_token():
-    url = f"https://login.microsoftonline.com/{TENANT_ID}/oauth2/v2.0/token"
-    headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-    data = {
-        'grant_type': 'client_credentials',
-        'client_id': CLIENT_ID,
-        'client_secret': CLIENT_SECRET,
-        'scope': 'https://graph.microsoft.com/.default'
-    }
-
-    response = requests.post(url, headers=headers, data=data)
-    response.raise_for_status()
-    return response.json()['access_token']
+    return get_graph_client().get_token()
 
 def send_graph_email(to_email, subject, body, pdf_path):
-    token = get_token()
-
     with open(pdf_path, 'rb') as f:
         pdf_bytes = f.read()
 
-    message = {
-        "message": {
-            "subject": subject,
-            "body": {
-                "contentType": "Text",
-                "content": body
-            },
-            "toRecipients": [
-                {"emailAddress": {"address": to_email}}
-            ],
-            "attachments": [
-                {
-                    "@odata.type": "#microsoft.graph.fileAttachment",
-                    "name": os.path.basename(pdf_path),
-                    "contentBytes": pdf_bytes.decode('latin1')
-                }
-            ]
-        },
-        "saveToSentItems": "true"
-    }
-
-    headers = {
-        'Authorization': f'Bearer {token}',
-        'Content-Type': 'application/json'
-    }
-
-    url = f"https://graph.microsoft.com/v1.0/users/{EMAIL_ADDRESS}/sendMail"
-
-    response = requests.post(url, headers=headers, json=message)
-    if response.status_code == 202:
+    try:
+        get_graph_client().send_mail(to_email, subject, body, [(os.path.basename(pdf_path), pdf_bytes)])
         print(f"✅ Email Graph API terkirim ke {to_email}")
-    else:
-        print(f"❌ Gagal kirim Graph API ke {to_email}: {response.status_code} - {response.text}")
+    except (GraphSendError, requests.RequestException) as e:
+        print(f"❌ {e}")
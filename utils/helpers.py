@@ -1,8 +1,12 @@
 # helpers.py
 from werkzeug.security import generate_password_hash, check_password_hash
-from models.db import get_db_connection, get_db_cursor
+from models.db import get_db_cursor
+from utils.salary_schema import get_components
 import math
+import time
+import numpy as np
 import pandas as pd
+from datetime import datetime
 from psycopg2.extras import RealDictCursor
 import logging
 
@@ -19,6 +23,99 @@ def clean_column_names(df):
     df.columns = df.columns.str.strip().str.replace(' ', '_').str.replace('-', '_').str.upper()
     return df
 
+# Format teks TTL yang dikenali langsung sebelum parsing bebas pandas
+TTL_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d']
+# Tanggal 0 pada nomor seri tanggal Excel
+EXCEL_EPOCH = '1899-12-30'
+EMPTY_PASSWORD = "00000000"
+
+def _ttl_kind(value):
+    if isinstance(value, str):
+        return 'text'
+    if isinstance(value, datetime):
+        return 'datetime'
+    if isinstance(value, (int, float, np.number)):
+        return 'serial'
+    return 'text'
+
+def _parse_ttl(values, dayfirst):
+    """
+    Mengembalikan (dates, kinds): Series datetime64 (NaT jika gagal) dan jenis
+    nilai per baris ('empty', 'datetime', 'serial' atau 'text').
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        kinds = pd.Series('datetime', index=values.index).where(values.notna(), 'empty')
+        return values, kinds
+
+    values = values.astype(object)
+    dates = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    empty = values.isna()
+    kinds = pd.Series('empty', index=values.index, dtype=object)
+    kinds[~empty] = values[~empty].map(_ttl_kind)
+
+    is_datetime = kinds == 'datetime'
+    if is_datetime.any():
+        dates[is_datetime] = pd.to_datetime(values[is_datetime], errors='coerce')
+
+    is_serial = kinds == 'serial'
+    if is_serial.any():
+        serial = pd.to_numeric(values[is_serial], errors='coerce')
+        # Di luar rentang Timestamp (mis. angka sembarang) dianggap tidak valid
+        serial = serial.where(serial.abs() < 2_000_000)
+        dates[is_serial] = pd.to_datetime(serial, unit='D', origin=EXCEL_EPOCH, errors='coerce')
+
+    remaining = values[kinds == 'text'].astype(str).str.strip()
+    for fmt in TTL_FORMATS:
+        if remaining.empty:
+            break
+        parsed = pd.to_datetime(remaining, format=fmt, errors='coerce')
+        matched = parsed.notna()
+        dates[matched[matched].index] = parsed[matched]
+        remaining = remaining[~matched]
+    if not remaining.empty:
+        dates[remaining.index] = pd.to_datetime(remaining, format='mixed', dayfirst=dayfirst, errors='coerce')
+
+    return dates, kinds
+
+def parse_ttl_column(values, dayfirst=True):
+    """
+    Parse satu kolom TTL (tanggal lahir) sekaligus: datetime, nomor seri Excel,
+    dan teks (TTL_FORMATS, sisanya parsing bebas pandas dengan dayfirst).
+    Mengembalikan (dates, invalid): Series datetime64 dan mask baris yang
+    kosong atau tidak dikenali (NaT).
+    """
+    dates, _ = _parse_ttl(values, dayfirst)
+    return dates, dates.isna()
+
+def format_password_column(values):
+    """
+    Password PDF (ddmmyyyy) untuk satu kolom TTL. TTL kosong atau serial yang
+    tidak valid menjadi 00000000, teks yang tidak dikenali dipakai apa adanya
+    (zfill 8).
+    """
+    values = pd.Series(values)
+    dates, kinds = _parse_ttl(values, dayfirst=True)
+    passwords = dates.dt.strftime('%d%m%Y').astype(object)
+
+    invalid = dates.isna()
+    if invalid.any():
+        text = invalid & (kinds == 'text')
+        passwords[invalid] = EMPTY_PASSWORD
+        passwords[text] = values[text].astype(str).str.zfill(8)
+    return passwords
+
+def format_password_ttl(ttl_value):
+    """
+    Ubah nilai TTL (tanggal lahir) menjadi password PDF dengan format ddmmyyyy.
+    Untuk satu kolom penuh gunakan format_password_column.
+    """
+    try:
+        return format_password_column(pd.Series([ttl_value], dtype=object)).iat[0]
+    except Exception as e:
+        logger.error(f"Error formatting password TTL: {e}")
+        return EMPTY_PASSWORD
+
 def round_half_up(n):
     """
     Pembulatan ke atas jika >=0.5, ke bawah jika <0.5
@@ -56,12 +153,14 @@ def get_user_by_nup(nup):
         logger.error(f"Error getting user {nup}: {str(e)}")
         return None
 
-def check_user_password(nup, password):
+def check_user_password(nup, password, user=None):
     """
-    Cek password user
+    Cek password user. Baris user yang sudah diambil bisa diberikan supaya
+    tidak meminjam koneksi database lagi.
     """
     try:
-        user = get_user_by_nup(nup)
+        if user is None:
+            user = get_user_by_nup(nup)
         if user:
             return check_password_hash(user['password'], password)
         return False
@@ -69,6 +168,29 @@ def check_user_password(nup, password):
         logger.error(f"Error checking password for {nup}: {str(e)}")
         return False
 
+def authenticate_user(nup, password):
+    """
+    Login dengan satu query: ambil user sekali lalu verifikasi hash sekali.
+    Mengembalikan (user atau None, timings) dengan timings dalam milidetik
+    per tahap ('db', 'hash').
+    """
+    timings = {}
+    start = time.perf_counter()
+    user = get_user_by_nup(nup)
+    timings['db'] = (time.perf_counter() - start) * 1000
+
+    if not user or not user.get('is_active', True):
+        return None, timings
+
+    start = time.perf_counter()
+    try:
+        valid = check_password_hash(user['password'], password)
+    except Exception as e:
+        logger.error(f"Error checking password for {nup}: {str(e)}")
+        valid = False
+    timings['hash'] = (time.perf_counter() - start) * 1000
+    return (user if valid else None), timings
+
 def update_password(nup, new_password):
     """
     Update password user
@@ -117,80 +239,6 @@ def add_user(nup, plain_password, role='pegawai'):
 def get_komponen_by_status(user_dict):
     """
     Pisahkan komponen THP, komponen lain, dan potongan berdasarkan status pegawai
+    (susunannya di utils/salary_schema.SALARY_SCHEMA)
     """
-    status = str(user_dict.get('STATUS_PEGAWAI', '')).lower()
-
-    if status == 'pkwtt':
-        komponen_thp = {
-            "Gaji Dasar 1": user_dict.get("GAJI_DASAR_1", 0),
-            "Gaji Dasar 2": user_dict.get("GAJI_DASAR_2", 0),
-            "Tunjangan Grade": user_dict.get("TUNJ_GRADE", 0)
-        }
-        komponen_lain = {
-            "Insentif": user_dict.get("INSENTIF", 0),
-            "Rapel": user_dict.get("RAPEL", 0),
-            "Tunjangan Struktural": user_dict.get("TUNJ_STRUKTURAL", 0),
-            "Uang Makan": user_dict.get("FOODING", 0),
-            "Uang Transport": user_dict.get("TRANSPORT", 0),
-            "Telpon": user_dict.get("TELPON", 0),
-            "Uang Bensin": user_dict.get("BENSIN", 0),
-            "Uang Perumahan": user_dict.get("PERUMAHAN", 0),
-            "EToll": user_dict.get("ETOLL", 0),
-            "Tunjangan Kendaraan": user_dict.get("KENDARAAN", 0)
-        }
-        komponen_potongan = {
-            "IDP": user_dict.get("IDP", 0),
-            "PIP": user_dict.get("PIP", 0),
-            "DPLK": user_dict.get("DPLK", 0),
-            "Simp. Wajib Koperasi": user_dict.get("SIKOP", 0),
-            "Pinjaman Koperasi": user_dict.get("PINKOP", 0),
-            "Serikat Pekerja": user_dict.get("SP", 0),
-            "BPJS Ketenagakerjaan - JHT": user_dict.get("JAMSOSTEK", 0),
-            "BPJS Ketenagakerjaan - JP": user_dict.get("JAMINAN_PENSIUN", 0),
-            "BPJS Kesehatan": user_dict.get("BPJS_KESEHATAN", 0),
-            "Lain-Lain": user_dict.get("LAIN_LAIN", 0)
-        }
-
-    elif status == 'pkwt':
-        komponen_thp = {
-            "Honorarium": user_dict.get("GAJI_KONTRAK", 0),
-            "Bantuan DPLK": user_dict.get("BANTUAN_DPLK", 0)
-        }
-        komponen_lain = {
-            "Insentif": user_dict.get("INSENTIF", 0),
-            "Uang Makan": user_dict.get("FOODING", 0),
-            "Uang Transport": user_dict.get("TRANSPORT", 0)
-        }
-        komponen_potongan = {
-            "DPLK": user_dict.get("DPLK", 0),
-            "Simp. Wajib Koperasi": user_dict.get("SIKOP", 0),
-            "Pinjaman Koperasi": user_dict.get("PINKOP", 0),
-            "Serikat Pekerja": user_dict.get("SP", 0),
-            "BPJS Ketenagakerjaan - JHT": user_dict.get("JAMSOSTEK", 0),
-            "BPJS Ketenagakerjaan - JP": user_dict.get("JAMINAN_PENSIUN", 0),
-            "BPJS Kesehatan": user_dict.get("BPJS_KESEHATAN", 0),
-            "Lain-Lain": user_dict.get("LAIN_LAIN", 0)
-        }
-
-    elif status == 'tambahan':
-        komponen_thp = {
-            "Honorarium": user_dict.get("GAJI_KONTRAK", 0)
-        }
-        komponen_lain = {
-            "Uang Perumahan": user_dict.get("PERUMAHAN", 0),
-            "Uang Transport": user_dict.get("TRANSPORT", 0)
-        }
-        komponen_potongan = {
-            "Simp. Wajib Koperasi": user_dict.get("SIKOP", 0),
-            "Pinjaman Koperasi": user_dict.get("PINKOP", 0),
-            "BPJS Ketenagakerjaan - JHT": user_dict.get("JAMSOSTEK", 0),
-            "BPJS Ketenagakerjaan - JP": user_dict.get("JAMINAN_PENSIUN", 0),
-            "BPJS Kesehatan": user_dict.get("BPJS_KESEHATAN", 0),
-        }
-
-    else:
-        komponen_thp = {}
-        komponen_lain = {}
-        komponen_potongan = {}
-
-    return komponen_thp, komponen_lain, komponen_potongan
\ No newline at end of file
+    return get_components(user_dict)
\ No newline at end of file
@@ -0,0 +1,299 @@
+# jobs.py
+"""
+Antrian job sederhana di tabel Postgres `jobs`, tanpa broker eksternal.
+Halaman admin memasukkan job ke antrian dan langsung kembali; worker.py
+mengambil job dengan SELECT ... FOR UPDATE SKIP LOCKED sehingga beberapa
+worker bisa berjalan bersamaan tanpa mengambil job yang sama.
+"""
+import os
+import json
+import time
+import socket
+import logging
+import threading
+from utils.admin_tasks import TASKS
+from models.db import get_db_cursor
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUE_ENABLED = os.getenv('JOB_QUEUE_ENABLED', '0') == '1'
+# Jumlah job yang dijalankan bersamaan oleh satu proses worker
+JOB_CONCURRENCY = int(os.getenv('JOB_CONCURRENCY', '2'))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '2'))  # detik
+# Job 'running' tanpa heartbeat selama ini dianggap ditinggal worker yang mati
+JOB_STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', '900'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '2'))
+# Progress ditulis ke database paling sering sekali per interval ini
+PROGRESS_INTERVAL = 1.0  # detik
+# Heartbeat job yang sedang berjalan, juga untuk task tanpa callback progress
+HEARTBEAT_INTERVAL = 60  # detik
+# Batas jumlah error_details yang disimpan di hasil job
+MAX_STORED_ERRORS = 50
+# Batas jumlah job per permintaan daftar job (/admin/jobs?limit=)
+MAX_LISTED_JOBS = 500
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+def ensure_jobs_table():
+    global _schema_ready
+    with _schema_lock:
+        if _schema_ready:
+            return
+        with get_db_cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id BIGSERIAL PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    progress_done INTEGER NOT NULL DEFAULT 0,
+                    progress_total INTEGER,
+                    result JSONB,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_by TEXT,
+                    worker TEXT,
+                    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    started_at TIMESTAMP,
+                    finished_at TIMESTAMP,
+                    heartbeat_at TIMESTAMP
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS jobs_queued_idx ON jobs (id) WHERE status = 'queued'")
+        _schema_ready = True
+
+
+# ==========================
+# ANTRIAN
+# ==========================
+
+def enqueue_job(kind, payload, created_by=None):
+    if kind not in TASKS:
+        raise ValueError(f"Jenis job tidak dikenal: {kind}")
+    ensure_jobs_table()
+    with get_db_cursor() as cur:
+        cur.execute(
+            "INSERT INTO jobs (kind, payload, created_by) VALUES (%s, %s, %s) RETURNING id",
+            (kind, json.dumps(payload), created_by)
+        )
+        job_id = cur.fetchone()['id']
+    logger.info(f"Job #{job_id} ({kind}) masuk antrian")
+    return job_id
+
+def requeue_stale_jobs():
+    """
+    Kembalikan job yang ditinggal worker mati ke antrian, atau tandai gagal
+    jika sudah mencapai JOB_MAX_ATTEMPTS.
+    """
+    with get_db_cursor() as cur:
+        cur.execute("""
+            UPDATE jobs
+            SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'queued' END,
+                error = 'Worker berhenti sebelum job selesai',
+                finished_at = CASE WHEN attempts >= %s THEN CURRENT_TIMESTAMP ELSE NULL END
+            WHERE status = 'running'
+              AND heartbeat_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+            RETURNING id
+        """, (JOB_MAX_ATTEMPTS, JOB_MAX_ATTEMPTS, JOB_STALE_SECONDS))
+        stale = [row['id'] for row in cur.fetchall()]
+    if stale:
+        logger.warning(f"Job tanpa heartbeat dikembalikan/digagalkan: {stale}")
+    return stale
+
+def claim_job(worker_id):
+    """
+    Ambil satu job 'queued' tertua; None jika antrian kosong.
+    """
+    with get_db_cursor() as cur:
+        cur.execute("""
+            UPDATE jobs
+            SET status = 'running', worker = %s, attempts = attempts + 1,
+                started_at = CURRENT_TIMESTAMP, heartbeat_at = CURRENT_TIMESTAMP,
+                progress_done = 0, progress_total = NULL, error = NULL
+            WHERE id = (
+                SELECT id FROM jobs
+                WHERE status = 'queued'
+                ORDER BY id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING id, kind, payload, attempts, worker
+        """, (worker_id,))
+        return cur.fetchone()
+
+# Semua UPDATE dari worker hanya berlaku selama job masih 'running' miliknya:
+# job yang sudah dikembalikan ke antrian (requeue_stale_jobs) dan diambil
+# worker lain tidak boleh disentuh, apalagi diselesaikan, oleh worker lama.
+_OWNED = "id = %s AND worker = %s AND status = 'running'"
+
+def touch_job(job_id, worker_id):
+    with get_db_cursor() as cur:
+        cur.execute(f"UPDATE jobs SET heartbeat_at = CURRENT_TIMESTAMP WHERE {_OWNED}", (job_id, worker_id))
+
+def update_progress(job_id, worker_id, done, total):
+    with get_db_cursor() as cur:
+        cur.execute(f"""
+            UPDATE jobs SET progress_done = %s, progress_total = %s, heartbeat_at = CURRENT_TIMESTAMP
+            WHERE {_OWNED}
+        """, (done, total, job_id, worker_id))
+
+def _trim_result(result):
+    result = dict(result or {})
+    for key in ('errors', 'error_details'):
+        if isinstance(result.get(key), list) and len(result[key]) > MAX_STORED_ERRORS:
+            result[key + '_total'] = len(result[key])
+            result[key] = result[key][:MAX_STORED_ERRORS]
+    return result
+
+def finish_job(job_id, worker_id, result):
+    """
+    Tandai job selesai; False jika job sudah bukan milik worker ini.
+    """
+    with get_db_cursor() as cur:
+        cur.execute(f"""
+            UPDATE jobs SET status = 'done', result = %s, finished_at = CURRENT_TIMESTAMP
+            WHERE {_OWNED}
+        """, (json.dumps(_trim_result(result), default=str), job_id, worker_id))
+        return cur.rowcount == 1
+
+def fail_job(job_id, worker_id, error):
+    """
+    Tandai job gagal; False jika job sudah bukan milik worker ini.
+    """
+    with get_db_cursor() as cur:
+        cur.execute(f"""
+            UPDATE jobs SET status = 'failed', error = %s, finished_at = CURRENT_TIMESTAMP
+            WHERE {_OWNED}
+        """, (error, job_id, worker_id))
+        return cur.rowcount == 1
+
+def list_jobs(limit=50):
+    ensure_jobs_table()
+    with get_db_cursor() as cur:
+        cur.execute("""
+            SELECT id, kind, status, progress_done, progress_total, result, error, attempts,
+                   created_by, worker, created_at, started_at, finished_at,
+                   EXTRACT(EPOCH FROM (COALESCE(finished_at, CURRENT_TIMESTAMP) - started_at)) AS duration
+            FROM jobs
+            ORDER BY id DESC
+            LIMIT %s
+        """, (limit,))
+        return cur.fetchall()
+
+
+# ==========================
+# EKSEKUSI
+# ==========================
+
+class _ProgressReporter:
+    """
+    Callback progress(done, total) untuk task; menulis ke database dengan
+    jeda minimal PROGRESS_INTERVAL supaya tidak ada UPDATE per slip.
+    """
+
+    def __init__(self, job_id, worker_id):
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self._last = 0.0
+
+    def __call__(self, done, total):
+        now = time.monotonic()
+        if done != total and now - self._last < PROGRESS_INTERVAL:
+            return
+        self._last = now
+        try:
+            update_progress(self.job_id, self.worker_id, done, total)
+        except Exception as e:
+            logger.warning(f"Gagal menyimpan progress job #{self.job_id}: {str(e)}")
+
+def run_task(kind, payload, progress=None):
+    """
+    Jalankan task langsung di proses ini (dipakai saat antrian job tidak aktif).
+    """
+    return TASKS[kind](payload, progress)
+
+def execute_job(job):
+    job_id, kind, worker_id = job['id'], job['kind'], job['worker']
+    logger.info(f"Menjalankan job #{job_id} ({kind}), percobaan ke-{job['attempts']}")
+    start = time.perf_counter()
+
+    done = threading.Event()
+    def _heartbeat():
+        while not done.wait(HEARTBEAT_INTERVAL):
+            try:
+                touch_job(job_id, worker_id)
+            except Exception as e:
+                logger.warning(f"Gagal menyimpan heartbeat job #{job_id}: {str(e)}")
+    threading.Thread(target=_heartbeat, name=f"job-heartbeat-{job_id}", daemon=True).start()
+
+    try:
+        result = run_task(kind, job['payload'], _ProgressReporter(job_id, worker_id))
+    except Exception as e:
+        logger.error(f"Job #{job_id} ({kind}) gagal: {str(e)}", exc_info=True)
+        if not fail_job(job_id, worker_id, str(e)):
+            logger.warning(f"Job #{job_id} sudah diambil alih worker lain, status gagal tidak disimpan")
+        return False
+    finally:
+        done.set()
+    if not finish_job(job_id, worker_id, result):
+        logger.warning(f"Job #{job_id} sudah diambil alih worker lain, hasil tidak disimpan")
+        return False
+    logger.info(f"Job #{job_id} ({kind}) selesai dalam {time.perf_counter() - start:.1f} detik")
+    return True
+
+def run_worker(concurrency=None, poll_interval=None, context_factory=None, stop_event=None):
+    """
+    Jalankan `concurrency` thread yang masing-masing mengambil dan mengeksekusi
+    job sampai stop_event di-set. context_factory (mis. app.app_context) dipush
+    di setiap thread supaya task bisa memakai konfigurasi dan template Flask.
+    """
+    concurrency = concurrency or JOB_CONCURRENCY
+    poll_interval = poll_interval or JOB_POLL_INTERVAL
+    stop_event = stop_event or threading.Event()
+    worker_base = f"{socket.gethostname()}:{os.getpid()}"
+
+    ensure_jobs_table()
+    requeue_stale_jobs()
+    last_stale_check = [time.monotonic()]
+
+    def _loop(slot):
+        worker_id = f"{worker_base}/{slot}"
+        context = context_factory() if context_factory else None
+        if context is not None:
+            context.push()
+        try:
+            while not stop_event.is_set():
+                try:
+                    job = claim_job(worker_id)
+                except Exception as e:
+                    logger.error(f"Gagal mengambil job: {str(e)}")
+                    job = None
+                if job is None:
+                    if slot == 0 and time.monotonic() - last_stale_check[0] > HEARTBEAT_INTERVAL:
+                        last_stale_check[0] = time.monotonic()
+                        try:
+                            requeue_stale_jobs()
+                        except Exception as e:
+                            logger.error(f"Gagal memeriksa job tanpa heartbeat: {str(e)}")
+                    stop_event.wait(poll_interval)
+                    continue
+                execute_job(job)
+        finally:
+            if context is not None:
+                context.pop()
+
+    logger.info(f"Worker job berjalan dengan {concurrency} slot ({worker_base})")
+    threads = [threading.Thread(target=_loop, args=(slot,), name=f"job-worker-{slot}") for slot in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    try:
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1.0)
+    except KeyboardInterrupt:
+        logger.info("Menghentikan worker setelah job yang sedang berjalan selesai...")
+        stop_event.set()
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,97 @@
+# memory.py
+"""
+High-water mark memori proses (RSS) untuk tahap berat seperti ingest workbook.
+
+Di Linux puncak dibaca dari VmHWM di /proc/self/status dan di-reset di awal
+tahap (/proc/self/clear_refs), sehingga angka yang dilaporkan adalah puncak
+selama tahap itu saja. Di sistem lain dipakai ru_maxrss, yaitu puncak sejak
+proses mulai (ditandai 'scope': 'process').
+"""
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_PROC_STATUS = '/proc/self/status'
+_PROC_CLEAR_REFS = '/proc/self/clear_refs'
+_MB = 1024 * 1024
+
+
+def _read_status_bytes(field):
+    try:
+        with open(_PROC_STATUS, 'r') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def current_rss():
+    """
+    RSS saat ini dalam byte, None jika tidak tersedia.
+    """
+    return _read_status_bytes('VmRSS')
+
+def reset_peak_rss():
+    """
+    Reset puncak RSS proses ke RSS saat ini. False jika tidak didukung.
+    """
+    try:
+        with open(_PROC_CLEAR_REFS, 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def peak_rss():
+    """
+    Puncak RSS dalam byte: VmHWM jika ada, selain itu ru_maxrss.
+    """
+    value = _read_status_bytes('VmHWM')
+    if value is not None:
+        return value
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS melaporkan byte, Linux/BSD kilobyte
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+class MemoryHighWater:
+    """
+    Ukur puncak RSS selama blok:
+        with MemoryHighWater() as mem:
+            ...
+        mem.as_dict()  # {'start_mb', 'peak_mb', 'peak_delta_mb', 'scope'}
+    Puncak berlaku untuk seluruh proses; di server multi-thread request lain
+    yang berjalan bersamaan ikut terhitung.
+    """
+
+    def __init__(self):
+        self.start = None
+        self.peak = None
+        self.scope = None
+
+    def __enter__(self):
+        self.scope = 'stage' if reset_peak_rss() else 'process'
+        self.start = current_rss()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.peak = peak_rss()
+        return False
+
+    def as_dict(self):
+        def mb(value):
+            return None if value is None else round(value / _MB, 1)
+
+        delta = self.peak - self.start if self.peak is not None and self.start is not None else None
+        return {
+            'start_mb': mb(self.start),
+            'peak_mb': mb(self.peak),
+            'peak_delta_mb': mb(delta),
+            'scope': self.scope,
+        }
@@ -0,0 +1,218 @@
+# metrics.py
+"""
+Histogram dan counter ringan untuk waktu per route dan per tahap (baca Excel,
+lookup NUP, QR, render Jinja, wkhtmltopdf, enkripsi PDF, database), diekspor
+dalam format teks Prometheus.
+
+Nonaktif secara default (METRICS_ENABLED=0): stage() mengembalikan context
+manager kosong yang sama setiap kali, sehingga biayanya hampir nol.
+Metrik disimpan per proses; di gunicorn setiap worker punya angka sendiri.
+"""
+import os
+import hmac
+import time
+import threading
+from bisect import bisect_left
+from contextlib import nullcontext
+from functools import wraps
+from flask import g, request
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '0') == '1'
+# Token untuk scraper Prometheus (header Authorization: Bearer <token>), selain sesi admin
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+METRIC_PREFIX = 'slipgaji'
+# Batas atas bucket histogram (detik)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    'http_request_duration_seconds': 'Durasi request per route',
+    'http_requests_total': 'Jumlah request per route dan status',
+    'stage_duration_seconds': 'Durasi per tahap pemrosesan',
+    'stage_errors_total': 'Jumlah tahap yang berakhir dengan exception',
+}
+
+_lock = threading.Lock()
+_histograms = {}  # (nama, label) -> _Histogram
+_counters = {}    # (nama, label) -> nilai
+_NULL_STAGE = nullcontext()
+
+
+class _Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # bucket terakhir = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+def observe(name, seconds, **labels):
+    key = (name, _labels_key(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = _Histogram()
+        histogram.observe(seconds)
+
+def inc(name, amount=1, **labels):
+    key = (name, _labels_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def observe_stage(name, seconds):
+    """
+    Catat durasi tahap yang sudah diukur sendiri (mis. timing login).
+    """
+    if METRICS_ENABLED:
+        observe('stage_duration_seconds', seconds, stage=name)
+
+
+class _Stage:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe('stage_duration_seconds', time.perf_counter() - self.start, stage=self.name)
+        if exc_type is not None:
+            inc('stage_errors_total', stage=self.name)
+        return False
+
+def stage(name):
+    """
+    Context manager pengukur satu tahap:
+        with stage('wkhtmltopdf'):
+            ...
+    """
+    return _Stage(name) if METRICS_ENABLED else _NULL_STAGE
+
+def timed(name):
+    """
+    Decorator versi stage(); jika metrik nonaktif fungsi dikembalikan apa adanya.
+    """
+    def decorator(fn):
+        if not METRICS_ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ==========================
+# FLASK
+# ==========================
+
+def init_app(app):
+    """
+    Ukur durasi setiap request per route (pola URL, bukan path lengkap).
+    """
+    if not METRICS_ENABLED:
+        return
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            observe('http_request_duration_seconds', time.perf_counter() - start,
+                    route=route, method=request.method)
+            inc('http_requests_total', route=route, method=request.method, status=str(response.status_code))
+        return response
+
+def is_scrape_authorized(authorization):
+    if not METRICS_TOKEN or not authorization:
+        return False
+    # Perbandingan waktu-konstan; bytes supaya header non-ASCII tidak error
+    return hmac.compare_digest(authorization.encode('utf-8'), f"Bearer {METRICS_TOKEN}".encode('utf-8'))
+
+
+# ==========================
+# FORMAT PROMETHEUS
+# ==========================
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + (list(extra) if extra else [])
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in items) + '}'
+
+def _format_bound(bound):
+    return f"{bound:g}"
+
+def render_prometheus(gauges=None):
+    """
+    Semua metrik dalam format teks Prometheus. gauges: {grup: {nama: nilai}}
+    (mis. statistik cache dan pool) diekspor sebagai gauge <prefix>_<grup>_<nama>.
+    """
+    with _lock:
+        histograms = {key: (list(h.counts), h.sum, h.count) for key, h in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = []
+    seen = set()
+
+    def header(name, kind):
+        if name not in seen:
+            seen.add(name)
+            short = name[len(METRIC_PREFIX) + 1:]
+            if short in HELP:
+                lines.append(f"# HELP {name} {HELP[short]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), (counts, total, count) in sorted(histograms.items()):
+        metric = f"{METRIC_PREFIX}_{name}"
+        header(metric, 'histogram')
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS, counts):
+            cumulative += bucket_count
+            lines.append(f"{metric}_bucket{_format_labels(labels, [('le', _format_bound(bound))])} {cumulative}")
+        lines.append(f"{metric}_bucket{_format_labels(labels, [('le', '+Inf')])} {count}")
+        lines.append(f"{metric}_sum{_format_labels(labels)} {total}")
+        lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+
+    for (name, labels), value in sorted(counters.items()):
+        metric = f"{METRIC_PREFIX}_{name}"
+        header(metric, 'counter')
+        lines.append(f"{metric}{_format_labels(labels)} {value}")
+
+    for group, stats in sorted((gauges or {}).items()):
+        for key, value in sorted(stats.items()):
+            if isinstance(value, bool):
+                value = int(value)
+            if not isinstance(value, (int, float)):
+                continue
+            metric = f"{METRIC_PREFIX}_{group}_{key}"
+            header(metric, 'gauge')
+            lines.append(f"{metric} {value}")
+
+    return '\n'.join(lines) + '\n'
+
+def reset_metrics():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
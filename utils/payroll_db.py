@@ -0,0 +1,237 @@
+# payroll_db.py
+"""
+Data gaji per periode di Postgres (tabel payroll_rows), diisi dengan COPY saat
+upload. Aktif jika PAYROLL_BACKEND=postgres; periode yang belum dimuat ke
+database tetap dibaca dari file (store kolumnar) seperti sebelumnya.
+
+Periode (tahun, bulan) sebuah file diambil dari katalog (BULAN/TAHUN di sheet),
+bukan dari nama file. Data di database hanya dipakai jika payroll_periods
+mencatat file yang sama sebagai sumbernya; selain itu dibaca dari file.
+"""
+import io
+import os
+import csv
+import logging
+import threading
+import pandas as pd
+from models.db import get_db_cursor
+from utils.metrics import stage, timed
+from utils.salary_schema import AMOUNT_COLUMNS
+from utils.period_store import load_period, iter_period_chunks, parse_period_filename
+from utils.period_catalog import find_source_file
+from utils.period_index import lookup_employee, normalize_nup
+
+logger = logging.getLogger(__name__)
+
+# 'file': baca dari .xlsx/parquet, 'postgres': baca dari tabel payroll_rows
+PAYROLL_BACKEND = os.getenv('PAYROLL_BACKEND', 'file').lower()
+
+# Komponen gaji dan total (salary_schema) yang disimpan juga sebagai kolom NUMERIC
+# (untuk query/agregasi); baris lengkap tetap disimpan di kolom data (jsonb)
+NUMERIC_COLUMNS = list(AMOUNT_COLUMNS)
+TEXT_COLUMNS = ['NAMA', 'STATUS_PEGAWAI', 'EMAIL']
+COPY_COLUMNS = ['tahun', 'bulan', 'row_no', 'nup'] + [c.lower() for c in TEXT_COLUMNS + NUMERIC_COLUMNS] + ['data']
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+def use_database():
+    return PAYROLL_BACKEND == 'postgres'
+
+def ensure_payroll_tables():
+    global _schema_ready
+    with _schema_lock:
+        if _schema_ready:
+            return
+        numeric_defs = ",\n".join(f"{c.lower()} NUMERIC(18, 2)" for c in NUMERIC_COLUMNS)
+        text_defs = ",\n".join(f"{c.lower()} TEXT" for c in TEXT_COLUMNS)
+        with get_db_cursor() as cur:
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS payroll_rows (
+                    tahun SMALLINT NOT NULL,
+                    bulan SMALLINT NOT NULL,
+                    row_no INTEGER NOT NULL,
+                    nup TEXT NOT NULL,
+                    {text_defs},
+                    {numeric_defs},
+                    data JSONB NOT NULL,
+                    PRIMARY KEY (tahun, bulan, row_no)
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS payroll_rows_period_nup_idx ON payroll_rows (tahun, bulan, nup)")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS payroll_periods (
+                    tahun SMALLINT NOT NULL,
+                    bulan SMALLINT NOT NULL,
+                    source_file TEXT NOT NULL,
+                    rows INTEGER NOT NULL,
+                    loaded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (tahun, bulan)
+                )
+            """)
+        _schema_ready = True
+
+
+def get_file_period(xlsx_path):
+    """
+    (tahun, bulan) periode sebuah workbook: dari entri katalognya, nama file
+    sebagai cadangan. None jika tidak diketahui.
+    """
+    entry = find_source_file(os.path.dirname(xlsx_path), xlsx_path)
+    if entry is not None:
+        return entry['tahun'], entry['bulan']
+    try:
+        return parse_period_filename(xlsx_path)
+    except ValueError:
+        return None
+
+
+# ==========================
+# INGEST
+# ==========================
+
+def _copy_buffer(df, tahun, bulan, start=0):
+    """
+    Susun data CSV untuk COPY. Kolom data berisi seluruh baris sebagai JSON
+    (to_json menangani NaN, tanggal dan tipe numpy secara vektor).
+    start: row_no baris pertama df (ingest per chunk).
+    """
+    json_lines = df.to_json(orient='records', lines=True, date_format='iso', force_ascii=False).splitlines()
+
+    nups = df['NUP'].map(lambda v: normalize_nup(v) or '')
+    text = {c: df[c].map(lambda v: None if pd.isna(v) else str(v)) if c in df.columns else None for c in TEXT_COLUMNS}
+    numeric = {
+        c: pd.to_numeric(df[c], errors='coerce').round(2) if c in df.columns else None
+        for c in NUMERIC_COLUMNS
+    }
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for i, json_line in enumerate(json_lines):
+        row = [tahun, bulan, start + i, nups.iat[i]]
+        row += [None if text[c] is None else text[c].iat[i] for c in TEXT_COLUMNS]
+        for c in NUMERIC_COLUMNS:
+            value = None if numeric[c] is None else numeric[c].iat[i]
+            row.append(None if value is None or pd.isna(value) else repr(float(value)))
+        row.append(json_line)
+        writer.writerow(row)
+    buffer.seek(0)
+    return buffer
+
+def ingest_period(xlsx_path, df=None, period=None):
+    """
+    Muat satu periode ke payroll_rows dengan COPY. Hapus dan isi ulang dalam
+    satu transaksi: periode diganti seluruhnya atau tidak berubah sama sekali.
+    period: (tahun, bulan) dari entri katalog, default get_file_period.
+    Tanpa df, data dibaca dari store per chunk (satu COPY per chunk) supaya
+    memori tidak bergantung ukuran periode. Mengembalikan jumlah baris yang dimuat.
+    """
+    period = period or get_file_period(xlsx_path)
+    if period is None:
+        raise ValueError(f"Periode tidak dapat ditentukan untuk {os.path.basename(xlsx_path)}")
+    tahun, bulan = period
+    chunks = [df] if df is not None else iter_period_chunks(xlsx_path)
+
+    ensure_payroll_tables()
+    rows = 0
+    with stage('db_ingest_period'), get_db_cursor() as cur:
+        cur.execute("DELETE FROM payroll_rows WHERE tahun = %s AND bulan = %s", (tahun, bulan))
+        for chunk in chunks:
+            if 'NUP' not in chunk.columns:
+                raise ValueError(f"Kolom NUP tidak ditemukan di {xlsx_path}")
+            chunk = chunk[chunk['NUP'].notna()].reset_index(drop=True)
+            if chunk.empty:
+                continue
+            cur.copy_expert(
+                f"COPY payroll_rows ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                _copy_buffer(chunk, tahun, bulan, rows)
+            )
+            rows += len(chunk)
+        cur.execute("""
+            INSERT INTO payroll_periods (tahun, bulan, source_file, rows)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (tahun, bulan) DO UPDATE
+            SET source_file = EXCLUDED.source_file, rows = EXCLUDED.rows, loaded_at = CURRENT_TIMESTAMP
+        """, (tahun, bulan, os.path.basename(xlsx_path), rows))
+
+    logger.info(f"Periode {tahun}-{bulan:02d} dimuat ke database: {rows} baris")
+    return rows
+
+
+# ==========================
+# QUERY
+# ==========================
+
+def is_period_loaded(tahun, bulan, source_file=None):
+    """
+    True jika periode sudah dimuat (dari source_file tersebut, jika diberikan).
+    """
+    ensure_payroll_tables()
+    with get_db_cursor() as cur:
+        cur.execute(
+            "SELECT source_file FROM payroll_periods WHERE tahun = %s AND bulan = %s", (tahun, bulan)
+        )
+        row = cur.fetchone()
+    return row is not None and (source_file is None or row['source_file'] == source_file)
+
+@timed('db_fetch_employee')
+def fetch_employee(tahun, bulan, nup, source_file):
+    """
+    (loaded, baris gaji) satu pegawai dalam satu query: loaded False jika
+    periode belum dimuat dari source_file. Baris pertama jika NUP muncul
+    lebih dari sekali.
+    """
+    ensure_payroll_tables()
+    with get_db_cursor() as cur:
+        cur.execute("""
+            SELECT r.data FROM payroll_periods p
+            LEFT JOIN payroll_rows r
+                ON r.tahun = p.tahun AND r.bulan = p.bulan AND r.nup = %s
+            WHERE p.tahun = %s AND p.bulan = %s AND p.source_file = %s
+            ORDER BY r.row_no
+            LIMIT 1
+        """, (normalize_nup(nup), tahun, bulan, source_file))
+        row = cur.fetchone()
+    if row is None:
+        return False, None
+    return True, row['data']
+
+@timed('db_fetch_period')
+def fetch_period(tahun, bulan):
+    ensure_payroll_tables()
+    with get_db_cursor() as cur:
+        cur.execute("""
+            SELECT data FROM payroll_rows
+            WHERE tahun = %s AND bulan = %s
+            ORDER BY row_no
+        """, (tahun, bulan))
+        return pd.DataFrame([row['data'] for row in cur.fetchall()])
+
+
+# ==========================
+# AKSES DATA GAJI (DENGAN FALLBACK FILE)
+# ==========================
+
+def get_employee_payroll(xlsx_path, nup):
+    """
+    Data gaji satu pegawai untuk periode file ini, dari database jika periode
+    sudah dimuat, selain itu dari indeks file.
+    """
+    if use_database():
+        period = get_file_period(xlsx_path)
+        if period is not None:
+            loaded, user_dict = fetch_employee(*period, nup, os.path.basename(xlsx_path))
+            if loaded:
+                return user_dict
+    return lookup_employee(xlsx_path, nup)
+
+def get_period_payroll(xlsx_path):
+    """
+    Semua baris gaji satu periode sebagai DataFrame.
+    """
+    if use_database():
+        period = get_file_period(xlsx_path)
+        if period is not None and is_period_loaded(*period, os.path.basename(xlsx_path)):
+            return fetch_period(*period)
+    return load_period(xlsx_path)
@@ -0,0 +1,278 @@
+# period_catalog.py
+import os
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+from utils.period_store import read_period_head, parse_period_filename, file_sha256
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FILENAME = 'catalog.json'
+CATALOG_LOCK_FILENAME = 'catalog.json.lock'
+
+# Konversi nama bulan Indonesia ke angka
+MONTH_MAPPING = {
+    'januari': 1, 'jan': 1,
+    'februari': 2, 'feb': 2,
+    'maret': 3, 'mar': 3,
+    'april': 4, 'apr': 4,
+    'mei': 5,
+    'juni': 6, 'jun': 6,
+    'juli': 7, 'jul': 7,
+    'agustus': 8, 'agu': 8,
+    'september': 9, 'sep': 9,
+    'oktober': 10, 'okt': 10,
+    'november': 11, 'nov': 11,
+    'desember': 12, 'des': 12
+}
+
+# _lock: cache di proses ini; _write_lock + flock: read-modify-write catalog.json
+# antar thread dan antar proses (worker gunicorn, job worker)
+_lock = threading.Lock()
+_write_lock = threading.Lock()
+_cache = {}  # folder -> (mtime_ns katalog, daftar entri)
+
+
+def get_catalog_path(folder):
+    return os.path.join(folder, CATALOG_FILENAME)
+
+def normalize_bulan(value):
+    """
+    Ubah nilai BULAN (angka atau nama bulan) menjadi int 1-12, None jika tidak dikenali.
+    """
+    if isinstance(value, str):
+        return MONTH_MAPPING.get(value.lower().strip())
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+def _is_period_file(filename):
+    return filename.endswith('.xlsx') and not filename.startswith('~$')
+
+
+# ==========================
+# MEMBANGUN ENTRI
+# ==========================
+
+def build_entry(xlsx_path, df=None):
+    """
+    Susun entri katalog untuk satu workbook: periode, label BULAN/TAHUN dari sheet,
+    jumlah baris, checksum file dan waktu upload.
+    """
+    filename = os.path.basename(xlsx_path)
+    if df is None:
+        # Cukup baris pertama dan jumlah baris dari store, tanpa memuat seluruh periode
+        head, rows = read_period_head(xlsx_path, ['BULAN', 'TAHUN'])
+    else:
+        head, rows = df.head(1), len(df)
+
+    label_bulan, label_tahun = None, None
+    if len(head) and 'BULAN' in head.columns and 'TAHUN' in head.columns:
+        label_bulan = head.iloc[0]['BULAN']
+        label_tahun = head.iloc[0]['TAHUN']
+
+    # Periode dari isi sheet; jika tidak valid gunakan nama file
+    bulan = normalize_bulan(label_bulan)
+    try:
+        tahun = int(label_tahun)
+    except (ValueError, TypeError):
+        tahun = None
+    if bulan is None or tahun is None:
+        try:
+            tahun, bulan = parse_period_filename(filename)
+        except ValueError:
+            logger.warning(f"Periode tidak dapat ditentukan untuk {filename}")
+            return None
+
+    if label_bulan is None or pd.isna(label_bulan):
+        label_bulan = bulan
+    if label_tahun is None or pd.isna(label_tahun):
+        label_tahun = tahun
+    # Angka dari Excel bisa terbaca sebagai float (1.0)
+    if isinstance(label_bulan, float) and label_bulan.is_integer():
+        label_bulan = int(label_bulan)
+    if isinstance(label_tahun, float) and label_tahun.is_integer():
+        label_tahun = int(label_tahun)
+
+    return {
+        'period': f"{tahun}-{bulan:02d}",
+        'tahun': tahun,
+        'bulan': bulan,
+        'label_bulan': str(label_bulan).strip().zfill(2),
+        'label_tahun': str(label_tahun).strip(),
+        'source_file': filename,
+        'rows': int(rows),
+        'checksum': file_sha256(xlsx_path),
+        'uploaded_at': datetime.fromtimestamp(os.path.getmtime(xlsx_path)).isoformat(timespec='seconds'),
+    }
+
+
+# ==========================
+# BACA / TULIS KATALOG
+# ==========================
+
+def _read_catalog_file(folder):
+    with open(get_catalog_path(folder), 'r', encoding='utf-8') as f:
+        return json.load(f).get('periods', [])
+
+def _write_catalog_file(folder, entries):
+    entries = sorted(entries, key=lambda e: (e['tahun'], e['bulan'], e['source_file']))
+    path = get_catalog_path(folder)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'periods': entries}, f, indent=2)
+    os.replace(tmp_path, path)
+    return entries
+
+@contextmanager
+def _catalog_lock(folder):
+    """
+    Kunci eksklusif untuk mengubah catalog.json, berlaku antar proses (flock).
+    Tidak reentrant: jangan dipanggil bertingkat.
+    """
+    with _write_lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, CATALOG_LOCK_FILENAME), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def load_catalog(folder):
+    """
+    Daftar periode yang tersedia. Cukup satu stat() per panggilan; file katalog
+    hanya dibaca ulang jika berubah. Katalog yang belum ada tidak dibangun di
+    sini (mahal, di tengah request): lihat ensure_catalog dan rebuild_catalog.py.
+    """
+    path = get_catalog_path(folder)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        logger.warning(f"Katalog periode belum ada di {folder}, jalankan rebuild_catalog.py")
+        return []
+
+    with _lock:
+        cached = _cache.get(folder)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        entries = _read_catalog_file(folder)
+        _cache[folder] = (mtime, entries)
+        return entries
+
+def register_period(folder, xlsx_path, df=None):
+    """
+    Tambah atau perbarui entri katalog untuk workbook yang baru diupload.
+    """
+    entry = build_entry(xlsx_path, df)
+    if entry is None:
+        return None
+
+    with _catalog_lock(folder):
+        try:
+            entries = _read_catalog_file(folder)
+        except FileNotFoundError:
+            entries = []
+        entries = [e for e in entries if e['source_file'] != entry['source_file']]
+        entries.append(entry)
+        _write_catalog_file(folder, entries)
+    with _lock:
+        _cache.pop(folder, None)
+
+    logger.info(f"Katalog diperbarui: {entry['period']} ({entry['source_file']}, {entry['rows']} baris)")
+    return entry
+
+def _scan_entries(folder):
+    os.makedirs(folder, exist_ok=True)
+    entries = []
+    for filename in sorted(os.listdir(folder)):
+        if not _is_period_file(filename):
+            continue
+        try:
+            entry = build_entry(os.path.join(folder, filename))
+            if entry:
+                entries.append(entry)
+        except Exception as e:
+            logger.error(f"Error membaca file {filename}: {str(e)}")
+    return entries
+
+def rebuild_catalog(folder):
+    """
+    Bangun ulang katalog dari semua workbook di folder, untuk folder yang diisi
+    manual (rebuild_catalog.py). Membangun store setiap periode, jadi mahal.
+    """
+    entries = _scan_entries(folder)
+    with _catalog_lock(folder):
+        entries = _write_catalog_file(folder, entries)
+    with _lock:
+        _cache.pop(folder, None)
+
+    logger.info(f"Katalog dibangun ulang: {len(entries)} periode di {folder}")
+    return entries
+
+def ensure_catalog(folder):
+    """
+    Bangun katalog saat startup jika belum ada. Dengan banyak worker hanya satu
+    yang membangun; yang lain menunggu kunci lalu memakai hasilnya.
+    """
+    if os.path.exists(get_catalog_path(folder)):
+        return
+    with _catalog_lock(folder):
+        if os.path.exists(get_catalog_path(folder)):
+            return
+        entries = _write_catalog_file(folder, _scan_entries(folder))
+    with _lock:
+        _cache.pop(folder, None)
+    logger.info(f"Katalog dibangun saat startup: {len(entries)} periode di {folder}")
+
+
+# ==========================
+# BENTUK DATA UNTUK ROUTE
+# ==========================
+
+def get_available_months(folder):
+    """
+    Daftar bulan untuk dropdown pegawai (format lama session['available_months']).
+    """
+    return [
+        {'BULAN': e['label_bulan'], 'TAHUN': e['label_tahun'], 'source_file': e['source_file']}
+        for e in load_catalog(folder)
+    ]
+
+def get_period_choices(folder):
+    """
+    Pasangan (tahun, bulan) unik dan terurut untuk dropdown admin.
+    """
+    return sorted({(e['tahun'], e['bulan']) for e in load_catalog(folder)})
+
+def find_period(folder, period):
+    """
+    Cari entri katalog untuk periode 'YYYY-MM'. Jika ada beberapa file untuk
+    periode yang sama, yang terakhir diupload yang dipakai.
+    """
+    matches = [e for e in load_catalog(folder) if e['period'] == period]
+    if not matches:
+        return None
+    return max(matches, key=lambda e: e['uploaded_at'])
+
+def find_source_file(folder, filename):
+    """
+    Entri katalog untuk satu workbook (berdasarkan nama file), None jika tidak terdaftar.
+    """
+    filename = os.path.basename(filename)
+    for entry in load_catalog(folder):
+        if entry['source_file'] == filename:
+            return entry
+    return None
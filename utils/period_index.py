@@ -0,0 +1,150 @@
+# period_index.py
+import os
+import logging
+import threading
+from collections import OrderedDict
+import pandas as pd
+from utils.period_store import load_period, file_sha256
+from utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Jumlah periode yang indeksnya disimpan di memori per worker
+MAX_CACHED_PERIODS = int(os.getenv('PERIOD_INDEX_MAX', '12'))
+
+# _lock hanya melindungi dict di bawah (operasi singkat); membangun indeks
+# memakai kunci per file supaya rebuild satu periode tidak menahan periode lain
+_lock = threading.Lock()
+_indexes = OrderedDict()  # path absolut -> PeriodIndex
+_build_locks = {}  # path absolut -> Lock
+_stats = {'hits': 0, 'misses': 0, 'rebuilds': 0}
+
+
+def normalize_nup(value):
+    """
+    Samakan representasi NUP: 64306, 64306.0 dan ' 64306 ' menjadi '64306'.
+    """
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+def _file_signature(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class PeriodIndex:
+    """
+    Indeks NUP -> record baris untuk satu file periode.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.signature = _file_signature(path)
+        self.checksum = file_sha256(path)
+
+        df = load_period(path)
+        self.records = {}
+        if 'NUP' in df.columns:
+            for record in df.to_dict('records'):
+                nup = record.get('NUP')
+                if pd.isna(nup):
+                    continue
+                # Sama seperti iloc[0] sebelumnya: baris pertama yang menang
+                self.records.setdefault(normalize_nup(nup), record)
+
+    def is_unchanged(self):
+        """
+        Cek murah: mtime dan ukuran file masih sama.
+        """
+        return _file_signature(self.path) == self.signature
+
+    def is_current(self):
+        """
+        Cek mtime/ukuran dulu (murah); hash hanya dihitung ulang jika stat berubah.
+        File yang hanya di-touch tanpa perubahan isi tidak memicu rebuild.
+        """
+        signature = _file_signature(self.path)
+        if signature == self.signature:
+            return True
+        if file_sha256(self.path) == self.checksum:
+            self.signature = signature
+            return True
+        return False
+
+
+def get_period_index(file_path):
+    """
+    Ambil indeks untuk file periode, bangun ulang jika belum ada atau file berubah.
+    Indeks dipakai bersama oleh semua request dalam satu worker.
+    """
+    path = os.path.abspath(file_path)
+    with _lock:
+        index = _indexes.get(path)
+    if index is not None and index.is_unchanged():
+        _touch(path, index)
+        return index
+
+    # Hash ulang dan rebuild (bisa membangun store dari .xlsx) di luar _lock,
+    # satu request per file; request lain untuk file yang sama menunggu hasilnya
+    with _build_lock(path):
+        with _lock:
+            index = _indexes.get(path)
+        if index is not None and index.is_current():
+            _touch(path, index)
+            return index
+
+        index = PeriodIndex(path)
+        logger.info(f"Indeks NUP dibangun untuk {path} ({len(index.records)} pegawai)")
+        with _lock:
+            _stats['rebuilds'] += 1
+            _indexes[path] = index
+            _indexes.move_to_end(path)
+            while len(_indexes) > MAX_CACHED_PERIODS:
+                _indexes.popitem(last=False)
+        return index
+
+def _build_lock(path):
+    with _lock:
+        lock = _build_locks.get(path)
+        if lock is None:
+            lock = _build_locks[path] = threading.Lock()
+        return lock
+
+def _touch(path, index):
+    with _lock:
+        if _indexes.get(path) is index:
+            _indexes.move_to_end(path)
+
+@timed('nup_lookup')
+def lookup_employee(file_path, nup):
+    """
+    Cari data gaji satu pegawai di file periode. Mengembalikan dict atau None.
+    """
+    index = get_period_index(file_path)
+    record = index.records.get(normalize_nup(nup))
+    with _lock:
+        if record is None:
+            _stats['misses'] += 1
+        else:
+            _stats['hits'] += 1
+    # Salinan supaya pemanggil tidak mengubah isi indeks bersama
+    return dict(record) if record is not None else None
+
+def invalidate_period_index(file_path=None):
+    """
+    Hapus indeks satu file (atau semua jika file_path None).
+    """
+    with _lock:
+        if file_path is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(os.path.abspath(file_path), None)
+
+def get_index_stats():
+    with _lock:
+        return {
+            **_stats,
+            'cached_periods': len(_indexes),
+            'cached_employees': sum(len(i.records) for i in _indexes.values()),
+        }
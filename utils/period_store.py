@@ -0,0 +1,371 @@
+# period_store.py
+import os
+import glob
+import pickle
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import pandas as pd
+from utils.helpers import clean_column_names, format_password_column
+from utils.metrics import stage
+from utils.salary_schema import AMOUNT_COLUMNS
+from utils.workbook_reader import WorkbookStream, ColumnKinds, rows_to_frame
+
+logger = logging.getLogger(__name__)
+
+# Folder (relatif terhadap UPLOAD_FOLDER) tempat menyimpan hasil konversi kolumnar
+STORE_DIRNAME = '.store'
+STORE_EXTENSION = '.parquet'
+# Naikkan jika kolom turunan (mis. PASSWORD) berubah: store versi lama diabaikan dan dibangun ulang
+STORE_VERSION = 2
+# Jumlah baris per chunk saat ingest streaming (= ukuran row group parquet)
+PERIOD_CHUNK_ROWS = int(os.getenv('PERIOD_CHUNK_ROWS', '5000'))
+# Kolom yang wajib ada di header file gaji
+REQUIRED_COLUMNS = ('NUP',)
+# Batas pesan validasi per file (jumlah totalnya tetap dihitung)
+MAX_REPORTED_ERRORS = 100
+
+
+# ==========================
+# NAMA FILE & LOKASI STORE
+# ==========================
+
+def parse_period_filename(filename):
+    """
+    Ambil (tahun, bulan) dari nama file gaji_YYYY_MM.xlsx atau YYYY_MM.xlsx.
+    Raise ValueError jika format nama file tidak dikenali.
+    """
+    parts = os.path.basename(filename).replace('.xlsx', '').split('_')
+    if len(parts) == 3 and parts[0] == 'gaji':
+        tahun, bulan = parts[1], parts[2]
+    else:
+        tahun, bulan = parts
+    return int(tahun), int(bulan)
+
+def get_store_path(xlsx_path):
+    """
+    Lokasi file kolumnar untuk sebuah workbook: <folder>/.store/<nama>.v<versi>.parquet
+    """
+    folder, filename = os.path.split(os.path.abspath(xlsx_path))
+    name = os.path.splitext(filename)[0]
+    return os.path.join(folder, STORE_DIRNAME, f"{name}.v{STORE_VERSION}{STORE_EXTENSION}")
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+def is_store_fresh(xlsx_path):
+    """
+    Store dianggap valid jika ada dan tidak lebih tua dari workbook sumbernya.
+    """
+    store_path = get_store_path(xlsx_path)
+    try:
+        return os.path.getmtime(store_path) >= os.path.getmtime(xlsx_path)
+    except OSError:
+        return False
+
+
+# ==========================
+# KONVERSI WORKBOOK
+# ==========================
+
+def _period_from_filename(filename):
+    try:
+        return parse_period_filename(filename)
+    except ValueError:
+        logger.warning(f"Format nama file salah: {filename}")
+        return None
+
+def _add_derived_columns(df, filename, period, ttl=None):
+    """
+    BULAN/TAHUN dari nama file jika tidak ada di sheet, PASSWORD dari TTL
+    (ttl: nilai TTL sebelum disimpan sebagai teks) dan SOURCE_FILE.
+    """
+    if period is not None:
+        tahun, bulan = period
+        if 'BULAN' not in df.columns:
+            df['BULAN'] = bulan
+        if 'TAHUN' not in df.columns:
+            df['TAHUN'] = tahun
+
+    if 'TTL' in df.columns:
+        df['PASSWORD'] = format_password_column(df['TTL'] if ttl is None else ttl)
+    df['SOURCE_FILE'] = filename
+    return df
+
+def read_period_workbook(xlsx_path):
+    """
+    Baca seluruh workbook gaji sekaligus dengan pd.read_excel dan siapkan kolom
+    turunan. Cadangan jika store tidak bisa dibangun; ingest memakai build_period_store.
+    """
+    filename = os.path.basename(xlsx_path)
+    with stage('read_excel'):
+        df = pd.read_excel(xlsx_path)
+    df = clean_column_names(df)
+    return _add_derived_columns(df, filename, _period_from_filename(filename))
+
+def _to_storable(df):
+    """
+    Parquet membutuhkan satu tipe per kolom. Kolom object dengan tipe campuran
+    (mis. angka dan teks) disimpan sebagai teks, nilai kosong tetap kosong.
+    """
+    import pyarrow as pa
+
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        try:
+            pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+    return df
+
+def _remove_old_versions(xlsx_path):
+    store_dir = os.path.dirname(get_store_path(xlsx_path))
+    name = os.path.splitext(os.path.basename(xlsx_path))[0]
+    current = os.path.basename(get_store_path(xlsx_path))
+    for old in glob.glob(os.path.join(glob.escape(store_dir), glob.escape(name) + '*' + STORE_EXTENSION)):
+        stem = os.path.basename(old)[:-len(STORE_EXTENSION)]
+        # Hanya <nama>.parquet (sebelum ada versi) dan <nama>.v<n>.parquet
+        if os.path.basename(old) != current and (stem == name or stem.startswith(name + '.v')):
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+def _clean_header(names, filename):
+    """
+    Nama kolom setelah clean_column_names; header wajib punya NUP dan tidak
+    boleh kembar setelah dibersihkan. Raise ValueError jika tidak valid.
+    """
+    if not names:
+        raise ValueError(f"Header kolom tidak ditemukan di {filename}")
+    columns = clean_column_names(pd.DataFrame(columns=names)).columns.tolist()
+
+    duplicates = sorted({c for c in columns if columns.count(c) > 1})
+    if duplicates:
+        raise ValueError(f"Kolom kembar setelah nama dibersihkan di {filename}: {', '.join(duplicates)}")
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if missing:
+        raise ValueError(f"Kolom {', '.join(missing)} tidak ditemukan di {filename}")
+    return columns
+
+def _spill_workbook(xlsx_path, spill_dir, chunk_rows, progress=None):
+    """
+    Tahap 1: stream workbook, simpan setiap chunk baris mentah ke spill_dir
+    dan catat jenis nilai per kolom. Mengembalikan (kolom, ColumnKinds, file chunk, info).
+    """
+    filename = os.path.basename(xlsx_path)
+    parts = []
+    with stage('read_excel'), WorkbookStream(xlsx_path, chunk_rows) as stream:
+        columns = _clean_header(stream.columns, filename)
+        kinds = ColumnKinds(columns)
+        done = 0
+        for rows, row_numbers in stream.chunks():
+            kinds.observe(rows_to_frame(rows, columns))
+            part_path = os.path.join(spill_dir, f"part-{len(parts):05d}.pkl")
+            with open(part_path, 'wb') as f:
+                pickle.dump((rows, row_numbers), f, protocol=pickle.HIGHEST_PROTOCOL)
+            parts.append(part_path)
+            done += len(rows)
+            if progress:
+                progress(done, max(stream.estimated_rows or 0, done))
+        info = {'rows': done, 'truncated_rows': stream.truncated_rows}
+    return columns, kinds, parts, info
+
+def _invalid_amounts(raw, kinds, row_numbers):
+    """
+    (jumlah, pesan) untuk nilai bukan angka di kolom nominal satu chunk.
+    """
+    count, messages = 0, []
+    for column, kind in kinds.final_kinds().items():
+        if column not in AMOUNT_COLUMNS or kind != 'text':
+            continue
+        values = raw[column]
+        invalid = pd.to_numeric(values, errors='coerce').isna() & values.notna()
+        for position in invalid.to_numpy().nonzero()[0]:
+            count += 1
+            messages.append(f"Baris {row_numbers[position]}: kolom {column} bukan angka ({values.iat[position]!r})")
+    return count, messages
+
+def _arrow_schema(df, kinds):
+    """
+    Skema parquet dari chunk pertama; kolom yang di chunk itu seluruhnya kosong
+    diberi tipe dari ColumnKinds supaya chunk berikutnya cocok.
+    """
+    import pyarrow as pa
+
+    types = {'int': pa.int64(), 'float': pa.float64(), 'bool': pa.bool_(),
+             'datetime': pa.timestamp('ns'), 'text': pa.string()}
+    final = kinds.final_kinds()
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(types[final.get(field.name, 'text')]))
+    return schema
+
+def build_period_store(xlsx_path, chunk_rows=None, progress=None):
+    """
+    Konversi satu workbook ke format kolumnar secara streaming dengan memori
+    terbatas (tidak bergantung ukuran file):
+    1. baca baris per baris (openpyxl read-only), validasi header, simpan chunk
+       mentah ke disk sambil mencatat tipe per kolom;
+    2. setiap chunk diberi tipe akhir dan kolom turunan lalu ditulis sebagai
+       row group parquet.
+    Ditulis ke file sementara lalu di-rename supaya pembaca tidak pernah melihat
+    file setengah jadi. Mengembalikan ringkasan: rows, chunks, invalid_values, errors.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    chunk_rows = chunk_rows or PERIOD_CHUNK_ROWS
+    filename = os.path.basename(xlsx_path)
+    period = _period_from_filename(filename)
+    store_path = get_store_path(xlsx_path)
+    os.makedirs(os.path.dirname(store_path), exist_ok=True)
+    # Unik per thread: upload dan rebuild periode yang sama bisa berjalan di satu proses
+    tmp_path = f"{store_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    spill_dir = tempfile.mkdtemp(prefix=f".{filename}.", dir=os.path.dirname(store_path))
+    summary = {'rows': 0, 'chunks': 0, 'invalid_values': 0, 'errors': []}
+
+    try:
+        columns, kinds, parts, info = _spill_workbook(xlsx_path, spill_dir, chunk_rows, progress)
+        summary['rows'] = info['rows']
+        if info['truncated_rows']:
+            summary['errors'].append(
+                f"{info['truncated_rows']} baris berisi nilai di luar kolom header, nilai tersebut diabaikan"
+            )
+
+        ttl_is_text = 'TTL' in columns and kinds.final_kind('TTL') == 'text'
+        writer = None
+        try:
+            for part_path in parts or [None]:
+                if part_path is None:
+                    rows, row_numbers = [], []  # workbook tanpa baris data
+                else:
+                    with open(part_path, 'rb') as f:
+                        rows, row_numbers = pickle.load(f)
+                    os.remove(part_path)
+
+                raw = rows_to_frame(rows, columns)
+                df = kinds.convert(raw)
+                _add_derived_columns(df, filename, period, raw['TTL'] if ttl_is_text else None)
+
+                invalid, messages = _invalid_amounts(raw, kinds, row_numbers)
+                summary['invalid_values'] += invalid
+                room = MAX_REPORTED_ERRORS - len(summary['errors'])
+                summary['errors'].extend(messages[:max(room, 0)])
+
+                if writer is None:
+                    schema = _arrow_schema(df, kinds)
+                    writer = pq.ParquetWriter(tmp_path, schema)
+                writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+                summary['chunks'] += 1
+        finally:
+            if writer is not None:
+                writer.close()
+
+        os.replace(tmp_path, store_path)
+        logger.info(
+            f"Store kolumnar dibuat: {store_path} ({summary['rows']} baris, {summary['chunks']} chunk)"
+        )
+        _remove_old_versions(xlsx_path)
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    if summary['invalid_values']:
+        logger.warning(f"{summary['invalid_values']} nilai bukan angka di kolom nominal {filename}")
+    return summary
+
+def move_period_workbook(src_path, dst_path):
+    """
+    Pindahkan workbook yang sudah dikonversi (dari folder upload sementara) beserta
+    store-nya ke lokasi akhir. Nama file harus sama supaya SOURCE_FILE di store tetap
+    benar. Workbook dipindah lebih dulu: jika proses berhenti di antaranya, store lama
+    lebih tua dari workbook baru sehingga dibangun ulang saat dibaca.
+    """
+    os.replace(src_path, dst_path)
+    src_store = get_store_path(src_path)
+    if os.path.exists(src_store):
+        dst_store = get_store_path(dst_path)
+        os.makedirs(os.path.dirname(dst_store), exist_ok=True)
+        os.replace(src_store, dst_store)
+        _remove_old_versions(dst_path)
+
+def remove_period_store(xlsx_path):
+    store_path = get_store_path(xlsx_path)
+    if os.path.exists(store_path):
+        os.remove(store_path)
+
+
+# ==========================
+# BACA DATA PERIODE
+# ==========================
+
+def _ensure_store(xlsx_path):
+    """
+    Pastikan store valid, bangun ulang jika belum ada atau usang. False jika gagal.
+    """
+    if is_store_fresh(xlsx_path):
+        return True
+    try:
+        build_period_store(xlsx_path)
+        return True
+    except Exception as e:
+        # Gagal menulis store tidak boleh menggagalkan request
+        logger.error(f"Gagal membangun store untuk {xlsx_path}: {str(e)}")
+        return False
+
+def load_period(xlsx_path):
+    """
+    Ambil data satu periode dari store kolumnar; jika belum ada atau sudah
+    usang, store dibangun ulang dulu. Jika store tidak bisa dipakai, workbook
+    dibaca langsung.
+    """
+    if _ensure_store(xlsx_path):
+        try:
+            with stage('read_store'):
+                return pd.read_parquet(get_store_path(xlsx_path))
+        except Exception as e:
+            logger.warning(f"Store rusak untuk {xlsx_path}, membaca ulang workbook: {str(e)}")
+    return read_period_workbook(xlsx_path)
+
+def iter_period_chunks(xlsx_path, chunk_rows=None):
+    """
+    Data satu periode per chunk (DataFrame) dari store, tanpa memuat seluruh
+    periode ke memori sekaligus.
+    """
+    import pyarrow.parquet as pq
+
+    if not _ensure_store(xlsx_path):
+        yield read_period_workbook(xlsx_path)
+        return
+    parquet = pq.ParquetFile(get_store_path(xlsx_path))
+    for batch in parquet.iter_batches(batch_size=chunk_rows or PERIOD_CHUNK_ROWS):
+        yield batch.to_pandas()
+
+def read_period_head(xlsx_path, columns):
+    """
+    (baris pertama untuk kolom yang diminta, jumlah baris) dari metadata dan
+    row group pertama store, tanpa membaca seluruh periode.
+    """
+    import pyarrow.parquet as pq
+
+    if not _ensure_store(xlsx_path):
+        df = read_period_workbook(xlsx_path)
+        return df[[c for c in columns if c in df.columns]].head(1), len(df)
+
+    parquet = pq.ParquetFile(get_store_path(xlsx_path))
+    present = [c for c in columns if c in parquet.schema_arrow.names]
+    rows = parquet.metadata.num_rows
+    if not rows or not present:
+        return pd.DataFrame(columns=present), rows
+    return parquet.read_row_group(0, columns=present).slice(0, 1).to_pandas(), rows
@@ -0,0 +1,322 @@
+# profiling.py
+"""
+Profiling request on-demand di produksi. Admin menyalakan/mematikan lewat
+/admin/profiles tanpa restart: pengaturan disimpan di <UPLOAD_FOLDER>/.profiles/settings.json
+sehingga terbaca oleh semua worker.
+
+Request diprofil jika mode aktif dan (a) lolos sampling untuk route yang dipilih,
+atau (b) membawa header X-Profile berisi token dari pengaturan. Hasil disimpan
+di folder yang sama (jumlah dan ukuran dibatasi):
+- mode 'cprofile': file .prof (pstats, bisa dibuka dengan snakeviz/pstats)
+- mode 'sample': stack sampling, file .txt format collapsed stack (flamegraph.pl/speedscope)
+
+Saat nonaktif, biaya per request hanya satu pembacaan pengaturan dari cache memori.
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import pstats
+import secrets
+import cProfile
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIRNAME = '.profiles'
+SETTINGS_FILENAME = 'settings.json'
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '50'))
+PROFILE_MAX_BYTES = int(os.getenv('PROFILE_MAX_BYTES', str(200 * 1024 * 1024)))
+# Interval stack sampling (detik)
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', '0.005'))
+# Seberapa sering file pengaturan dicek ulang per proses (detik)
+PROFILE_SETTINGS_TTL = float(os.getenv('PROFILE_SETTINGS_TTL', '2'))
+PROFILE_HEADER = 'X-Profile'
+MODES = ('cprofile', 'sample')
+SUMMARY_SORT_KEYS = ('cumulative', 'tottime', 'calls', 'ncalls')
+
+DEFAULT_SETTINGS = {
+    'enabled': False,
+    'mode': 'cprofile',
+    'sample_rate': 0.0,
+    'routes': [],        # nama endpoint Flask, kosong = semua route
+    'token': '',
+    'expires_at': None,  # epoch detik, mode mati otomatis setelahnya
+    'updated_by': None,
+    'updated_at': None,
+}
+
+_settings_lock = threading.Lock()
+_settings_cache = {'folder': None, 'checked': 0.0, 'mtime': None, 'value': dict(DEFAULT_SETTINGS)}
+_save_lock = threading.Lock()
+
+
+def get_profile_dir(folder):
+    return os.path.join(folder, PROFILE_DIRNAME)
+
+def _settings_path(folder):
+    return os.path.join(get_profile_dir(folder), SETTINGS_FILENAME)
+
+
+# ==========================
+# PENGATURAN
+# ==========================
+
+def load_settings(folder):
+    try:
+        with open(_settings_path(folder), 'r', encoding='utf-8') as f:
+            return {**DEFAULT_SETTINGS, **json.load(f)}
+    except FileNotFoundError:
+        return dict(DEFAULT_SETTINGS)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Pengaturan profiling tidak terbaca, profiling dimatikan: {str(e)}")
+        return dict(DEFAULT_SETTINGS)
+
+def get_settings(folder):
+    """
+    Pengaturan dari cache proses; file hanya di-stat ulang setiap PROFILE_SETTINGS_TTL detik.
+    """
+    now = time.monotonic()
+    cache = _settings_cache
+    if cache['folder'] == folder and now - cache['checked'] < PROFILE_SETTINGS_TTL:
+        return cache['value']
+
+    with _settings_lock:
+        try:
+            mtime = os.path.getmtime(_settings_path(folder))
+        except OSError:
+            mtime = None
+        if cache['folder'] != folder or mtime != cache['mtime']:
+            cache['value'] = load_settings(folder)
+            cache['mtime'] = mtime
+            cache['folder'] = folder
+        cache['checked'] = now
+        return cache['value']
+
+def save_settings(folder, changes, updated_by=None):
+    """
+    Simpan pengaturan baru (atomik). Token dibuat saat profiling pertama kali diaktifkan.
+    """
+    settings = load_settings(folder)
+    settings.update(changes)
+
+    if settings['mode'] not in MODES:
+        raise ValueError(f"Mode profiling harus salah satu dari: {', '.join(MODES)}")
+    settings['sample_rate'] = min(max(float(settings['sample_rate']), 0.0), 1.0)
+    if isinstance(settings['routes'], str):
+        settings['routes'] = [r.strip() for r in settings['routes'].split(',') if r.strip()]
+    if settings['enabled'] and not settings['token']:
+        settings['token'] = secrets.token_urlsafe(16)
+    settings['updated_by'] = updated_by
+    settings['updated_at'] = datetime.now().isoformat(timespec='seconds')
+
+    path = _settings_path(folder)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(settings, f, indent=2)
+    os.replace(tmp_path, path)
+
+    # Proses ini langsung memakai pengaturan baru
+    with _settings_lock:
+        _settings_cache['checked'] = 0.0
+    logger.info(f"Pengaturan profiling diubah oleh {updated_by}: {settings}")
+    return settings
+
+def _should_profile(settings):
+    if not settings['enabled']:
+        return False
+    if settings['expires_at'] and time.time() > settings['expires_at']:
+        return False
+    token = request.headers.get(PROFILE_HEADER)
+    if token and settings['token'] and secrets.compare_digest(token, settings['token']):
+        return True
+    if settings['routes'] and request.endpoint not in settings['routes']:
+        return False
+    return settings['sample_rate'] > 0 and random.random() < settings['sample_rate']
+
+
+# ==========================
+# PROFILER
+# ==========================
+
+class _CProfiler:
+    extension = '.prof'
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+
+class _StackSampler:
+    """
+    Ambil stack thread request setiap interval dari thread lain; biaya pada
+    thread request hanya GIL yang sesekali dipinjam sampler.
+    """
+    extension = '.txt'
+
+    def __init__(self, interval=PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.target = threading.get_ident()
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+# ==========================
+# PENYIMPANAN
+# ==========================
+
+def _prune(profile_dir):
+    """
+    Hapus profil terlama sampai jumlah dan total ukuran di bawah batas.
+    """
+    entries = []
+    for name in os.listdir(profile_dir):
+        if name.endswith(('.prof', '.txt')):
+            path = os.path.join(profile_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    while entries and (len(entries) > PROFILE_MAX_FILES or total > PROFILE_MAX_BYTES):
+        _, size, path = entries.pop(0)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+
+def _save_profile(folder, profiler, endpoint, elapsed, status):
+    profile_dir = get_profile_dir(folder)
+    os.makedirs(profile_dir, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')[:-3]
+    name = f"{stamp}_{endpoint or 'unmatched'}_{status}_{elapsed * 1000:.0f}ms_p{os.getpid()}{profiler.extension}"
+    path = os.path.join(profile_dir, name.replace('/', '_'))
+    profiler.dump(path)
+    with _save_lock:
+        _prune(profile_dir)
+    logger.info(f"Profil request disimpan: {os.path.basename(path)}")
+
+def list_profiles(folder):
+    profile_dir = get_profile_dir(folder)
+    if not os.path.isdir(profile_dir):
+        return []
+    profiles = []
+    for name in os.listdir(profile_dir):
+        if not name.endswith(('.prof', '.txt')):
+            continue
+        try:
+            stat = os.stat(os.path.join(profile_dir, name))
+        except OSError:
+            continue
+        profiles.append({
+            'name': name,
+            'size': stat.st_size,
+            'created_at': datetime.fromtimestamp(stat.st_mtime).isoformat(timespec='seconds'),
+        })
+    profiles.sort(key=lambda p: p['name'], reverse=True)
+    return profiles
+
+def get_profile_path(folder, name):
+    """
+    Path file profil, None jika nama tidak valid atau file tidak ada.
+    """
+    if os.path.basename(name) != name or not name.endswith(('.prof', '.txt')):
+        return None
+    path = os.path.join(get_profile_dir(folder), name)
+    return path if os.path.isfile(path) else None
+
+def profile_summary(path, limit=50, sort='cumulative'):
+    """
+    Ringkasan teks pstats (fungsi teratas) untuk dilihat langsung di browser.
+    """
+    if sort not in SUMMARY_SORT_KEYS:
+        sort = 'cumulative'
+    output = io.StringIO()
+    stats = pstats.Stats(path, stream=output)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return output.getvalue()
+
+
+# ==========================
+# FLASK
+# ==========================
+
+def init_app(app):
+    """
+    Pasang hook profiling. Folder profil mengikuti app.config['UPLOAD_FOLDER'].
+    """
+
+    @app.before_request
+    def _start_profile():
+        folder = app.config['UPLOAD_FOLDER']
+        settings = get_settings(folder)
+        if not settings['enabled'] or not _should_profile(settings):
+            return
+        profiler = _StackSampler() if settings['mode'] == 'sample' else _CProfiler()
+        try:
+            profiler.start()
+        except ValueError:
+            # Python 3.12+: hanya satu cProfile aktif per proses, request lain sedang diprofil
+            return
+        g._profiler = (profiler, time.perf_counter())
+
+    @app.after_request
+    def _record_status(response):
+        if '_profiler' in g:
+            g._profile_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _finish_profile(exc):
+        state = g.pop('_profiler', None)
+        if state is None:
+            return
+        profiler, start = state
+        profiler.stop()
+        try:
+            _save_profile(app.config['UPLOAD_FOLDER'], profiler, request.endpoint,
+                          time.perf_counter() - start, g.pop('_profile_status', 500))
+        except Exception as e:
+            logger.error(f"Gagal menyimpan profil request: {str(e)}")
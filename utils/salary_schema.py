@@ -0,0 +1,270 @@
+# salary_schema.py
+"""
+Susunan komponen gaji per status pegawai dalam bentuk data (SALARY_SCHEMA),
+dikompilasi sekali saat import.
+
+Dipakai untuk dua jalur:
+- per slip: get_components(user_dict) -> (komponen_thp, komponen_lain, komponen_potongan)
+- per periode (operasi kolom atas DataFrame): period_totals, total_mismatches
+  dan period_report, tanpa membangun dict per baris.
+
+Menambah status atau komponen cukup dengan mengubah SALARY_SCHEMA.
+"""
+import os
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+# Urutan grup sama dengan tuple hasil get_components
+GROUPS = ('thp', 'lain', 'potongan')
+
+# status (huruf kecil) -> grup -> [(label di slip, kolom setelah clean_column_names)]
+SALARY_SCHEMA = {
+    'pkwtt': {
+        'thp': [
+            ("Gaji Dasar 1", "GAJI_DASAR_1"),
+            ("Gaji Dasar 2", "GAJI_DASAR_2"),
+            ("Tunjangan Grade", "TUNJ_GRADE"),
+        ],
+        'lain': [
+            ("Insentif", "INSENTIF"),
+            ("Rapel", "RAPEL"),
+            ("Tunjangan Struktural", "TUNJ_STRUKTURAL"),
+            ("Uang Makan", "FOODING"),
+            ("Uang Transport", "TRANSPORT"),
+            ("Telpon", "TELPON"),
+            ("Uang Bensin", "BENSIN"),
+            ("Uang Perumahan", "PERUMAHAN"),
+            ("EToll", "ETOLL"),
+            ("Tunjangan Kendaraan", "KENDARAAN"),
+        ],
+        'potongan': [
+            ("IDP", "IDP"),
+            ("PIP", "PIP"),
+            ("DPLK", "DPLK"),
+            ("Simp. Wajib Koperasi", "SIKOP"),
+            ("Pinjaman Koperasi", "PINKOP"),
+            ("Serikat Pekerja", "SP"),
+            ("BPJS Ketenagakerjaan - JHT", "JAMSOSTEK"),
+            ("BPJS Ketenagakerjaan - JP", "JAMINAN_PENSIUN"),
+            ("BPJS Kesehatan", "BPJS_KESEHATAN"),
+            ("Lain-Lain", "LAIN_LAIN"),
+        ],
+    },
+    'pkwt': {
+        'thp': [
+            ("Honorarium", "GAJI_KONTRAK"),
+            ("Bantuan DPLK", "BANTUAN_DPLK"),
+        ],
+        'lain': [
+            ("Insentif", "INSENTIF"),
+            ("Uang Makan", "FOODING"),
+            ("Uang Transport", "TRANSPORT"),
+        ],
+        'potongan': [
+            ("DPLK", "DPLK"),
+            ("Simp. Wajib Koperasi", "SIKOP"),
+            ("Pinjaman Koperasi", "PINKOP"),
+            ("Serikat Pekerja", "SP"),
+            ("BPJS Ketenagakerjaan - JHT", "JAMSOSTEK"),
+            ("BPJS Ketenagakerjaan - JP", "JAMINAN_PENSIUN"),
+            ("BPJS Kesehatan", "BPJS_KESEHATAN"),
+            ("Lain-Lain", "LAIN_LAIN"),
+        ],
+    },
+    'tambahan': {
+        'thp': [
+            ("Honorarium", "GAJI_KONTRAK"),
+        ],
+        'lain': [
+            ("Uang Perumahan", "PERUMAHAN"),
+            ("Uang Transport", "TRANSPORT"),
+        ],
+        'potongan': [
+            ("Simp. Wajib Koperasi", "SIKOP"),
+            ("Pinjaman Koperasi", "PINKOP"),
+            ("BPJS Ketenagakerjaan - JHT", "JAMSOSTEK"),
+            ("BPJS Ketenagakerjaan - JP", "JAMINAN_PENSIUN"),
+            ("BPJS Kesehatan", "BPJS_KESEHATAN"),
+        ],
+    },
+}
+
+# Kolom total di file yang harus sama dengan jumlah komponen grupnya
+VALIDATED_TOTALS = {'thp': 'TOTAL_THP', 'lain': 'PENGHASILAN_LAIN'}
+# Selisih (rupiah) yang masih dianggap sama, untuk pembulatan di Excel
+TOTAL_TOLERANCE = float(os.getenv('SALARY_TOTAL_TOLERANCE', '1'))
+
+# Kolom ringkasan di tabel admin
+REPORT_COLUMNS = ['NUP', 'NAMA', 'STATUS_PEGAWAI', 'THP', 'PENGHASILAN_LAIN', 'JML_POTONGAN', 'THP_NET']
+
+_Layout = namedtuple('_Layout', GROUPS)
+
+
+def _compile(schema):
+    """
+    Ubah skema menjadi tuple (label, kolom) per grup dan daftar semua kolom
+    komponen (urut per grup, lalu per status, tanpa duplikat).
+    """
+    layouts = {}
+    columns = []
+    for status, groups in schema.items():
+        unknown = set(groups) - set(GROUPS)
+        if unknown:
+            raise ValueError(f"Grup komponen tidak dikenal untuk status {status}: {', '.join(sorted(unknown))}")
+        layouts[status.lower()] = _Layout(*(tuple(groups.get(group, ())) for group in GROUPS))
+
+    for group in GROUPS:
+        for layout in layouts.values():
+            for _, column in getattr(layout, group):
+                if column not in columns:
+                    columns.append(column)
+    return layouts, tuple(columns)
+
+_LAYOUTS, COMPONENT_COLUMNS = _compile(SALARY_SCHEMA)
+_EMPTY_LAYOUT = _Layout((), (), ())
+
+# Kolom total di file gaji
+TOTAL_COLUMNS = ('TOTAL_THP', 'PENGHASILAN_LAIN', 'THP', 'JML_POTONGAN', 'THP_NET')
+# Semua kolom nominal (rupiah) yang harus berisi angka
+AMOUNT_COLUMNS = COMPONENT_COLUMNS + TOTAL_COLUMNS
+
+
+def normalize_status(value):
+    return str(value).lower()
+
+def get_layout(status):
+    return _LAYOUTS.get(normalize_status(status), _EMPTY_LAYOUT)
+
+
+# ==========================
+# PER SLIP
+# ==========================
+
+def get_components(user_dict):
+    """
+    (komponen_thp, komponen_lain, komponen_potongan) untuk satu pegawai;
+    kolom yang tidak ada bernilai 0, status tidak dikenal menghasilkan dict kosong.
+    """
+    layout = get_layout(user_dict.get('STATUS_PEGAWAI', ''))
+    get = user_dict.get
+    return (
+        {label: get(column, 0) for label, column in layout.thp},
+        {label: get(column, 0) for label, column in layout.lain},
+        {label: get(column, 0) for label, column in layout.potongan},
+    )
+
+
+# ==========================
+# PER PERIODE
+# ==========================
+
+def _status_series(df):
+    if 'STATUS_PEGAWAI' not in df.columns:
+        return pd.Series('', index=df.index)
+    return df['STATUS_PEGAWAI'].astype(str).str.lower()
+
+def _status_positions(df):
+    """
+    {status: posisi baris} untuk status yang ada di skema.
+    """
+    status = _status_series(df).to_numpy()
+    positions = {}
+    for name in _LAYOUTS:
+        found = np.flatnonzero(status == name)
+        if len(found):
+            positions[name] = found
+    return positions
+
+def period_totals(df):
+    """
+    Jumlah komponen THP, lain dan potongan per baris (DataFrame kolom GROUPS,
+    index sama dengan df). Nilai kosong/bukan angka dihitung 0; status tidak
+    dikenal bernilai 0 di semua grup.
+    """
+    present = [column for column in COMPONENT_COLUMNS if column in df.columns]
+    values = df[present].apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy(dtype=float)
+    index = {column: i for i, column in enumerate(present)}
+
+    totals = np.zeros((len(df), len(GROUPS)))
+    for name, positions in _status_positions(df).items():
+        layout = _LAYOUTS[name]
+        for g, group in enumerate(GROUPS):
+            idx = [index[column] for _, column in getattr(layout, group) if column in index]
+            if idx:
+                totals[positions, g] = values[np.ix_(positions, idx)].sum(axis=1)
+    return pd.DataFrame(totals, index=df.index, columns=list(GROUPS))
+
+def total_mismatches(df, totals=None, tolerance=TOTAL_TOLERANCE):
+    """
+    Baris yang kolom totalnya (VALIDATED_TOTALS) berbeda dari jumlah komponen,
+    ditambah baris ber-NUP dengan status di luar skema (baris kosong/pemisah
+    tanpa NUP tidak dilaporkan). Satu baris hasil per temuan:
+    NUP, STATUS_PEGAWAI, KOLOM, NILAI_FILE, NILAI_KOMPONEN, SELISIH; index
+    mengikuti df.
+    """
+    if totals is None:
+        totals = period_totals(df)
+    nup = df['NUP'] if 'NUP' in df.columns else pd.Series(None, index=df.index)
+    status = df['STATUS_PEGAWAI'] if 'STATUS_PEGAWAI' in df.columns else pd.Series('', index=df.index)
+    known = _status_series(df).isin(_LAYOUTS.keys())
+
+    found = []
+    for group, column in VALIDATED_TOTALS.items():
+        if column not in df.columns:
+            continue
+        in_file = pd.to_numeric(df[column], errors='coerce').fillna(0)
+        diff = in_file - totals[group]
+        mask = known & (diff.abs() > tolerance)
+        if mask.any():
+            found.append(pd.DataFrame({
+                'NUP': nup[mask], 'STATUS_PEGAWAI': status[mask], 'KOLOM': column,
+                'NILAI_FILE': in_file[mask], 'NILAI_KOMPONEN': totals.loc[mask, group], 'SELISIH': diff[mask],
+            }))
+
+    has_nup = nup.notna() & (nup.astype(str).str.strip() != '')
+    unknown = ~known & has_nup
+    if unknown.any():
+        found.append(pd.DataFrame({
+            'NUP': nup[unknown], 'STATUS_PEGAWAI': status[unknown], 'KOLOM': 'STATUS_PEGAWAI',
+            'NILAI_FILE': np.nan, 'NILAI_KOMPONEN': np.nan, 'SELISIH': np.nan,
+        }))
+
+    if not found:
+        return pd.DataFrame(columns=['NUP', 'STATUS_PEGAWAI', 'KOLOM', 'NILAI_FILE', 'NILAI_KOMPONEN', 'SELISIH'])
+    return pd.concat(found).sort_index(kind='stable')
+
+def _rupiah(value):
+    return f"{value:,.0f}".replace(',', '.')
+
+def describe_mismatches(mismatches, limit=None):
+    """
+    Pesan per temuan total_mismatches untuk log, flash dan hasil job.
+    """
+    rows = mismatches if limit is None else mismatches.head(limit)
+    messages = []
+    for row in rows.itertuples(index=False):
+        if row.KOLOM == 'STATUS_PEGAWAI':
+            messages.append(f"NUP {row.NUP}: status pegawai '{row.STATUS_PEGAWAI}' tidak dikenal, komponen tidak ditampilkan")
+        else:
+            messages.append(
+                f"NUP {row.NUP}: {row.KOLOM} di file {_rupiah(row.NILAI_FILE)}, "
+                f"jumlah komponen {_rupiah(row.NILAI_KOMPONEN)} (selisih {_rupiah(row.SELISIH)})"
+            )
+    return messages
+
+def period_report(df):
+    """
+    Ringkasan tabel admin: REPORT_COLUMNS ditambah jumlah komponen per grup
+    (KOMPONEN_THP, KOMPONEN_LAIN, KOMPONEN_POTONGAN) dan TOTAL_MISMATCH untuk
+    baris yang total di file tidak sama dengan komponennya.
+    """
+    if df.empty:
+        return []
+    totals = period_totals(df)
+    flagged = total_mismatches(df, totals).index
+    report = df[[column for column in REPORT_COLUMNS if column in df.columns]].copy()
+    for group in GROUPS:
+        report[f"KOMPONEN_{group.upper()}"] = totals[group]
+    report['TOTAL_MISMATCH'] = report.index.isin(flagged)
+    return report.to_dict('records')
@@ -11,10 +11,16 @@ EMAIL_ADDRESS = os.getenv('EMAIL_USER')
 EMAIL_PASSWORD = os.getenv('EMAIL_PASS')
 EMAIL_PROVIDER = os.getenv('EMAIL_PROVIDER', 'gmail').lower()
 
-def send_email(to_email, pdf_path, nama, bulan, tahun):
-    subject = f'Slip Gaji {bulan} {tahun} - PT BKI'
+# Override server SMTP, mis. untuk server lokal (aiosmtpd) saat pengujian
+SMTP_HOST = os.getenv('SMTP_HOST')
+SMTP_PORT = os.getenv('SMTP_PORT')
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', '1') == '1'
+
+def build_email_subject(bulan, tahun):
+    return f'Slip Gaji {bulan} {tahun} - PT BKI'
 
-    body = f"""Yth. Bapak/Ibu {nama},
+def build_email_body(nama, bulan, tahun):
+    return f"""Yth. Bapak/Ibu {nama},
 
 Dengan hormat,
 
@@ -36,11 +42,7 @@ Divisi Human Capital & Teknologi Informasi
 PT Biro Klasifikasi Indonesia (Persero)
 """
 
-    if EMAIL_PROVIDER == 'graph':
-        send_graph_email(to_email, subject, body, pdf_path)
-        return
-
-    # SMTP method
+def build_email_message(to_email, subject, body, pdf_path):
     msg = EmailMessage()
     msg['Subject'] = subject
     msg['From'] = EMAIL_ADDRESS
@@ -49,20 +51,40 @@ PT Biro Klasifikasi Indonesia (Persero)
 
     with open(pdf_path, 'rb') as f:
         msg.add_attachment(f.read(), maintype='application', subtype='pdf', filename=os.path.basename(pdf_path))
+    return msg
+
+def get_smtp_settings():
+    """
+    Kembalikan (host, port, starttls) sesuai EMAIL_PROVIDER atau override SMTP_HOST/SMTP_PORT.
+    """
+    if SMTP_HOST:
+        return SMTP_HOST, int(SMTP_PORT or 25), SMTP_STARTTLS
+
+    if EMAIL_PROVIDER == 'gmail':
+        return 'smtp.gmail.com', 587, True
+    elif EMAIL_PROVIDER == 'outlook':
+        return 'smtp.office365.com', 587, True
+    raise ValueError("EMAIL_PROVIDER harus 'gmail', 'outlook', atau 'graph'.")
+
+def send_email(to_email, pdf_path, nama, bulan, tahun):
+    subject = build_email_subject(bulan, tahun)
+    body = build_email_body(nama, bulan, tahun)
+
+    if EMAIL_PROVIDER == 'graph':
+        send_graph_email(to_email, subject, body, pdf_path)
+        return
+
+    # SMTP method
+    msg = build_email_message(to_email, subject, body, pdf_path)
 
     try:
-        if EMAIL_PROVIDER == 'gmail':
-            smtp_server = 'smtp.gmail.com'
-            smtp_port = 587
-        elif EMAIL_PROVIDER == 'outlook':
-            smtp_server = 'smtp.office365.com'
-            smtp_port = 587
-        else:
-            raise ValueError("EMAIL_PROVIDER harus 'gmail', 'outlook', atau 'graph'.")
+        smtp_server, smtp_port, starttls = get_smtp_settings()
 
         with smtplib.SMTP(smtp_server, smtp_port) as smtp:
-            smtp.starttls()
-            smtp.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
+            if starttls:
+                smtp.starttls()
+            if EMAIL_PASSWORD:
+                smtp.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
             smtp.send_message(msg)
 
         print(f"✅ Email terkirim ke {to_email}")
@@ -0,0 +1,350 @@
+# server_session.py
+"""
+Session Flask yang disimpan di server (file lokal atau Postgres). Cookie hanya
+berisi session id dan nomor versi yang ditandatangani; isi session dicache di
+memori proses dan hanya dibaca ulang dari store jika versinya berbeda.
+
+Hanya session yang sudah login (ada 'nup') yang disimpan di server. Session
+anonim (mis. hanya flash message setelah login gagal) disimpan di cookie
+bertanda tangan dengan umur pendek, supaya klien tanpa login tidak bisa
+membuat file/baris session tanpa batas.
+"""
+import os
+import re
+import time
+import random
+import secrets
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask.sessions import SessionInterface, SessionMixin
+from flask.json.tag import TaggedJSONSerializer
+from itsdangerous import Signer, URLSafeTimedSerializer, BadSignature
+from werkzeug.datastructures import CallbackDict
+from models.db import get_db_cursor, create_sessions_table
+
+logger = logging.getLogger(__name__)
+
+# 'cookie' (bawaan Flask), 'file' atau 'postgres'
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'file').lower()
+SESSION_LIFETIME = int(os.getenv('SESSION_LIFETIME', str(12 * 3600)))  # detik
+# Umur cookie session anonim (tanpa login), cukup untuk flash message antar redirect
+ANON_SESSION_LIFETIME = int(os.getenv('ANON_SESSION_LIFETIME', '600'))  # detik
+# Cache isi session di memori proses
+SESSION_CACHE_SIZE = int(os.getenv('SESSION_CACHE_SIZE', '10000'))
+SESSION_CACHE_TTL = int(os.getenv('SESSION_CACHE_TTL', '300'))  # detik
+# Peluang membersihkan session kedaluwarsa setiap kali session disimpan
+CLEANUP_PROBABILITY = 0.01
+
+SID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{20,64}$')
+# Awalan cookie session anonim (isi session di cookie, bukan session id)
+ANON_COOKIE_PREFIX = '~'
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+
+    def __init__(self, initial=None, sid=None, version=0, new=False):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.version = version
+        self.new = new
+        self.modified = False
+        # NUP saat session dibuka; jika berubah (login/logout) session id diganti
+        self.original_nup = self.get('nup')
+
+
+# ==========================
+# STORE
+# ==========================
+
+class FileSessionStore:
+    """
+    Satu file per session di <folder>/<sid>.json, ditulis atomik.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, sid):
+        return os.path.join(self.folder, f"{sid}.json")
+
+    def load(self, sid):
+        try:
+            with open(self._path(sid), 'r', encoding='utf-8') as f:
+                header, payload = f.read().split('\n', 1)
+        except (OSError, ValueError):
+            return None
+        version, expires_at = header.split(' ')
+        if float(expires_at) < time.time():
+            self.delete(sid)
+            return None
+        return payload, int(version)
+
+    def save(self, sid, payload, version, lifetime):
+        path = self._path(sid)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(f"{version} {time.time() + lifetime}\n{payload}")
+        os.replace(tmp_path, path)
+
+    def delete(self, sid):
+        try:
+            os.remove(self._path(sid))
+        except OSError:
+            pass
+
+    def cleanup(self, lifetime):
+        cutoff = time.time() - lifetime
+        removed = 0
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+class PostgresSessionStore:
+    """
+    Tabel sessions di database aplikasi (lewat pool koneksi models.db). Tabel
+    dibuat init_db; koneksi baru dibuka saat session pertama dibaca/ditulis,
+    sehingga import app tidak membutuhkan database.
+    """
+
+    def __init__(self):
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def _ensure_table(self):
+        # Untuk database yang dibuat sebelum init_db membuat tabel sessions
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            with get_db_cursor() as cur:
+                create_sessions_table(cur)
+            self._schema_ready = True
+
+    def load(self, sid):
+        self._ensure_table()
+        with get_db_cursor() as cur:
+            cur.execute(
+                "SELECT data, version FROM sessions WHERE sid = %s AND expires_at > CURRENT_TIMESTAMP",
+                (sid,)
+            )
+            row = cur.fetchone()
+        return (row['data'], row['version']) if row else None
+
+    def save(self, sid, payload, version, lifetime):
+        self._ensure_table()
+        with get_db_cursor() as cur:
+            cur.execute("""
+                INSERT INTO sessions (sid, data, version, expires_at)
+                VALUES (%s, %s, %s, CURRENT_TIMESTAMP + make_interval(secs => %s))
+                ON CONFLICT (sid) DO UPDATE
+                SET data = EXCLUDED.data, version = EXCLUDED.version, expires_at = EXCLUDED.expires_at
+            """, (sid, payload, version, lifetime))
+
+    def delete(self, sid):
+        self._ensure_table()
+        with get_db_cursor() as cur:
+            cur.execute("DELETE FROM sessions WHERE sid = %s", (sid,))
+
+    def cleanup(self, lifetime):
+        self._ensure_table()
+        with get_db_cursor() as cur:
+            cur.execute("DELETE FROM sessions WHERE expires_at < CURRENT_TIMESTAMP")
+            return cur.rowcount
+
+
+# ==========================
+# SESSION INTERFACE
+# ==========================
+
+class ServerSideSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()
+    salt = 'server-session'
+
+    def __init__(self, store, lifetime=SESSION_LIFETIME,
+                 cache_size=SESSION_CACHE_SIZE, cache_ttl=SESSION_CACHE_TTL):
+        self.store = store
+        self.lifetime = lifetime
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._cache = OrderedDict()  # sid -> (versi, payload, waktu dicache)
+        self._lock = threading.Lock()
+        self.stats = {'cache_hits': 0, 'store_reads': 0, 'store_writes': 0}
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=self.salt)
+
+    def _anon_serializer(self, app):
+        return URLSafeTimedSerializer(app.secret_key, salt=self.salt + '-anon', serializer=self.serializer)
+
+    def _cache_get(self, sid, version):
+        with self._lock:
+            entry = self._cache.get(sid)
+            if entry and entry[0] == version and time.monotonic() - entry[2] < self.cache_ttl:
+                self._cache.move_to_end(sid)
+                self.stats['cache_hits'] += 1
+                return entry[1]
+        return None
+
+    def _cache_put(self, sid, version, payload):
+        with self._lock:
+            self._cache[sid] = (version, payload, time.monotonic())
+            self._cache.move_to_end(sid)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cache_drop(self, sid):
+        with self._lock:
+            self._cache.pop(sid, None)
+
+    def _new_session(self):
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if not cookie:
+            return self._new_session()
+        if cookie.startswith(ANON_COOKIE_PREFIX):
+            return self._open_anonymous(app, cookie[len(ANON_COOKIE_PREFIX):])
+
+        try:
+            sid, version = self._signer(app).unsign(cookie).decode('ascii').rsplit('.', 1)
+            version = int(version)
+        except (BadSignature, ValueError, UnicodeDecodeError):
+            return self._new_session()
+        if not SID_PATTERN.match(sid):
+            return self._new_session()
+
+        # Cookie selalu membawa versi terbaru: cache valid jika versinya sama
+        payload = self._cache_get(sid, version)
+        if payload is None:
+            try:
+                stored = self.store.load(sid)
+            except Exception as e:
+                logger.error(f"Gagal membaca session: {str(e)}")
+                stored = None
+            with self._lock:
+                self.stats['store_reads'] += 1
+            if stored is None:
+                return self._new_session()
+            payload, version = stored
+            self._cache_put(sid, version, payload)
+
+        try:
+            data = self.serializer.loads(payload)
+        except Exception:
+            return self._new_session()
+        return ServerSideSession(data, sid=sid, version=version)
+
+    def _open_anonymous(self, app, value):
+        try:
+            data = self._anon_serializer(app).loads(value, max_age=ANON_SESSION_LIFETIME)
+        except (BadSignature, ValueError):
+            return self._new_session()
+        session = ServerSideSession(data, sid=secrets.token_urlsafe(32), new=True)
+        session.anonymous_cookie = True
+        return session
+
+    def _drop_stored(self, session):
+        self.store.delete(session.sid)
+        self._cache_drop(session.sid)
+
+    def _save_anonymous(self, app, session, response):
+        """
+        Session tanpa login: isi disimpan di cookie bertanda tangan, tidak di store.
+        Session server lama (logout) dihapus dari store.
+        """
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session.new:
+            self._drop_stored(session)
+        if not session:
+            if not session.new or getattr(session, 'anonymous_cookie', False):
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        cookie = ANON_COOKIE_PREFIX + self._anon_serializer(app).dumps(dict(session))
+        response.set_cookie(
+            name, cookie,
+            expires=datetime.now() + timedelta(seconds=ANON_SESSION_LIFETIME),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session.modified:
+            return
+        if not session.get('nup'):
+            self._save_anonymous(app, session, response)
+            return
+
+        if not session.new and session.get('nup') != session.original_nup:
+            # Login/logout: ganti session id supaya id lama tidak bisa dipakai ulang
+            self._drop_stored(session)
+            session.sid = secrets.token_urlsafe(32)
+            session.version = 0
+
+        session.version += 1
+        payload = self.serializer.dumps(dict(session))
+        self.store.save(session.sid, payload, session.version, self.lifetime)
+        self._cache_put(session.sid, session.version, payload)
+        with self._lock:
+            self.stats['store_writes'] += 1
+
+        if random.random() < CLEANUP_PROBABILITY:
+            try:
+                self.store.cleanup(self.lifetime)
+            except Exception as e:
+                logger.warning(f"Gagal membersihkan session kedaluwarsa: {str(e)}")
+
+        cookie = self._signer(app).sign(f"{session.sid}.{session.version}").decode('ascii')
+        response.set_cookie(
+            name, cookie,
+            expires=datetime.now() + timedelta(seconds=self.lifetime) if session.permanent else None,
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['cached'] = len(self._cache)
+        stats['backend'] = type(self.store).__name__
+        return stats
+
+
+def create_session_interface(folder, backend=None):
+    """
+    Session interface sesuai SESSION_BACKEND; None berarti tetap memakai
+    cookie session bawaan Flask.
+    """
+    backend = (backend or SESSION_BACKEND).lower()
+    if backend == 'cookie':
+        return None
+    if backend == 'postgres':
+        return ServerSideSessionInterface(PostgresSessionStore())
+    if backend == 'file':
+        return ServerSideSessionInterface(FileSessionStore(os.path.join(folder, '.sessions')))
+    raise ValueError("SESSION_BACKEND harus 'cookie', 'file' atau 'postgres'")
@@ -0,0 +1,408 @@
+# user_import.py
+import os
+import hmac
+import hashlib
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from werkzeug.security import generate_password_hash
+from psycopg2.extras import execute_values
+from models.db import get_db_cursor
+from utils.helpers import parse_ttl_column
+
+logger = logging.getLogger(__name__)
+
+# Pemetaan kolom yang mungkin
+COLUMN_MAPPING = {
+    'NUP': ['NUP', 'ID', 'EMPLOYEE_ID'],
+    'TTL': ['TTL', 'PASSWORD', 'TANGGAL_LAHIR', 'BIRTH_DATE'],
+    'ROLE': ['ROLE', 'JABATAN', 'POSITION']
+}
+
+# Jumlah baris per statement INSERT multi-row
+BATCH_SIZE = int(os.getenv('USER_IMPORT_BATCH_SIZE', '1000'))
+# Jumlah proses untuk hashing password (default: semua core)
+HASH_WORKERS = int(os.getenv('USER_IMPORT_WORKERS', '0')) or os.cpu_count() or 1
+# Di bawah jumlah ini hashing dilakukan langsung tanpa process pool
+MIN_PARALLEL_ROWS = 64
+# Kunci HMAC untuk sidik jari TTL sumber (bukan password, hanya untuk deteksi perubahan).
+# Wajib untuk mode sinkronisasi dan JANGAN pernah dirotasi: kunci baru membuat semua
+# sidik jari berbeda sehingga sinkronisasi berikutnya mereset semua password ke TTL.
+SYNC_KEY = os.getenv('USER_SYNC_KEY', '').encode()
+
+_sync_columns_ready = False
+_sync_columns_lock = threading.Lock()
+
+
+# ==========================
+# VALIDASI BARIS
+# ==========================
+
+def detect_user_columns(columns):
+    """
+    Deteksi kolom NUP, TTL dan ROLE dari nama kolom (sudah uppercase).
+    """
+    nup_col = ttl_col = role_col = None
+    for col in columns:
+        if col in COLUMN_MAPPING['NUP']:
+            nup_col = col
+        elif col in COLUMN_MAPPING['TTL']:
+            ttl_col = col
+        elif col in COLUMN_MAPPING['ROLE']:
+            role_col = col
+    return nup_col, ttl_col, role_col
+
+def ttl_to_password(ttl_raw):
+    """
+    Konversi satu TTL ke password ddmmyyyy, None jika format tidak dikenali.
+    """
+    return ttl_passwords(pd.Series([ttl_raw], dtype=object)).iat[0]
+
+def ttl_passwords(values):
+    """
+    Password ddmmyyyy untuk satu kolom TTL roster (None jika kosong/tidak dikenali).
+    Teks di luar TTL_FORMATS diparse tanpa dayfirst seperti import sebelumnya,
+    supaya password login yang sudah ada tidak berubah.
+    """
+    values = pd.Series(values)
+    dates, invalid = parse_ttl_column(values, dayfirst=False)
+    if not pd.api.types.is_datetime64_any_dtype(values):
+        # Sel boolean bukan TTL (import sebelumnya juga menolaknya), bukan nomor seri
+        invalid = invalid | values.map(lambda v: isinstance(v, (bool, np.bool_))).astype(bool)
+    return dates.dt.strftime('%d%m%Y').astype(object).where(~invalid, None)
+
+def parse_user_rows(df, nup_col, ttl_col, role_col):
+    """
+    Validasi tiap baris roster. Mengembalikan (rows, error_details) dengan rows berisi
+    dict row_no, nup, password (plain) dan role untuk baris yang valid.
+    TTL seluruh kolom diparse sekaligus; loop hanya menyusun hasil per baris.
+    """
+    rows = []
+    error_details = []
+
+    nups = df[nup_col]
+    ttls = df[ttl_col]
+    nup_clean = nups.astype(str).str.strip().where(nups.notna(), '')
+    passwords = ttl_passwords(ttls)
+    if role_col:
+        roles = df[role_col].astype(str).str.strip().str.lower().where(df[role_col].notna(), 'pegawai')
+    else:
+        roles = pd.Series('pegawai', index=df.index)
+
+    for index, nup, ttl_raw, password, role in zip(df.index, nup_clean, ttls, passwords, roles):
+        row_no = index + 2
+        if nup == '':
+            error_details.append(f"Baris {row_no}: NUP kosong")
+        elif pd.isna(ttl_raw):
+            error_details.append(f"Baris {row_no}: TTL kosong")
+        elif not password:
+            error_details.append(f"Baris {row_no}: Format TTL tidak valid ({ttl_raw})")
+        else:
+            rows.append({'row_no': row_no, 'nup': nup, 'password': password, 'role': role})
+
+    return rows, error_details
+
+
+# ==========================
+# SIDIK JARI & SKEMA
+# ==========================
+
+def source_fingerprint(nup, password):
+    """
+    HMAC dari TTL sumber. Dipakai untuk tahu apakah TTL di roster berubah
+    tanpa perlu menghitung ulang hash password yang mahal. None jika
+    USER_SYNC_KEY belum diatur (sinkronisasi nanti mengadopsi user ini tanpa reset).
+    """
+    if not SYNC_KEY:
+        return None
+    return hmac.new(SYNC_KEY, f"{nup}|{password}".encode(), hashlib.sha256).hexdigest()
+
+def ensure_sync_columns():
+    """
+    Tambahkan kolom sinkronisasi ke tabel users lama (sebelum init_db membuatnya),
+    sekali per proses dalam transaksi sendiri: ALTER TABLE mengunci users secara
+    eksklusif, jadi tidak boleh ikut transaksi import yang panjang.
+    """
+    global _sync_columns_ready
+    with _sync_columns_lock:
+        if _sync_columns_ready:
+            return
+        with get_db_cursor() as cur:
+            cur.execute("""
+                SELECT column_name FROM information_schema.columns
+                WHERE table_name = 'users' AND column_name IN ('source_fingerprint', 'is_active')
+            """)
+            if len(cur.fetchall()) < 2:
+                cur.execute("""
+                    ALTER TABLE users
+                        ADD COLUMN IF NOT EXISTS source_fingerprint TEXT,
+                        ADD COLUMN IF NOT EXISTS is_active BOOLEAN NOT NULL DEFAULT TRUE
+                """)
+        _sync_columns_ready = True
+
+def _dedupe_rows(rows):
+    # NUP yang muncul lebih dari sekali: baris terakhir yang berlaku,
+    # sama seperti upsert berurutan sebelumnya
+    latest = {}
+    for row in rows:
+        latest[row['nup']] = row
+    return list(latest.values())
+
+
+# ==========================
+# HASHING & UPSERT MASSAL
+# ==========================
+
+def hash_passwords(passwords, workers=None):
+    """
+    Hash daftar password, dibagi ke beberapa proses supaya memakai semua core.
+    """
+    workers = workers or HASH_WORKERS
+    if workers <= 1 or len(passwords) < MIN_PARALLEL_ROWS:
+        return [generate_password_hash(p) for p in passwords]
+
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(generate_password_hash, passwords, chunksize=chunksize))
+
+def bulk_upsert_users(records, batch_size=None):
+    """
+    Upsert (nup, password_hash, role, source_fingerprint) secara batch dengan INSERT multi-row
+    dalam satu transaksi: semua tersimpan atau tidak sama sekali.
+    """
+    batch_size = batch_size or BATCH_SIZE
+    ensure_sync_columns()
+    with get_db_cursor() as cur:
+        returned = execute_values(cur, """
+            INSERT INTO users (nup, password, role, source_fingerprint)
+            VALUES %s
+            ON CONFLICT (nup) DO UPDATE
+            SET password = EXCLUDED.password,
+                role = EXCLUDED.role,
+                source_fingerprint = EXCLUDED.source_fingerprint,
+                is_active = TRUE,
+                updated_at = CURRENT_TIMESTAMP
+            RETURNING nup
+        """, records, page_size=batch_size, fetch=True)
+    return len(returned)
+
+def import_users(df, nup_col, ttl_col, role_col):
+    """
+    Import roster user secara massal. Mengembalikan (success, fail, error_details)
+    dengan format laporan per baris yang sama seperti import satu per satu.
+    """
+    rows, error_details = parse_user_rows(df, nup_col, ttl_col, role_col)
+    fail = len(error_details)
+    if not rows:
+        return 0, fail, error_details
+
+    unique_rows = _dedupe_rows(rows)
+    hashes = hash_passwords([row['password'] for row in unique_rows])
+    records = [
+        (row['nup'], pw_hash, row['role'], source_fingerprint(row['nup'], row['password']))
+        for row, pw_hash in zip(unique_rows, hashes)
+    ]
+
+    try:
+        bulk_upsert_users(records)
+    except Exception as e:
+        logger.error(f"Import user massal gagal, transaksi dibatalkan: {str(e)}")
+        for row in rows:
+            error_details.append(f"Baris {row['row_no']}: Error saat menambahkan {row['nup']} - {str(e)}")
+        return 0, fail + len(rows), error_details
+
+    logger.info(f"{len(unique_rows)} user unik di-upsert dari {len(rows)} baris valid")
+    return len(rows), fail, error_details
+
+
+# ==========================
+# SINKRONISASI DELTA
+# ==========================
+
+def _plan_sync(incoming, existing):
+    """
+    Bandingkan roster dengan isi tabel users: (nup baru, rehash, role_only, adopt).
+    """
+    new_nups = incoming.keys() - existing.keys()
+    rehash, role_only, adopt = [], [], []
+    for nup in incoming.keys() & existing.keys():
+        row, current = incoming[nup], existing[nup]
+        if current['source_fingerprint'] is None:
+            # User lama sebelum ada sidik jari: catat sidik jarinya saja,
+            # password yang mungkin sudah diubah pegawai tidak direset
+            adopt.append(row)
+        elif current['source_fingerprint'] != row['fingerprint']:
+            rehash.append(row)
+        elif current['role'] != row['role'] or not current['is_active']:
+            role_only.append(row)
+    return new_nups, rehash, role_only, adopt
+
+def _load_sync_state(cur):
+    cur.execute("SELECT nup, role, source_fingerprint, is_active FROM users")
+    return {r['nup']: r for r in cur.fetchall()}
+
+def sync_users(df, nup_col, ttl_col, role_col, deactivate_missing=False):
+    """
+    Sinkronkan roster dengan tabel users berdasarkan selisih himpunan:
+    - NUP baru: hash dan insert
+    - TTL sumber berubah: hash ulang dan reset password
+    - hanya role berubah: update role tanpa menyentuh password
+    - user lama tanpa sidik jari: sidik jari dicatat (adopted), password tetap
+    - sisanya dilewati, termasuk password yang sudah diubah pegawai
+    - opsional: NUP yang tidak ada di roster dinonaktifkan (kecuali admin)
+    Hashing (mahal) dilakukan sebelum transaksi tulis dibuka, supaya transaksi
+    dan koneksi pool tidak tertahan selama hashing.
+    Mengembalikan dict berisi jumlah inserted/updated/adopted/skipped/deactivated/failed
+    dan error_details. Raise ValueError jika USER_SYNC_KEY belum diatur.
+    """
+    if not SYNC_KEY:
+        raise ValueError(
+            "Mode sinkronisasi membutuhkan USER_SYNC_KEY (kunci tetap, jangan dirotasi). "
+            "Atur variabel lingkungan tersebut atau gunakan mode import biasa."
+        )
+
+    rows, error_details = parse_user_rows(df, nup_col, ttl_col, role_col)
+    result = {
+        'inserted': 0, 'updated': 0, 'adopted': 0, 'skipped': 0, 'deactivated': 0,
+        'failed': len(error_details), 'error_details': error_details,
+    }
+    if not rows:
+        # Roster tanpa baris valid tidak boleh menonaktifkan semua user
+        return result
+
+    incoming = {row['nup']: row for row in _dedupe_rows(rows)}
+    for row in incoming.values():
+        row['fingerprint'] = source_fingerprint(row['nup'], row['password'])
+
+    ensure_sync_columns()
+    with get_db_cursor() as cur:
+        existing = _load_sync_state(cur)
+
+    # Hanya baris baru dan TTL yang berubah yang membutuhkan hashing, di luar transaksi
+    new_nups, rehash, _, _ = _plan_sync(incoming, existing)
+    to_hash = [incoming[nup] for nup in new_nups] + rehash
+    hashes = hash_passwords([row['password'] for row in to_hash])
+    hashed = {row['nup']: pw_hash for row, pw_hash in zip(to_hash, hashes)}
+
+    with get_db_cursor() as cur:
+        # Rencana dihitung ulang dari isi tabel terbaru; baris yang berubah
+        # selama hashing (jarang) di-hash di sini
+        existing = _load_sync_state(cur)
+        new_nups, rehash, role_only, adopt = _plan_sync(incoming, existing)
+        late = [row for row in [incoming[nup] for nup in new_nups] + rehash if row['nup'] not in hashed]
+        if late:
+            hashed.update(zip([row['nup'] for row in late], hash_passwords([row['password'] for row in late])))
+
+        if new_nups:
+            execute_values(cur, """
+                INSERT INTO users (nup, password, role, source_fingerprint)
+                VALUES %s
+            """, [(nup, hashed[nup], incoming[nup]['role'], incoming[nup]['fingerprint']) for nup in new_nups],
+                page_size=BATCH_SIZE)
+
+        if rehash:
+            execute_values(cur, """
+                UPDATE users SET password = v.password, role = v.role,
+                       source_fingerprint = v.fingerprint, is_active = TRUE,
+                       updated_at = CURRENT_TIMESTAMP
+                FROM (VALUES %s) AS v(nup, password, role, fingerprint)
+                WHERE users.nup = v.nup
+            """, [(row['nup'], hashed[row['nup']], row['role'], row['fingerprint']) for row in rehash],
+                page_size=BATCH_SIZE)
+
+        if role_only:
+            execute_values(cur, """
+                UPDATE users SET role = v.role, is_active = TRUE, updated_at = CURRENT_TIMESTAMP
+                FROM (VALUES %s) AS v(nup, role)
+                WHERE users.nup = v.nup
+            """, [(row['nup'], row['role']) for row in role_only], page_size=BATCH_SIZE)
+
+        if adopt:
+            execute_values(cur, """
+                UPDATE users SET source_fingerprint = v.fingerprint, role = v.role, is_active = TRUE
+                FROM (VALUES %s) AS v(nup, role, fingerprint)
+                WHERE users.nup = v.nup
+            """, [(row['nup'], row['role'], row['fingerprint']) for row in adopt], page_size=BATCH_SIZE)
+
+        if deactivate_missing:
+            missing = [
+                nup for nup in existing.keys() - incoming.keys()
+                if existing[nup]['role'] != 'admin' and existing[nup]['is_active']
+            ]
+            if missing:
+                cur.execute("""
+                    UPDATE users SET is_active = FALSE, updated_at = CURRENT_TIMESTAMP
+                    WHERE nup = ANY(%s)
+                """, (missing,))
+            result['deactivated'] = len(missing)
+
+    result['inserted'] = len(new_nups)
+    result['updated'] = len(rehash) + len(role_only)
+    result['adopted'] = len(adopt)
+    result['skipped'] = len(incoming) - result['inserted'] - result['updated'] - result['adopted']
+    logger.info(
+        f"Sinkronisasi user: {result['inserted']} baru, {result['updated']} diperbarui, "
+        f"{result['adopted']} diadopsi, {result['skipped']} dilewati, "
+        f"{result['deactivated']} dinonaktifkan, {result['failed']} gagal"
+    )
+    return result
+
+
+# ==========================
+# FILE UPLOAD
+# ==========================
+
+def read_user_file(source):
+    """
+    Baca file roster (path atau file upload) dengan kolom dinormalisasi ke uppercase.
+    """
+    # Baca file Excel dengan berbagai kemungkinan tipe kolom
+    df = pd.read_excel(source, dtype={'NUP': str, 'nup': str})
+
+    # Normalisasi nama kolom ke uppercase
+    df.columns = df.columns.str.upper()
+
+    # Log struktur data untuk debugging
+    logger.info(f"Kolom dalam file (setelah normalisasi): {df.columns.tolist()}")
+    logger.info(f"Jumlah baris: {len(df)}")
+    logger.info(f"Sample data:\n{df.head()}")
+
+    # Hapus baris kosong
+    df = df.dropna(how='all')
+    logger.info(f"Jumlah baris setelah menghapus baris kosong: {len(df)}")
+    return df
+
+def process_user_upload(source, mode='import', deactivate_missing=False):
+    """
+    Proses file roster dari halaman admin, langsung di request atau dari job worker.
+    Mengembalikan dict berisi mode, jumlah per kategori dan error_details.
+    Raise ValueError jika kolom wajib tidak ditemukan.
+    """
+    df = read_user_file(source)
+
+    # Deteksi kolom yang ada
+    nup_col, ttl_col, role_col = detect_user_columns(df.columns)
+    logger.info(f"Kolom terdeteksi - NUP: {nup_col}, TTL: {ttl_col}, ROLE: {role_col}")
+
+    if not nup_col:
+        raise ValueError("Kolom NUP tidak ditemukan. Pastikan ada kolom 'NUP' atau 'nup'")
+    if not ttl_col:
+        raise ValueError("Kolom TTL/Password tidak ditemukan. Pastikan ada kolom 'TTL' atau 'password'")
+
+    if mode == 'sync':
+        # Hanya NUP baru dan yang TTL/role-nya berubah yang ditulis ulang
+        result = sync_users(df, nup_col, ttl_col, role_col, deactivate_missing=deactivate_missing)
+    else:
+        # Hashing paralel + upsert batch dalam satu transaksi
+        success, fail, error_details = import_users(df, nup_col, ttl_col, role_col)
+        result = {'success': success, 'failed': fail, 'error_details': error_details}
+    result['mode'] = mode
+
+    # Log error details untuk debugging
+    if result['error_details']:
+        logger.warning("Detail error upload user:")
+        for detail in result['error_details'][:15]:  # Log maksimal 15 error pertama
+            logger.warning(detail)
+    return result
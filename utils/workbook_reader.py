@@ -0,0 +1,254 @@
+# workbook_reader.py
+"""
+Baca sheet pertama workbook .xlsx baris per baris (openpyxl read-only) dengan
+memori terbatas, sebagai pengganti pd.read_excel untuk file besar.
+
+Aturan nilai mengikuti pd.read_excel supaya hasilnya sama:
+- header kosong jadi "Unnamed: <i>", header kembar diberi akhiran .1, .2, ...
+- sel kosong, teks NA ("NA", "N/A", "null", ...) dan kode error Excel jadi kosong
+- angka bulat dari Excel jadi int, baris kosong di akhir sheet dibuang
+- berbeda dari read_excel: header diambil dari baris tidak kosong pertama, dan
+  nilai di kanan kolom header terakhir diabaikan (dilaporkan sebagai peringatan)
+
+Tipe kolom baru bisa dipastikan setelah semua baris terbaca (kolom yang di awal
+berisi angka bisa berisi teks di baris ke-50.000). ColumnKinds mengumpulkan
+jenis nilai per kolom selama streaming, lalu convert() menerapkan tipe akhir
+yang sama untuk setiap chunk.
+"""
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import ERROR_CODES
+from pandas._libs.parsers import STR_NA_VALUES
+
+# Teks yang dibaca pd.read_excel sebagai kosong
+NA_STRINGS = frozenset(STR_NA_VALUES) | frozenset(ERROR_CODES)
+NUMERIC_KINDS = frozenset({'int', 'float', 'numtext_int', 'numtext_float'})
+# Seperti read_excel, boolean yang bercampur angka dihitung sebagai 1/0
+INT_KINDS = frozenset({'int', 'numtext_int', 'bool'})
+# Jenis yang dikenali infer_dtype untuk chunk yang seluruhnya satu jenis
+_PURE_KINDS = {'integer': 'int', 'floating': 'float', 'boolean': 'bool', 'datetime': 'datetime'}
+
+
+def _cell_value(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return None if value in NA_STRINGS else value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def _is_blank(row):
+    return all(value is None or value == '' for value in row)
+
+def _header_names(cells):
+    """
+    Nama kolom seperti pd.read_excel: sel kosong di akhir dibuang, sel kosong
+    di tengah jadi "Unnamed: <i>", nama kembar diberi akhiran .<n>.
+    """
+    cells = list(cells)
+    while cells and (cells[-1] is None or cells[-1] == ''):
+        cells.pop()
+
+    names, counts = [], {}
+    for i, cell in enumerate(cells):
+        name = f"Unnamed: {i}" if cell is None or cell == '' else str(cell)
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[name] = count + 1
+            name = f"{name}.{count}"
+            count = counts.get(name, 0)
+        counts[name] = count + 1
+        names.append(name)
+    return names
+
+
+class WorkbookStream:
+    """
+    Iterator chunk baris mentah dari sheet pertama:
+        with WorkbookStream(path, chunk_rows=5000) as stream:
+            stream.columns            # nama kolom dari header
+            for rows, row_numbers in stream.chunks():
+                ...                   # rows: list tuple, row_numbers: nomor baris Excel
+    Hanya satu chunk yang ada di memori pada satu waktu.
+    """
+
+    def __init__(self, path, chunk_rows):
+        self.path = path
+        self.chunk_rows = max(int(chunk_rows), 1)
+        self.columns = []
+        self.estimated_rows = None
+        self.truncated_rows = 0  # baris yang punya isi di luar kolom header
+        self._workbook = None
+        self._rows = None
+
+    def __enter__(self):
+        self._workbook = load_workbook(self.path, read_only=True, data_only=True, keep_links=False)
+        sheet = self._workbook.worksheets[0]
+        # Perkiraan jumlah baris dari tag dimensi, hanya untuk progres
+        if sheet.max_row:
+            self.estimated_rows = max(sheet.max_row - 1, 0)
+        # Seperti pandas: dimensi di file bisa salah, baca sampai baris terakhir yang sebenarnya
+        sheet.reset_dimensions()
+
+        self._rows = enumerate(sheet.iter_rows(values_only=True), start=1)
+        for _, row in self._rows:
+            if not _is_blank(row):
+                self.columns = _header_names(row)
+                break
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._workbook.close()
+        return False
+
+    def chunks(self):
+        width = len(self.columns)
+        empty = (None,) * width
+        rows, row_numbers = [], []
+        blank_rows = []  # baris kosong ditahan: dibuang jika ternyata di akhir sheet
+        for row_number, row in self._rows:
+            if _is_blank(row):
+                blank_rows.append(row_number)
+                continue
+            if len(row) > width and not _is_blank(row[width:]):
+                self.truncated_rows += 1
+            values = tuple(_cell_value(value) for value in row[:width])
+            if len(values) < width:
+                values += (None,) * (width - len(values))
+
+            # Seperti read_excel, baris kosong di tengah data tetap menjadi baris NaN
+            for blank_number in blank_rows:
+                rows.append(empty)
+                row_numbers.append(blank_number)
+            blank_rows = []
+            rows.append(values)
+            row_numbers.append(row_number)
+            if len(rows) >= self.chunk_rows:
+                yield rows, row_numbers
+                rows, row_numbers = [], []
+        if rows:
+            yield rows, row_numbers
+
+
+# ==========================
+# TIPE KOLOM
+# ==========================
+
+def _text_kind(values):
+    # read_excel mengubah kolom teks yang seluruhnya berupa angka menjadi numerik
+    try:
+        converted = pd.to_numeric(values)
+    except (ValueError, TypeError):
+        return 'text'
+    return 'numtext_int' if pd.api.types.is_integer_dtype(converted) else 'numtext_float'
+
+def _scalar_kind(value):
+    if isinstance(value, (bool, np.bool_)):
+        return 'bool'
+    if isinstance(value, (int, np.integer)):
+        return 'int'
+    if isinstance(value, (float, np.floating)):
+        return 'float'
+    if isinstance(value, datetime):
+        return 'datetime'
+    return 'text'
+
+def _value_kinds(values):
+    """
+    Himpunan jenis nilai (tanpa kosong) satu kolom dalam satu chunk. Jenis
+    dicatat per nilai, bukan dari hasil infer_dtype seluruh chunk, supaya tipe
+    akhir tidak bergantung pada letak batas chunk.
+    """
+    inferred = pd.api.types.infer_dtype(values, skipna=True)
+    if inferred == 'empty':
+        return set()
+    if inferred in _PURE_KINDS:
+        return {_PURE_KINDS[inferred]}
+    values = values[pd.notna(values)]
+    if inferred == 'string':
+        return {_text_kind(values)}
+
+    # Campuran: nilai teks dinilai bersama, nilai lain per jenis
+    kinds = set()
+    texts = []
+    for value in values:
+        if isinstance(value, str):
+            texts.append(value)
+        else:
+            kinds.add(_scalar_kind(value))
+    if texts:
+        kinds.add(_text_kind(np.array(texts, dtype=object)))
+    return kinds
+
+
+class ColumnKinds:
+    """
+    Kumpulkan jenis nilai per kolom dari semua chunk, lalu tentukan tipe akhir:
+    int/bool (tanpa sel kosong), float, datetime atau text (campuran).
+    Boolean yang bercampur angka ikut menjadi int/float seperti read_excel.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.kinds = {column: set() for column in self.columns}
+        self.has_null = dict.fromkeys(self.columns, False)
+        self._final = None
+
+    def observe(self, frame):
+        for column in self.columns:
+            values = frame[column].to_numpy(dtype=object)
+            if not self.has_null[column] and pd.isna(values).any():
+                self.has_null[column] = True
+            self.kinds[column] |= _value_kinds(values)
+
+    def final_kind(self, column):
+        kinds = self.kinds[column]
+        if not kinds:
+            return 'float'  # kolom kosong dibaca read_excel sebagai NaN
+        if kinds == {'bool'}:
+            # Seperti read_excel: kolom boolean yang punya sel kosong menjadi 1.0/0.0/NaN
+            return 'float' if self.has_null[column] else 'bool'
+        if kinds <= INT_KINDS and not self.has_null[column]:
+            return 'int'
+        if kinds <= NUMERIC_KINDS | {'bool'}:
+            return 'float'
+        if kinds == {'datetime'}:
+            return 'datetime'
+        return 'text'
+
+    def final_kinds(self):
+        if self._final is None:
+            self._final = {column: self.final_kind(column) for column in self.columns}
+        return self._final
+
+    def convert(self, frame):
+        """
+        Terapkan tipe akhir ke satu chunk (frame berisi nilai mentah, dtype object).
+        Kolom text disimpan sebagai str seperti _to_storable.
+        """
+        converted = {}
+        for column, kind in self.final_kinds().items():
+            values = frame[column]
+            if kind == 'int':
+                converted[column] = pd.to_numeric(values).astype('int64')
+            elif kind == 'float':
+                converted[column] = pd.to_numeric(values, errors='coerce').astype('float64')
+            elif kind == 'datetime':
+                converted[column] = pd.to_datetime(values)
+            elif kind == 'bool':
+                converted[column] = values.astype(bool)
+            else:
+                converted[column] = values.map(lambda v: v if v is None else str(v)).astype(object)
+        return pd.DataFrame(converted, index=frame.index)
+
+
+def rows_to_frame(rows, columns):
+    """
+    DataFrame nilai mentah (dtype object) dari satu chunk baris.
+    """
+    # dtype=object: tanpa itu pandas mengubah kolom berisi datetime menjadi datetime64 (None jadi NaT)
+    values = np.array(rows, dtype=object).reshape(len(rows), len(columns))
+    return pd.DataFrame(values, columns=columns, dtype=object)
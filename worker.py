@@ -0,0 +1,20 @@
+import argparse
+from app import app
+from utils.jobs import run_worker, JOB_CONCURRENCY, JOB_POLL_INTERVAL
+
+def main():
+    parser = argparse.ArgumentParser(description='Worker untuk job admin di latar belakang (upload, generate slip, email)')
+    parser.add_argument('--concurrency', type=int, default=JOB_CONCURRENCY, help='Jumlah job yang dijalankan bersamaan')
+    parser.add_argument('--poll-interval', type=float, default=JOB_POLL_INTERVAL, help='Jeda cek antrian saat kosong (detik)')
+    args = parser.parse_args()
+
+    # Task generate slip memakai template Flask (url_for), jadi setiap slot
+    # worker berjalan di dalam request context aplikasi
+    run_worker(
+        concurrency=args.concurrency,
+        poll_interval=args.poll_interval,
+        context_factory=app.test_request_context
+    )
+
+if __name__ == '__main__':
+    main()